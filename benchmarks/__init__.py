@@ -0,0 +1 @@
+"""Offline benchmarks for location_based_series. See benchmarks/run.py."""
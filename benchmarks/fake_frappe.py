@@ -0,0 +1,895 @@
+"""In-memory stand-in for the parts of Frappe that LBS code paths touch.
+
+install() registers `frappe` and the few submodules LBS imports in
+sys.modules, so location_based_series can be imported and exercised without a
+bench, a site or a database. Tables are plain dicts of rows; every call that
+would be a database round trip on a real site increments `frappe.db.queries`
+and adds the rows it returns to `frappe.db.rows`, which is what the benchmarks
+report.
+
+Only the API surface LBS uses is implemented. Anything else raises, so a new
+dependency on Frappe shows up as a benchmark failure instead of silently
+measuring the wrong thing.
+"""
+
+import logging
+import operator
+import pickle
+import re
+import secrets
+import sys
+import threading
+import types
+from collections import defaultdict
+from datetime import date, datetime
+
+
+class _dict(dict):
+    """frappe._dict: a dict with attribute access."""
+
+    def __getattr__(self, key):
+        return self.get(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+class ValidationError(Exception):
+    pass
+
+
+class DoesNotExistError(ValidationError):
+    pass
+
+
+class PermissionError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Query builder
+# ---------------------------------------------------------------------------
+
+
+class Term:
+    tables = frozenset()
+
+    def __and__(self, other):
+        return Criterion(operator.and_, self, other, conjunction=True)
+
+    def __or__(self, other):
+        return Criterion(operator.or_, self, other)
+
+
+class Field(Term):
+    def __init__(self, table, name, alias=None):
+        self.table = table
+        self.name = name
+        self.alias = alias
+        self.tables = frozenset([table])
+
+    def as_(self, alias):
+        return Field(self.table, self.name, alias)
+
+    @property
+    def output_name(self):
+        return self.alias or self.name
+
+    def evaluate(self, env):
+        row = env.get(self.table)
+        return row.get(self.name) if row is not None else None
+
+    def _compare(self, op, other):
+        return Criterion(op, self, other)
+
+    def __eq__(self, other):
+        return self._compare(operator.eq, other)
+
+    def __ne__(self, other):
+        return self._compare(operator.ne, other)
+
+    def __ge__(self, other):
+        return self._compare(operator.ge, other)
+
+    def __le__(self, other):
+        return self._compare(operator.le, other)
+
+    def __gt__(self, other):
+        return self._compare(operator.gt, other)
+
+    def __lt__(self, other):
+        return self._compare(operator.lt, other)
+
+    def isin(self, values):
+        return Criterion(_isin, self, list(values))
+
+    def like(self, pattern):
+        return Criterion(_like, self, pattern)
+
+    __hash__ = object.__hash__
+
+
+class Criterion(Term):
+    def __init__(self, op, left, right, conjunction=False):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.conjunction = conjunction
+        self.tables = _tables(left) | _tables(right)
+
+    def evaluate(self, env):
+        if self.op is operator.and_:
+            return self.left.evaluate(env) and self.right.evaluate(env)
+        if self.op is operator.or_:
+            return self.left.evaluate(env) or self.right.evaluate(env)
+        left = _value(self.left, env)
+        right = _value(self.right, env)
+        if self.op in (operator.ge, operator.le, operator.gt, operator.lt) and (left is None or right is None):
+            return False
+        return self.op(left, right)
+
+    def conjuncts(self):
+        if self.conjunction:
+            return self.left.conjuncts() + self.right.conjuncts()
+        return [self]
+
+
+def _tables(term):
+    return term.tables if isinstance(term, Term) else frozenset()
+
+
+def _value(term, env):
+    return term.evaluate(env) if isinstance(term, Term) else term
+
+
+def _isin(value, values):
+    return value in values
+
+
+def _like(value, pattern):
+    """Case-insensitive SQL LIKE, with \\ escaping the next character as MariaDB does."""
+    if value is None:
+        return False
+    regex, chars = [], iter(pattern)
+    for char in chars:
+        if char == "\\":
+            regex.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            regex.append(".*")
+        elif char == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(char))
+    return re.fullmatch("".join(regex), str(value), re.IGNORECASE | re.DOTALL) is not None
+
+
+class Table:
+    def __init__(self, doctype, alias=None):
+        self._doctype = doctype
+        self._alias = alias or doctype
+
+    def as_(self, alias):
+        return Table(self._doctype, alias)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return Field(self._alias, name)
+
+
+class _JoinBuilder:
+    def __init__(self, query, table, left):
+        self.query = query
+        self.table = table
+        self.left = left
+
+    def on(self, criterion):
+        self.query._joins.append((self.table, criterion, self.left))
+        return self.query
+
+
+class Query:
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._joins = []
+        self._select = []
+        self._where = []
+        self._orderby = []
+        self._limit = None
+        self._offset = 0
+        self._distinct = False
+
+    def join(self, table):
+        return _JoinBuilder(self, table, left=False)
+
+    def left_join(self, table):
+        return _JoinBuilder(self, table, left=True)
+
+    def select(self, *terms):
+        self._select.extend(terms)
+        return self
+
+    def where(self, criterion):
+        self._where.extend(criterion.conjuncts())
+        return self
+
+    def orderby(self, *fields, order=None):
+        self._orderby.extend((field, order == "desc") for field in fields)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def offset(self, offset):
+        self._offset = offset
+        return self
+
+    def distinct(self):
+        self._distinct = True
+        return self
+
+    def _apply_where(self, envs, bound, applied):
+        pending = [c for c in self._where if id(c) not in applied and c.tables <= bound]
+        for criterion in pending:
+            applied.add(id(criterion))
+        if not pending:
+            return envs
+        return [env for env in envs if all(c.evaluate(env) for c in pending)]
+
+    def _rows(self):
+        base = self._table
+        bound = {base._alias}
+        applied = set()
+        envs = [{base._alias: row} for row in self._db._table(base._doctype).values()]
+        envs = self._apply_where(envs, bound, applied)
+
+        for table, criterion, left in self._joins:
+            rows = list(self._db._table(table._doctype).values())
+            index = _equality_index(criterion, table._alias, rows)
+            joined = []
+            for env in envs:
+                if index is not None:
+                    field, other = index["field"], index["other"]
+                    candidates = index["rows"].get(other.evaluate(env), ())
+                else:
+                    candidates = rows
+                matches = [row for row in candidates if criterion.evaluate({**env, table._alias: row})]
+                if matches:
+                    joined.extend({**env, table._alias: row} for row in matches)
+                elif left:
+                    joined.append({**env, table._alias: None})
+            bound.add(table._alias)
+            envs = self._apply_where(joined, bound, applied)
+
+        for field, reverse in reversed(self._orderby):
+            envs.sort(key=lambda env: (field.evaluate(env) is None, field.evaluate(env)), reverse=reverse)
+        return envs
+
+    def run(self, as_dict=False, pluck=False):
+        envs = self._rows()
+        results = []
+        seen = set()
+        for env in envs:
+            values = tuple(term.evaluate(env) for term in self._select)
+            if self._distinct:
+                if values in seen:
+                    continue
+                seen.add(values)
+            results.append(values)
+
+        end = None if self._limit is None else self._offset + self._limit
+        results = results[self._offset:end]
+        self._db._count(len(results))
+
+        if pluck:
+            return [values[0] for values in results]
+        if as_dict:
+            names = [term.output_name for term in self._select]
+            return [_dict(zip(names, values)) for values in results]
+        return [list(values) for values in results]
+
+
+def _equality_index(criterion, alias, rows):
+    """Index rows for an `alias.field == other.field` join condition, or None."""
+    if not isinstance(criterion, Criterion) or criterion.op is not operator.eq:
+        return None
+    for field, other in ((criterion.left, criterion.right), (criterion.right, criterion.left)):
+        if isinstance(field, Field) and field.table == alias and isinstance(other, Field) and other.table != alias:
+            index = defaultdict(list)
+            for row in rows:
+                index[row.get(field.name)].append(row)
+            return {"field": field, "other": other, "rows": index}
+    return None
+
+
+class UpdateQuery:
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._set = []
+        self._where = []
+
+    def set(self, field, value):
+        self._set.append((field.name, value))
+        return self
+
+    def where(self, criterion):
+        self._where.extend(criterion.conjuncts())
+        return self
+
+    def run(self):
+        alias = self._table._alias
+        for row in self._db._table(self._table._doctype).values():
+            if all(c.evaluate({alias: row}) for c in self._where):
+                for fieldname, value in self._set:
+                    row[fieldname] = value
+        self._db._count(0)
+
+
+class QueryBuilder:
+    def __init__(self, db):
+        self._db = db
+
+    def DocType(self, doctype):
+        return Table(doctype)
+
+    def from_(self, table):
+        return Query(self._db, table)
+
+    def update(self, table):
+        return UpdateQuery(self._db, table)
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+
+class _Callbacks:
+    def __init__(self):
+        self._callbacks = []
+
+    def add(self, callback):
+        self._callbacks.append(callback)
+
+    def run(self):
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def reset(self):
+        self._callbacks = []
+
+
+_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+    "in": _isin,
+    "not in": lambda value, values: value not in values,
+    "like": _like,
+}
+
+
+def _conditions(filters):
+    """Return filters as (fieldname, condition) pairs, once per call rather than per row."""
+    if not filters:
+        return ()
+    if isinstance(filters, dict):
+        return tuple(filters.items())
+    # [[fieldname, operator, value], ...], optionally prefixed with the doctype
+    return tuple((f[-3], (f[-2], f[-1])) for f in filters)
+
+
+def _matches(row, conditions):
+    for fieldname, condition in conditions:
+        value = row.get(fieldname)
+        if isinstance(condition, (list, tuple)):
+            op, expected = condition[0].lower(), condition[1]
+            if op == "is":
+                if (expected == "set") != bool(value):
+                    return False
+            elif op in (">", "<", ">=", "<=") and value is None:
+                return False
+            elif not _OPERATORS[op](value, expected):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+# Marker query for round trips made by the dict-backed API methods
+ROUND_TRIP = object()
+
+
+class FakeDatabase:
+    """Dict-backed tables with round-trip and row counters.
+
+    Commit callbacks are per thread, like the per-request connections of a
+    real site. `sql_handler(query, values)` can be set to serve the raw SQL a
+    benchmark needs; without it raw SQL raises.
+    """
+
+    def __init__(self):
+        self.tables = defaultdict(dict)
+        self.defaults = {}
+        self.queries = 0
+        self.rows = 0
+        self.sql_handler = None
+        self._lock = threading.Lock()
+        self._transaction = threading.local()
+
+    @property
+    def after_commit(self):
+        return self._callbacks("after_commit")
+
+    @property
+    def after_rollback(self):
+        return self._callbacks("after_rollback")
+
+    def _callbacks(self, name):
+        callbacks = getattr(self._transaction, name, None)
+        if callbacks is None:
+            callbacks = _Callbacks()
+            setattr(self._transaction, name, callbacks)
+        return callbacks
+
+    def reset_counters(self):
+        self.queries = 0
+        self.rows = 0
+
+    def _count(self, rows):
+        # Every round trip goes through sql(), as on a real site, so wrappers
+        # of frappe.db.sql (query budgets) see it
+        self.sql(ROUND_TRIP, rows)
+
+    def _table(self, doctype):
+        return self.tables[doctype]
+
+    # Data loading (not counted)
+
+    def insert(self, doctype, row):
+        row = _dict(row)
+        row.setdefault("name", generate_hash(10))
+        self.tables[doctype][row["name"]] = row
+        return row
+
+    # Frappe API
+
+    def get_value(self, doctype, filters=None, fieldname="name", as_dict=False, order_by=None, **kwargs):
+        row = self._find(doctype, filters)
+        self._count(1 if row else 0)
+        if row is None:
+            return None
+
+        if isinstance(fieldname, (list, tuple)):
+            values = _dict((f, row.get(f)) for f in fieldname)
+            return values if as_dict else tuple(values.values())
+        return _dict({fieldname: row.get(fieldname)}) if as_dict else row.get(fieldname)
+
+    def _find(self, doctype, filters):
+        table = self._table(doctype)
+        if isinstance(filters, str):
+            return table.get(filters)
+        conditions = _conditions(filters)
+        for row in table.values():
+            if _matches(row, conditions):
+                return row
+        return None
+
+    def exists(self, doctype, filters=None):
+        row = self._find(doctype, filters)
+        self._count(1 if row else 0)
+        return row["name"] if row else None
+
+    def count(self, doctype, filters=None):
+        self._count(1)
+        conditions = _conditions(filters)
+        return sum(1 for row in self._table(doctype).values() if _matches(row, conditions))
+
+    def delete(self, doctype, filters=None):
+        table = self._table(doctype)
+        conditions = _conditions(filters)
+        for name in [name for name, row in table.items() if _matches(row, conditions)]:
+            del table[name]
+        self._count(0)
+
+    def bulk_insert(self, doctype, fields, values, **kwargs):
+        for value in values:
+            self.insert(doctype, dict(zip(fields, value)))
+        self._count(0)
+
+    def get_default(self, key):
+        self._count(1)
+        return self.defaults.get(key)
+
+    def set_default(self, key, value):
+        self._count(0)
+        self.defaults[key] = value
+
+    def sql(self, query, values=None, *args, **kwargs):
+        if query is ROUND_TRIP:
+            result = range(values)
+        elif self.sql_handler:
+            result = self.sql_handler(query, values)
+        else:
+            raise NotImplementedError(f"Raw SQL is not supported by the benchmark database: {query.strip()[:80]}")
+
+        with self._lock:
+            self.queries += 1
+            self.rows += len(result)
+        return result
+
+    def sql_list(self, query, values=None, *args, **kwargs):
+        return [row[0] for row in self.sql(query, values, *args, **kwargs)]
+
+    def _unsupported_sql(self, query):
+        raise NotImplementedError(f"Raw SQL is not supported by the benchmark database: {query.strip()[:80]}")
+
+    def commit(self):
+        self.after_rollback.reset()
+        self.after_commit.run()
+
+    def rollback(self, save_point=None):
+        if save_point:
+            return
+        self.after_commit.reset()
+        self.after_rollback.run()
+
+    def savepoint(self, name):
+        pass
+
+    def is_table_missing(self, e):
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+class FakeRedis:
+    """Process-local stand-in for frappe.cache() with a read counter."""
+
+    def __init__(self):
+        self.store = {}
+        self.reads = 0
+        self._lock = threading.Lock()
+
+    def flushall(self):
+        self.store.clear()
+
+    def _read(self, value):
+        with self._lock:
+            self.reads += 1
+        return value
+
+    def make_key(self, key):
+        return f"{local.site}|{key}"
+
+    def get_value(self, key, generator=None, **kwargs):
+        value = self._read(self.store.get(key))
+        if value is None and generator:
+            value = generator()
+            self.store[key] = value
+        return value
+
+    def set_value(self, key, value, expires_in_sec=None, **kwargs):
+        self.store[key] = value
+
+    def delete_value(self, keys, **kwargs):
+        for key in [keys] if isinstance(keys, str) else keys:
+            self.store.pop(key, None)
+
+    def get(self, key):
+        return self._read(self.store.get(key))
+
+    def mget(self, keys):
+        # Raw redis returns the pickled bytes that set_value stored
+        self._read(None)
+        values = [self.store.get(key.split("|", 1)[1]) for key in keys]
+        return [None if value is None else pickle.dumps(value) for value in values]
+
+    def delete(self, *keys):
+        self.delete_value(list(keys))
+
+    def incrby(self, key, amount):
+        with self._lock:
+            self.store[key] = (self.store.get(key) or 0) + amount
+            return self.store[key]
+
+    def hget(self, name, key, generator=None, **kwargs):
+        value = self._read(self.store.get(name, {}).get(key))
+        if value is None and generator:
+            value = generator()
+            self.hset(name, key, value)
+        return value
+
+    def hset(self, name, key, value, **kwargs):
+        self.store.setdefault(name, {})[key] = value
+
+    def hdel(self, name, key, **kwargs):
+        self.store.get(name, {}).pop(key, None)
+
+    def hgetall(self, name):
+        return self._read(dict(self.store.get(name, {})))
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Raw redis pipeline: commands are queued and run by execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def hincrbyfloat(self, name, key, amount):
+        self.commands.append(lambda: self._hincrbyfloat(name, key, amount))
+
+    def _hincrbyfloat(self, name, key, amount):
+        with self.redis._lock:
+            values = self.redis.store.setdefault(name, {})
+            values[key] = float(values.get(key, 0)) + amount
+            return values[key]
+
+    def hgetall(self, name):
+        self.commands.append(lambda: self.redis.hgetall(name))
+
+    def execute(self):
+        results = [command() for command in self.commands]
+        self.commands = []
+        return results
+
+
+# ---------------------------------------------------------------------------
+# Documents and meta
+# ---------------------------------------------------------------------------
+
+
+class FakeDocument:
+    """Attribute bag standing in for frappe.model.document.Document."""
+
+    def __init__(self, data, is_new=True):
+        self._is_new = is_new
+        self._doc_before_save = None
+        self.update(data)
+
+    def update(self, data):
+        for key, value in data.items():
+            if isinstance(value, list):
+                value = [row if isinstance(row, FakeDocument) else FakeDocument(row) for row in value]
+            setattr(self, key, value)
+        return self
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def is_new(self):
+        return self._is_new
+
+    def get_doc_before_save(self):
+        return self._doc_before_save
+
+    def insert(self, *args, **kwargs):
+        db.insert(self.doctype, {key: value for key, value in vars(self).items() if not key.startswith("_")})
+        db._count(0)
+        self._is_new = False
+        return self
+
+
+class FakeMeta:
+    def __init__(self, doctype):
+        self.doctype = doctype
+
+    def has_field(self, fieldname):
+        return fieldname in SCHEMA.get(self.doctype, ())
+
+
+# Fields per doctype, used by frappe.get_meta().has_field
+SCHEMA = {}
+
+
+# ---------------------------------------------------------------------------
+# frappe module functions
+# ---------------------------------------------------------------------------
+
+db = FakeDatabase()
+qb = QueryBuilder(db)
+# frappe.defaults: only the clear_default the backfill uses
+defaults = _dict(clear_default=lambda key=None, value=None, parent=None, **kwargs: db.defaults.pop(key, None))
+_cache = FakeRedis()
+local = threading.local()
+conf = _dict()
+session = _dict(user="Administrator")
+flags = _dict()
+
+
+def reset_local(site="bench.local"):
+    """Start a new request: fresh frappe.local, same worker caches."""
+    local.__dict__.clear()
+    local.site = site
+    local.db = db
+    local.message_log = []
+
+
+def cache():
+    return _cache
+
+
+def generate_hash(length=10, *args, **kwargs):
+    return secrets.token_hex(length)[:length]
+
+
+def throw(msg, exc=ValidationError, *args, **kwargs):
+    raise exc(msg)
+
+
+def whitelist(*args, **kwargs):
+    if args and callable(args[0]):
+        return args[0]
+    return lambda fn: fn
+
+
+def validate_and_sanitize_search_inputs(fn):
+    return fn
+
+
+def only_for(roles, *args, **kwargs):
+    pass
+
+
+def has_permission(*args, **kwargs):
+    return True
+
+
+def clear_messages():
+    local.message_log = []
+
+
+def safe_decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def logger(name=None, *args, **kwargs):
+    return logging.getLogger(name or "frappe")
+
+
+def get_meta(doctype):
+    return FakeMeta(doctype)
+
+
+def get_hooks(hook=None, default=None, *args, **kwargs):
+    # No other apps are installed
+    return default if default is not None else []
+
+
+def get_all(doctype, filters=None, fields=None, pluck=None, order_by=None, limit=None, limit_page_length=None, **kwargs):
+    conditions = _conditions(filters)
+    rows = [row for row in db._table(doctype).values() if _matches(row, conditions)]
+
+    if order_by:
+        for part in reversed([p.strip() for p in order_by.split(",")]):
+            fieldname, _, direction = part.partition(" ")
+            rows.sort(key=lambda row: (row.get(fieldname) is None, row.get(fieldname)),
+                      reverse=direction.strip().lower() == "desc")
+
+    limit = limit or limit_page_length
+    if limit:
+        rows = rows[:int(limit)]
+    db._count(len(rows))
+
+    if pluck:
+        return [row.get(pluck) for row in rows]
+    fields = fields or ["name"]
+    return [_dict((f, row.get(f)) for f in fields) for row in rows]
+
+
+get_list = get_all
+
+
+def get_doc(doctype, name=None, **kwargs):
+    if isinstance(doctype, dict):
+        return FakeDocument(doctype)
+    row = db._find(doctype, name)
+    db._count(1 if row else 0)
+    if row is None:
+        raise DoesNotExistError(f"{doctype} {name} not found")
+    return FakeDocument({"doctype": doctype, **row}, is_new=False)
+
+
+def get_cached_value(doctype, name, fieldname, as_dict=False):
+    return db.get_value(doctype, name, fieldname, as_dict=as_dict)
+
+
+# ---------------------------------------------------------------------------
+# Submodules
+# ---------------------------------------------------------------------------
+
+
+def getdate(value=None):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def nowdate():
+    return date.today().isoformat()
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def cint(value):
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def flt(value, precision=None):
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return round(value, precision) if precision is not None else value
+
+
+def update_progress_bar(*args, **kwargs):
+    pass
+
+
+def getseries(key, digits):
+    """tabSeries counter: one locked read and one write on a real site."""
+    series = db._table("Series")
+    with db._lock:
+        row = series.setdefault(key, _dict(name=key, current=0))
+        row["current"] += 1
+        current = row["current"]
+    db._count(1)
+    db._count(0)
+    return ("%0" + str(digits) + "d") % current
+
+
+def get_address_display(address_name):
+    address = db.get_value("Address", address_name, ["address_line1", "city"], as_dict=True) or {}
+    return "<br>".join(str(v) for v in address.values() if v)
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def install():
+    """Register the stand-in as `frappe` and return it."""
+    frappe = sys.modules[__name__]
+    sys.modules["frappe"] = frappe
+
+    frappe.utils = _module(
+        "frappe.utils",
+        cint=cint, flt=flt, getdate=getdate, nowdate=nowdate, today=nowdate, now=now,
+        update_progress_bar=update_progress_bar,
+    )
+    frappe.model = _module("frappe.model")
+    frappe.model.naming = _module("frappe.model.naming", getseries=getseries)
+    _module("frappe.contacts")
+    _module("frappe.contacts.doctype")
+    _module("frappe.contacts.doctype.address")
+    _module("frappe.contacts.doctype.address.address", get_address_display=get_address_display)
+
+    reset_local()
+    return frappe
@@ -0,0 +1,181 @@
+"""Synthetic masters and documents for the benchmarks.
+
+Everything is written straight into the in-memory database of fake_frappe.
+Sizes are parameters so the same builders cover a 10-warehouse shop and a
+50,000-warehouse distributor.
+"""
+
+from benchmarks import fake_frappe as frappe
+
+COMPANY = "Bench Co"
+ABBR = "BC"
+FIRST_FISCAL_YEAR = 2025
+POSTING_DATE = "2026-10-17"
+
+SCHEMA = {
+    "Sales Invoice": (
+        "location", "dispatch_location", "dispatch_address_name", "company_address",
+        "set_warehouse", "update_stock", "is_return", "is_debit_note", "lbs_location_code",
+    ),
+    "Purchase Invoice": (
+        "location", "shipping_location", "shipping_address", "billing_address", "company_address",
+        "place_of_supply", "set_warehouse", "update_stock", "is_return", "lbs_location_code",
+    ),
+}
+
+
+def fiscal_years(count):
+    """Return (name, start, end) of count consecutive April-March fiscal years."""
+    return [
+        (f"{year}-{year + 1}", f"{year}-04-01", f"{year + 1}-03-31")
+        for year in range(FIRST_FISCAL_YEAR, FIRST_FISCAL_YEAR + count)
+    ]
+
+
+def build_site(warehouses, locations=10, fanout=10, items=5000, fiscal_year_count=2):
+    """Populate a fresh site and return a description of what was created.
+
+    warehouses: total nodes in the Warehouse tree (root included)
+    locations:  Locations, each linked to one child of the root
+    items:      Item masters; every other one is a stock item
+    """
+    db = frappe.db
+    db.tables.clear()
+    db.defaults.clear()
+    frappe.cache().flushall()
+    frappe.SCHEMA.clear()
+    frappe.SCHEMA.update(SCHEMA)
+
+    db.insert("Accounting Dimension", {
+        "name": "Location", "document_type": "Location", "fieldname": "location", "disabled": 0,
+    })
+    for name, start, end in fiscal_years(fiscal_year_count):
+        db.insert("Fiscal Year", {
+            "name": name, "year_start_date": start, "year_end_date": end, "disabled": 0,
+        })
+        db.insert("Fiscal Year Company", {"parent": name, "company": COMPANY})
+
+    nodes = build_warehouse_tree(warehouses, fanout)
+    tops = [node for node in nodes if node["parent_warehouse"] == nodes[0]["name"]][:locations]
+
+    site = {"locations": [], "warehouses": len(nodes), "items": [], "fiscal_years": fiscal_years(fiscal_year_count)}
+    for idx, top in enumerate(tops):
+        code = f"L{idx:02d}"
+        address = db.insert("Address", {
+            "name": f"{code} Address-Billing",
+            "address_title": f"{code} Address",
+            "address_line1": f"{idx} Bench Street",
+            "city": "Mumbai",
+            "gstin": "27ABCDE1234F1Z5",
+            "gst_state_number": "27",
+            "gst_state": "Maharashtra",
+            "state": "Maharashtra",
+            "country": "India",
+        })
+        location = db.insert("Location", {
+            "name": f"Location {code}",
+            "lbs_location_code": code,
+            "linked_address": address["name"],
+            "linked_warehouse": top["name"],
+            "location_name": f"Location {code}",
+            # Stands for the GeoJSON payload a real Location carries
+            "location": '{"type":"FeatureCollection","features":[]}',
+        })
+        leaves = [
+            node["name"] for node in nodes
+            if not node["is_group"] and top["lft"] <= node["lft"] and node["rgt"] <= top["rgt"]
+        ]
+        site["locations"].append({
+            "name": location["name"],
+            "code": code,
+            "address": address["name"],
+            "warehouses": leaves,
+        })
+
+    for idx in range(items):
+        item = db.insert("Item", {"name": f"ITEM-{idx:05d}", "is_stock_item": idx % 2 == 0})
+        site["items"].append(item["name"])
+
+    from location_based_series.location_warehouses import rebuild_all_location_warehouses
+    rebuild_all_location_warehouses()
+
+    return site
+
+
+def build_warehouse_tree(count, fanout):
+    """Create a nested-set Warehouse tree of count nodes, breadth first."""
+    count = max(count, 2)
+    children = {idx: [] for idx in range(count)}
+    for idx in range(1, count):
+        children[(idx - 1) // fanout].append(idx)
+
+    nodes = [None] * count
+    counter = 0
+
+    # Iterative DFS assigning lft on the way down and rgt on the way up
+    stack = [(0, False)]
+    while stack:
+        idx, visited = stack.pop()
+        if visited:
+            counter += 1
+            nodes[idx]["rgt"] = counter
+            continue
+        counter += 1
+        parent = None if idx == 0 else f"WH-{(idx - 1) // fanout:05d} - {ABBR}"
+        nodes[idx] = {
+            "name": f"WH-{idx:05d} - {ABBR}",
+            "warehouse_name": f"Warehouse {idx}",
+            "parent_warehouse": parent,
+            "is_group": 1 if children[idx] else 0,
+            "disabled": 0,
+            "company": COMPANY,
+            "lft": counter,
+        }
+        stack.append((idx, True))
+        stack.extend((child, False) for child in reversed(children[idx]))
+
+    for node in nodes:
+        frappe.db.insert("Warehouse", node)
+    return nodes
+
+
+def make_document(site, doctype, rows, location_index=0, via="location"):
+    """Return an unsaved transaction with rows item lines on valid warehouses.
+
+    via: "location", or "dispatch" / "shipping" to route warehouses through a
+    second location the way a branch transfer does.
+    """
+    main = site["locations"][location_index]
+    other = site["locations"][(location_index + 1) % len(site["locations"])]
+    stock_location = main if via == "location" else other
+    warehouses = stock_location["warehouses"]
+    items = site["items"]
+
+    data = {field: None for field in frappe.SCHEMA[doctype]}
+    data.update({
+        "doctype": doctype,
+        "name": f"new-{doctype.lower().replace(' ', '-')}-1",
+        "company": COMPANY,
+        "posting_date": POSTING_DATE,
+        "docstatus": 0,
+        "is_return": 0,
+        "update_stock": 1,
+        "location": main["name"],
+        "lbs_location_code": main["code"],
+        "set_warehouse": warehouses[0],
+        "items": [
+            {
+                "doctype": f"{doctype} Item",
+                "idx": idx + 1,
+                "item_code": items[idx % len(items)],
+                "warehouse": warehouses[idx % len(warehouses)],
+            }
+            for idx in range(rows)
+        ],
+    })
+    if via == "dispatch":
+        data["dispatch_location"] = other["name"]
+    elif via == "shipping":
+        data["shipping_location"] = other["name"]
+
+    return frappe.get_doc(data)
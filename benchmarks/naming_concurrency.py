@@ -0,0 +1,270 @@
+"""Concurrent naming throughput and lock-wait harness.
+
+    python -m benchmarks.naming_concurrency --workers 1,2,4,8,16 --docs 2000
+    python -m benchmarks.naming_concurrency --mode process --locations 1 --hold-ms 30
+    python -m benchmarks.naming_concurrency --block-size 50 --doctypes "Sales Order"
+
+Drives events.naming.custom_autoname from a pool of threads or processes. The
+tabSeries rows live in a shared store that emulates InnoDB row locks: the
+lock a counter update takes is held until the simulated transaction commits,
+--hold-ms after naming (the rest of validate + insert on a real site). This
+is what serializes inserts per location + doctype + fiscal year.
+
+For every worker count the harness reports throughput, p50 / p99 latency per
+document, time spent waiting for series locks, and the duplicates and gaps
+found in the generated names. Gaps are expected with --block-size (unused
+numbers of reserved blocks), never in strict mode.
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import fake_frappe
+
+frappe = fake_frappe.install()
+
+from benchmarks import fixtures  # noqa: E402
+from location_based_series import cache as lbs_cache  # noqa: E402
+from location_based_series import series  # noqa: E402
+from location_based_series.events import naming  # noqa: E402
+
+NAMING_DOCTYPES = (
+    "Sales Invoice", "Purchase Invoice", "Sales Order", "Purchase Order", "Delivery Note", "Purchase Receipt",
+)
+
+
+class SeriesStore:
+    """tabSeries with one lock per row, held until the owning transaction commits.
+
+    Thread mode uses plain locks and a dict. Process mode passes manager
+    proxies, so every process sees the same counters and locks.
+    """
+
+    def __init__(self, counters, locks):
+        self.counters = counters
+        self.locks = locks
+        self._held = threading.local()
+
+    def _held_locks(self):
+        if not hasattr(self._held, "keys"):
+            self._held.keys = []
+            self._held.wait = 0.0
+        return self._held
+
+    def lock_row(self, key):
+        """SELECT ... FOR UPDATE: wait for the row lock unless already held."""
+        held = self._held_locks()
+        if key in held.keys:
+            return
+        start = time.perf_counter()
+        self.locks[key].acquire()
+        held.wait += time.perf_counter() - start
+        held.keys.append(key)
+
+    def commit(self):
+        """Release every row lock of this transaction and return the time waited for them."""
+        held = self._held_locks()
+        for key in held.keys:
+            self.locks[key].release()
+        wait, held.keys, held.wait = held.wait, [], 0.0
+        return wait
+
+    def getseries(self, key, digits):
+        self.lock_row(key)
+        current = self.counters.get(key, 0) + 1
+        self.counters[key] = current
+        return ("%0" + str(digits) + "d") % current
+
+    def current(self, key):
+        return self.counters.get(key, 0)
+
+    def sql(self, query, values):
+        """The tabSeries statements of series._reserve_block."""
+        query = " ".join(query.split())
+        if query.startswith("SELECT `current` FROM `tabSeries`"):
+            key = values[0]
+            self.lock_row(key)
+            return ((self.counters[key],),) if key in self.counters else ()
+        if query.startswith("UPDATE `tabSeries` SET `current` = `current` +"):
+            size, key = values
+            self.counters[key] = self.counters[key] + size
+            return ()
+        if query.startswith("INSERT INTO `tabSeries`"):
+            key, current = values
+            self.counters[key] = current
+            return ()
+        raise NotImplementedError(query)
+
+
+def _series_keys(site, doctypes):
+    """Every tabSeries key the configured documents can name into."""
+    keys = set()
+    for doctype in doctypes:
+        template, code = naming.DEFAULT_NAMING_TEMPLATES[(doctype, 0, 0)]
+        compiled = naming.compile_naming_template(template, code)
+        for location in site["locations"]:
+            for fy_name, _, _ in site["fiscal_years"]:
+                keys.add(compiled["series_key"](location["code"], fy_name[-2:]))
+    return keys
+
+
+def _document_specs(site, doctypes, docs):
+    """Round-robin (doctype, location code, posting date) over all combinations."""
+    combos = [
+        (doctype, location["code"], start)
+        for doctype in doctypes
+        for location in site["locations"]
+        for _, start, _ in site["fiscal_years"]
+    ]
+    return [combos[idx % len(combos)] for idx in range(docs)]
+
+
+def _setup_worker(args, store):
+    """Build masters in this process and route series access to the shared store."""
+    site = fixtures.build_site(10, locations=args.locations, items=1, fiscal_year_count=args.fiscal_years)
+    lbs_cache._worker_cache.clear()
+    series._blocks.clear()
+    if args.block_size:
+        frappe.conf["lbs_series_block_size"] = {doctype: args.block_size for doctype in NAMING_DOCTYPES}
+    naming.getseries = store.getseries
+    series._get_series_current = store.current
+    frappe.db.sql_handler = store.sql
+    return site
+
+
+def _name_documents(specs, store, hold):
+    """Name specs one transaction at a time; return (names, latencies, lock waits)."""
+    frappe.reset_local()
+    names, latencies, waits = [], [], []
+    for doctype, code, posting_date in specs:
+        doc = frappe.get_doc({
+            "doctype": doctype,
+            "company": fixtures.COMPANY,
+            "posting_date": posting_date,
+            "lbs_location_code": code,
+            "is_return": 0,
+        })
+        start = time.perf_counter()
+        naming.custom_autoname(doc, "autoname")
+        if hold:
+            time.sleep(hold)
+        waits.append(store.commit())
+        frappe.db.commit()
+        latencies.append(time.perf_counter() - start)
+        names.append((doctype, doc.name))
+    return names, latencies, waits
+
+
+def _process_worker(args, counters, locks, specs):
+    store = SeriesStore(counters, locks)
+    _setup_worker(args, store)
+    return _name_documents(specs, store, args.hold_ms / 1000)
+
+
+def run_once(args, workers):
+    site = fixtures.build_site(10, locations=args.locations, items=1, fiscal_year_count=args.fiscal_years)
+    specs = _document_specs(site, args.doctypes, args.docs)
+    chunks = [specs[idx::workers] for idx in range(workers)]
+    keys = _series_keys(site, args.doctypes)
+
+    start = time.perf_counter()
+    if args.mode == "process":
+        with multiprocessing.Manager() as manager:
+            counters = manager.dict()
+            locks = {key: manager.Lock() for key in keys}
+            with multiprocessing.Pool(workers) as pool:
+                results = pool.starmap(_process_worker, [(args, counters, locks, chunk) for chunk in chunks])
+    else:
+        store = SeriesStore({}, {key: threading.Lock() for key in keys})
+        _setup_worker(args, store)
+        results = [None] * workers
+
+        def work(idx):
+            results[idx] = _name_documents(chunks[idx], store, args.hold_ms / 1000)
+
+        threads = [threading.Thread(target=work, args=(idx,)) for idx in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+
+    names = [name for result in results for name in result[0]]
+    latencies = sorted(latency for result in results for latency in result[1])
+    waits = [wait for result in results for wait in result[2]]
+    duplicates, gaps = check_names(names)
+
+    return {
+        "workers": workers,
+        "docs": len(names),
+        "throughput": len(names) / elapsed if elapsed else 0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "lock_wait_ms": sum(waits) * 1000,
+        "lock_wait_share": sum(waits) / sum(latencies) if latencies else 0,
+        "duplicates": duplicates,
+        "gaps": gaps,
+    }
+
+
+def check_names(names):
+    """Return (duplicate count, gap count) over the generated (doctype, name) pairs."""
+    duplicates = len(names) - len(set(names))
+
+    counters = defaultdict(set)
+    for doctype, name in names:
+        key, _, counter = name.rpartition("-")
+        if counter.isdigit():
+            counters[(doctype, key)].add(int(counter))
+
+    gaps = sum(max(numbers) - len(numbers) for numbers in counters.values())
+    return duplicates, gaps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="comma-separated worker counts")
+    parser.add_argument("--docs", type=int, default=1000, help="documents named per worker count")
+    parser.add_argument("--locations", type=int, default=1)
+    parser.add_argument("--fiscal-years", type=int, default=1)
+    parser.add_argument("--doctypes", default="Sales Invoice",
+                        help=f"comma-separated, from: {', '.join(NAMING_DOCTYPES)}")
+    parser.add_argument("--hold-ms", type=float, default=20.0,
+                        help="transaction time after naming while the series lock is held")
+    parser.add_argument("--block-size", type=int, default=0,
+                        help="lbs_series_block_size for every non-strict doctype (0 = strict)")
+    args = parser.parse_args(argv)
+    args.doctypes = [doctype.strip() for doctype in args.doctypes.split(",") if doctype.strip()]
+
+    unknown = set(args.doctypes) - set(NAMING_DOCTYPES)
+    if unknown:
+        parser.error(f"unknown doctypes: {', '.join(sorted(unknown))}")
+
+    print(
+        f"mode={args.mode} docs={args.docs} locations={args.locations} fiscal_years={args.fiscal_years} "
+        f"doctypes={','.join(args.doctypes)} hold={args.hold_ms}ms block_size={args.block_size}"
+    )
+    print(f"{'workers':>7} {'docs/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lock wait ms':>13} {'wait %':>7} {'dups':>5} {'gaps':>5}")
+
+    failed = False
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        result = run_once(args, workers)
+        print(
+            f"{result['workers']:>7} {result['throughput']:>9.1f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+            f" {result['lock_wait_ms']:>13.1f} {result['lock_wait_share'] * 100:>6.1f}%"
+            f" {result['duplicates']:>5} {result['gaps']:>5}"
+        )
+        # Strict series must never skip or repeat a number
+        failed |= bool(result["duplicates"]) or (not args.block_size and bool(result["gaps"]))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Offline benchmarks for the LBS hot paths.
+
+    python -m benchmarks.run                     # full matrix, print results
+    python -m benchmarks.run --quick             # small trees / documents only
+    python -m benchmarks.run --save baseline     # write benchmarks/baselines/baseline.json
+    python -m benchmarks.run --compare baseline  # exit 1 on regression against it
+
+Every benchmark is measured twice:
+    cold  caches flushed first (first request after a deploy or invalidation)
+    warm  median of --repeat further requests in the same worker
+and reports wall time, database round trips, rows fetched, cache reads and
+the peak Python memory allocated during one warm call.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fake_frappe
+
+frappe = fake_frappe.install()
+
+from benchmarks import fixtures  # noqa: E402
+from location_based_series import cache as lbs_cache  # noqa: E402
+from location_based_series import location_context, series, utils  # noqa: E402
+from location_based_series.events.naming import custom_autoname  # noqa: E402
+from location_based_series.events.validation import validate_doc  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+TREE_SIZES = (10, 1000, 50000)
+ROW_COUNTS = (1, 100, 5000)
+QUICK_TREE_SIZES = (10, 1000)
+QUICK_ROW_COUNTS = (1, 100)
+
+# A warm time this much slower than the baseline counts as a regression.
+# Round trips and rows are deterministic and may not grow at all.
+TIME_TOLERANCE = 0.25
+
+
+def flush_caches():
+    """Forget everything a worker and the site cache hold."""
+    frappe.cache().flushall()
+    lbs_cache._worker_cache.clear()
+    series._blocks.clear()
+    frappe.reset_local()
+
+
+def _call(fn):
+    frappe.reset_local()
+    frappe.db.reset_counters()
+    frappe.cache().reads = 0
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, frappe.db.queries, frappe.db.rows, frappe.cache().reads
+
+
+def measure(fn, repeat):
+    flush_caches()
+    cold_ms, cold_queries, cold_rows, cold_cache_reads = _call(fn)
+
+    warm = [_call(fn) for _ in range(repeat)]
+    warm_ms = statistics.median(run[0] for run in warm)
+    _, warm_queries, warm_rows, warm_cache_reads = warm[-1]
+
+    frappe.reset_local()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "cold_ms": round(cold_ms, 3),
+        "cold_queries": cold_queries,
+        "cold_rows": cold_rows,
+        "cold_cache_reads": cold_cache_reads,
+        "warm_ms": round(warm_ms, 3),
+        "warm_queries": warm_queries,
+        "warm_rows": warm_rows,
+        "warm_cache_reads": warm_cache_reads,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _search(endpoint, filters):
+    return lambda: endpoint("Warehouse", "", "name", 0, 20, dict(filters))
+
+
+def benchmarks_for_site(site, row_counts):
+    """Yield (name, fn) for every benchmark on one synthetic site."""
+    main = site["locations"][0]["name"]
+    other = site["locations"][1 % len(site["locations"])]["name"]
+
+    for rows in row_counts:
+        for doctype, via in (("Sales Invoice", "location"), ("Sales Invoice", "dispatch"),
+                             ("Purchase Invoice", "shipping")):
+            doc = fixtures.make_document(site, doctype, rows, via=via)
+            yield f"validate_doc[{doctype}/{via}, rows={rows}]", lambda doc=doc: validate_doc(doc, "validate")
+
+    doc = fixtures.make_document(site, "Sales Invoice", 1)
+    yield "custom_autoname[Sales Invoice]", lambda: custom_autoname(doc, "autoname")
+
+    parent = {"parent_doctype": "Sales Invoice", "parent": "new-sales-invoice-1"}
+    yield "location_based_warehouse_query", _search(utils.location_based_warehouse_query, {"location": main})
+    yield "shipping_location_based_warehouse_query", _search(
+        utils.shipping_location_based_warehouse_query, {"shipping_location": other})
+    yield "dispatch_location_based_warehouse_query", _search(
+        utils.dispatch_location_based_warehouse_query, {"dispatch_location": other})
+    yield "child_table_warehouse_query", _search(
+        utils.child_table_warehouse_query, {**parent, "location": main})
+    yield "child_table_shipping_location_warehouse_query", _search(
+        utils.child_table_shipping_location_warehouse_query, {**parent, "shipping_location": other})
+    yield "child_table_dispatch_location_warehouse_query", _search(
+        utils.child_table_dispatch_location_warehouse_query, {**parent, "dispatch_location": other})
+    yield "get_location_snapshot", lambda: location_context.get_location_snapshot(main)
+
+
+def run(tree_sizes, row_counts, repeat, only=None):
+    results = {}
+    for tree_size in tree_sizes:
+        site = fixtures.build_site(tree_size, items=max(row_counts))
+        for name, fn in benchmarks_for_site(site, row_counts):
+            key = f"warehouses={tree_size} {name}"
+            if only and only not in key:
+                continue
+            results[key] = measure(fn, repeat)
+            _print_result(key, results[key])
+    return results
+
+
+def _print_result(key, result):
+    print(
+        f"{key:<90} cold {result['cold_ms']:>9.2f} ms {result['cold_queries']:>4} q"
+        f" | warm {result['warm_ms']:>9.2f} ms {result['warm_queries']:>4} q"
+        f" {result['warm_rows']:>6} rows | peak {result['peak_kib']:>9.1f} KiB"
+    )
+
+
+def compare(results, baseline):
+    """Return human-readable regressions of results against baseline."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("cold_queries", "warm_queries", "warm_rows"):
+            if result[metric] > base[metric]:
+                regressions.append(f"{key}: {metric} {base[metric]} -> {result[metric]}")
+        if result["warm_ms"] > base["warm_ms"] * (1 + TIME_TOLERANCE) and result["warm_ms"] - base["warm_ms"] > 1:
+            regressions.append(f"{key}: warm_ms {base['warm_ms']} -> {result['warm_ms']}")
+    return regressions
+
+
+def _baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small trees and documents only")
+    parser.add_argument("--repeat", type=int, default=5, help="warm runs per benchmark (median is reported)")
+    parser.add_argument("--only", help="run benchmarks whose name contains this text")
+    parser.add_argument("--save", metavar="NAME", help="store results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare against benchmarks/baselines/NAME.json")
+    args = parser.parse_args(argv)
+
+    tree_sizes = QUICK_TREE_SIZES if args.quick else TREE_SIZES
+    row_counts = QUICK_ROW_COUNTS if args.quick else ROW_COUNTS
+    results = run(tree_sizes, row_counts, max(args.repeat, 1), args.only)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(_baseline_path(args.save), "w") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "quick": args.quick,
+                    "repeat": args.repeat,
+                },
+                "results": results,
+            }, f, indent=1, sort_keys=True)
+        print(f"Saved {len(results)} results to {_baseline_path(args.save)}")
+
+    if args.compare:
+        with open(_baseline_path(args.compare)) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
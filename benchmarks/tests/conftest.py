@@ -0,0 +1,36 @@
+"""Unit tests of LBS hot paths against the in-memory Frappe stand-in.
+
+    python -m pytest benchmarks/tests
+
+fake_frappe is installed as `frappe` before any LBS module is imported, so
+these tests run without a bench. Every test starts from an empty site.
+"""
+
+import pytest
+
+from benchmarks import fake_frappe
+
+frappe = fake_frappe.install()
+
+from location_based_series import cache as lbs_cache  # noqa: E402
+from location_based_series import metrics  # noqa: E402
+from location_based_series import series  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_site():
+    frappe.db.tables.clear()
+    frappe.db.defaults.clear()
+    frappe.db.sql_handler = None
+    frappe.db.after_commit.reset()
+    frappe.db.after_rollback.reset()
+    frappe.cache().flushall()
+    frappe.conf.clear()
+    frappe.SCHEMA.clear()
+    lbs_cache._worker_cache.clear()
+    series._blocks.clear()
+    metrics._pending_counters.clear()
+    metrics._pending_histograms.clear()
+    metrics._last_flush.clear()
+    frappe.reset_local()
+    yield frappe
@@ -0,0 +1,53 @@
+import frappe
+import pytest
+
+from location_based_series.location_warehouses import rebuild_all_location_warehouses
+from location_based_series.utils import (
+    child_table_dispatch_location_warehouse_query,
+    child_table_shipping_location_warehouse_query,
+    child_table_warehouse_query,
+)
+
+
+@pytest.fixture(autouse=True)
+def locations():
+    frappe.SCHEMA["Sales Invoice"] = ("location", "dispatch_location")
+    for lft, location in ((1, "Mumbai"), (5, "Pune")):
+        frappe.db.insert("Warehouse", {"name": f"{location} - BC", "lft": lft, "rgt": lft + 3, "is_group": 1, "disabled": 0})
+        frappe.db.insert("Warehouse", {"name": f"{location} Stores - BC", "warehouse_name": f"{location} Stores",
+                                       "lft": lft + 1, "rgt": lft + 2, "is_group": 0, "disabled": 0})
+        frappe.db.insert("Location", {"name": location, "linked_warehouse": f"{location} - BC"})
+    rebuild_all_location_warehouses()
+    frappe.db.insert("Sales Invoice", {"name": "SINV-0001", "location": "Mumbai", "dispatch_location": "Pune"})
+
+
+def search(query, filters):
+    return [row[0] for row in query("Warehouse", "", "name", 0, 20, filters)]
+
+
+def test_location_sent_by_the_form_is_used_without_reading_the_parent():
+    frappe.db.reset_counters()
+    # An unsaved document, or one whose location was just changed
+    assert search(child_table_warehouse_query, {"location": "Pune", "parent_doctype": "Sales Invoice"}) == ["Pune Stores - BC"]
+    assert frappe.db.queries == 1
+
+
+def test_saved_parent_is_read_when_the_form_sends_no_location():
+    filters = {"parent_doctype": "Sales Invoice", "parent": "SINV-0001"}
+
+    assert search(child_table_warehouse_query, filters) == ["Mumbai Stores - BC"]
+    assert search(child_table_dispatch_location_warehouse_query, filters) == ["Pune Stores - BC"]
+
+
+def test_parent_without_the_location_field_offers_nothing():
+    # Sales Invoice has no shipping_location in this schema
+    filters = {"parent_doctype": "Sales Invoice", "parent": "SINV-0001"}
+
+    frappe.db.reset_counters()
+    assert search(child_table_shipping_location_warehouse_query, filters) == []
+    assert frappe.db.queries == 0
+
+
+def test_no_location_and_no_parent_offers_nothing():
+    assert search(child_table_warehouse_query, {}) == []
+    assert search(child_table_warehouse_query, {"parent_doctype": "Sales Invoice", "parent": "SINV-9999"}) == []
@@ -0,0 +1,77 @@
+import frappe
+import pytest
+
+from location_based_series.events.validation import validate_locked_fields
+
+
+def make_saved(doctype, docstatus, before, **changes):
+    """Return a saved document of doctype with changes applied over its previous values."""
+    doc = frappe.get_doc({"doctype": doctype, "name": f"{doctype}-0001", "docstatus": docstatus, **before, **changes})
+    doc._is_new = False
+    doc._doc_before_save = frappe.get_doc({"doctype": doctype, **before})
+    return doc
+
+
+PURCHASE = {"location": "Mumbai", "is_return": 0, "shipping_location": "Pune", "shipping_address": "Pune-Billing"}
+SALES = {"location": "Mumbai", "is_return": 0, "dispatch_location": "Pune", "dispatch_address_name": "Pune-Billing"}
+
+
+@pytest.mark.parametrize("field", ["shipping_location", "shipping_address"])
+def test_shipping_fields_are_locked_once_submitted(field):
+    doc = make_saved("Purchase Invoice", 1, PURCHASE, **{field: "Changed"})
+
+    with pytest.raises(frappe.ValidationError, match=field):
+        validate_locked_fields(doc)
+
+
+@pytest.mark.parametrize("field", ["dispatch_location", "dispatch_address_name"])
+def test_dispatch_fields_are_locked_once_submitted(field):
+    doc = make_saved("Delivery Note", 1, SALES, **{field: "Changed"})
+
+    with pytest.raises(frappe.ValidationError, match=field):
+        validate_locked_fields(doc)
+
+
+def test_drafts_may_change_shipping_and_dispatch():
+    validate_locked_fields(make_saved("Purchase Invoice", 0, PURCHASE, shipping_location="Changed"))
+    validate_locked_fields(make_saved("Sales Invoice", 0, SALES, dispatch_location="Changed"))
+
+
+def test_locks_follow_the_fields_a_doctype_has():
+    # Not one of the LBS transaction doctypes, but it carries shipping_location
+    doc = make_saved("Stock Entry", 1, {"shipping_location": "Pune"}, shipping_location="Changed")
+
+    with pytest.raises(frappe.ValidationError, match="shipping_location"):
+        validate_locked_fields(doc)
+
+
+def test_shipping_lock_needs_a_shipping_location():
+    before = dict(PURCHASE, shipping_location=None)
+    validate_locked_fields(make_saved("Purchase Invoice", 1, before, shipping_address="Changed"))
+
+
+@pytest.mark.parametrize("field, value", [("location", "Delhi"), ("is_return", 1)])
+def test_saved_document_fields_are_locked_in_draft(field, value):
+    doc = make_saved("Sales Invoice", 0, SALES, **{field: value})
+
+    with pytest.raises(frappe.ValidationError, match=field):
+        validate_locked_fields(doc)
+
+
+def test_saved_values_are_read_when_no_document_was_loaded():
+    frappe.db.insert("Sales Invoice", {"name": "Sales Invoice-0001", **SALES})
+    doc = make_saved("Sales Invoice", 0, SALES, location="Delhi")
+    doc._doc_before_save = None
+
+    frappe.db.reset_counters()
+    with pytest.raises(frappe.ValidationError, match="location"):
+        validate_locked_fields(doc)
+    assert frappe.db.queries == 1
+
+
+def test_unchanged_document_passes_without_queries():
+    doc = make_saved("Sales Invoice", 1, SALES)
+
+    frappe.db.reset_counters()
+    validate_locked_fields(doc)
+    assert frappe.db.queries == 0
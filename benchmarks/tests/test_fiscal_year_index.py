@@ -0,0 +1,60 @@
+import frappe
+
+from location_based_series.events.naming import clear_fiscal_year_index, get_fiscal_year_code
+
+COMPANY = "Bench Co"
+
+
+def add_fiscal_year(name, start, end, companies=(COMPANY,), disabled=0):
+    frappe.db.insert("Fiscal Year", {
+        "name": name, "year_start_date": start, "year_end_date": end, "disabled": disabled,
+    })
+    for company in companies:
+        frappe.db.insert("Fiscal Year Company", {"parent": name, "company": company})
+
+
+def test_code_is_the_covering_fiscal_year():
+    add_fiscal_year("2025-2026", "2025-04-01", "2026-03-31")
+    add_fiscal_year("2026-2027", "2026-04-01", "2027-03-31")
+
+    assert get_fiscal_year_code("2025-04-01", COMPANY) == "26"
+    assert get_fiscal_year_code("2026-03-31", COMPANY) == "26"
+    assert get_fiscal_year_code("2026-04-01", COMPANY) == "27"
+    assert get_fiscal_year_code("2027-03-31", COMPANY) == "27"
+
+
+def test_dates_outside_every_fiscal_year_are_00():
+    add_fiscal_year("2025-2026", "2025-04-01", "2026-03-31")
+    add_fiscal_year("2027-2028", "2027-04-01", "2028-03-31")
+
+    assert get_fiscal_year_code("2025-03-31", COMPANY) == "00"
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "00"
+    assert get_fiscal_year_code("2028-04-01", COMPANY) == "00"
+
+
+def test_year_linked_to_the_company_wins_an_overlap():
+    add_fiscal_year("2026", "2026-01-01", "2026-12-31", companies=(COMPANY,))
+    add_fiscal_year("2026-2027", "2026-04-01", "2027-03-31", companies=("Other Co",))
+
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "26"
+    # Without a linked year the latest-starting covering year wins
+    assert get_fiscal_year_code("2026-10-17", "Unlinked Co") == "27"
+
+
+def test_disabled_fiscal_years_are_ignored():
+    add_fiscal_year("2026-2027", "2026-04-01", "2027-03-31", disabled=1)
+
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "00"
+
+
+def test_index_is_built_once_and_rebuilt_after_clear():
+    add_fiscal_year("2025-2026", "2025-04-01", "2026-03-31")
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "00"
+
+    frappe.db.reset_counters()
+    add_fiscal_year("2026-2027", "2026-04-01", "2027-03-31")
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "00"
+    assert frappe.db.queries == 0
+
+    clear_fiscal_year_index()
+    assert get_fiscal_year_code("2026-10-17", COMPANY) == "27"
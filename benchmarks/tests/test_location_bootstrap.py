@@ -0,0 +1,67 @@
+import frappe
+
+from location_based_series import utils
+from location_based_series.location_warehouses import rebuild_all_location_warehouses
+from location_based_series.utils import get_location_bootstrap, get_location_warehouse_list
+
+
+def make_location(name, leaves, lft=1):
+    """Add a Location linked to a group warehouse spanning lft.. with the given leaves."""
+    rgt = lft + 2 * len(leaves) + 1
+    frappe.db.insert("Warehouse", {"name": f"{name} - BC", "lft": lft, "rgt": rgt, "is_group": 1, "disabled": 0})
+    for index, leaf in enumerate(leaves):
+        frappe.db.insert("Warehouse", {"name": leaf, "warehouse_name": leaf.split(" - ")[0],
+                                       "lft": lft + 2 * index + 1, "rgt": lft + 2 * index + 2,
+                                       "is_group": 0, "disabled": 0})
+    frappe.db.insert("Address", {"name": f"{name}-Billing", "gstin": "27AAACB1234C1Z5", "country": "India"})
+    frappe.db.insert("Location", {"name": name, "lbs_location_code": name[:3].upper(),
+                                  "linked_address": f"{name}-Billing", "linked_warehouse": f"{name} - BC"})
+    rebuild_all_location_warehouses()
+
+
+def test_one_response_carries_everything_a_form_needs():
+    make_location("Mumbai", ["Stores - BC", "Finished Goods - BC"])
+
+    data = get_location_bootstrap("Mumbai")
+
+    assert data["lbs_location_code"] == "MUM"
+    assert data["linked_address"] == "Mumbai-Billing"
+    assert data["addresses"] == ["Mumbai-Billing"]
+    assert data["warehouses"] == ["Finished Goods - BC", "Stores - BC"]
+    assert (data["warehouse_count"], data["default_warehouse"]) == (2, None)
+    assert data["place_of_supply"] == "27-Maharashtra"
+    assert data["warehouse_list"]["warehouses"] == [["Finished Goods - BC", "Finished Goods"], ["Stores - BC", "Stores"]]
+
+
+def test_single_warehouse_is_the_default():
+    make_location("Pune", ["Pune Stores - BC"])
+
+    data = get_location_bootstrap("Pune", "shipping")
+
+    assert data["location_type"] == "shipping"
+    assert data["default_warehouse"] == "Pune Stores - BC"
+
+
+def test_large_locations_send_only_a_count(monkeypatch):
+    monkeypatch.setattr(utils, "BOOTSTRAP_WAREHOUSE_LIMIT", 2)
+    make_location("Mumbai", ["A - BC", "B - BC", "C - BC"])
+
+    data = get_location_bootstrap("Mumbai")
+
+    assert (data["warehouses"], data["warehouse_count"], data["default_warehouse"]) == (None, 3, None)
+    assert data["warehouse_list"]["warehouses"] is None
+
+
+def test_unknown_location_returns_nothing():
+    assert get_location_bootstrap("Nowhere") == {}
+    assert get_location_bootstrap(None) == {}
+
+
+def test_warehouse_list_version_stamp_answers_not_modified():
+    make_location("Mumbai", ["Stores - BC"])
+    version = get_location_bootstrap("Mumbai")["warehouse_list"]["version"]
+
+    assert get_location_warehouse_list("Mumbai", version) == {"version": version, "not_modified": True}
+
+    make_location("Pune", ["Pune Stores - BC"], lft=100)
+    assert get_location_warehouse_list("Mumbai", version)["version"] != version
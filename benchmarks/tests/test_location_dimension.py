@@ -0,0 +1,61 @@
+import frappe
+import pytest
+
+from location_based_series.utils import (
+    clear_location_dimension_cache,
+    get_location_dimension,
+    validate_location_dimension,
+)
+
+
+def add_dimension(disabled=0):
+    frappe.db.insert("Accounting Dimension", {
+        "name": "Location", "document_type": "Location", "fieldname": "location", "disabled": disabled,
+    })
+
+
+def set_disabled(disabled):
+    frappe.db._table("Accounting Dimension")["Location"]["disabled"] = disabled
+
+
+def test_disabled_dimension_blocks_transactions():
+    add_dimension(disabled=1)
+
+    with pytest.raises(frappe.ValidationError, match="Accounting Dimension"):
+        validate_location_dimension()
+
+
+def test_status_is_read_once_per_site():
+    add_dimension()
+    validate_location_dimension()
+
+    frappe.db.reset_counters()
+    validate_location_dimension()
+    assert get_location_dimension() == {"enabled": 1, "name": "Location", "fieldname": "location"}
+    assert frappe.db.queries == 0
+
+
+def test_accounting_dimension_events_invalidate_the_status():
+    add_dimension()
+    validate_location_dimension()
+
+    set_disabled(1)
+    clear_location_dimension_cache()
+
+    with pytest.raises(frappe.ValidationError):
+        validate_location_dimension()
+
+
+def test_status_read_before_commit_is_dropped_again_after_commit():
+    add_dimension()
+    get_location_dimension()
+
+    set_disabled(1)
+    clear_location_dimension_cache()
+    # Another request reads the row before this transaction commits
+    set_disabled(0)
+    get_location_dimension()
+    set_disabled(1)
+    frappe.db.commit()
+
+    assert get_location_dimension()["enabled"] == 0
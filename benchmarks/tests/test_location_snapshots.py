@@ -0,0 +1,90 @@
+import threading
+
+import frappe
+import pytest
+
+from location_based_series import location_context
+from location_based_series.cache import get_worker_cached
+from location_based_series.location_context import (
+    clear_location_snapshots,
+    get_location_context,
+    get_location_snapshot,
+)
+
+
+@pytest.fixture(autouse=True)
+def locations():
+    frappe.db.insert("Address", {"name": "Mumbai-Billing", "gstin": "27AAACB1234C1Z5", "country": "India"})
+    frappe.db.insert("Location", {"name": "Mumbai", "lbs_location_code": "MUM",
+                                  "linked_address": "Mumbai-Billing", "linked_warehouse": "Mumbai - BC"})
+    frappe.db.insert("Location", {"name": "Pune", "lbs_location_code": "PUN",
+                                  "linked_address": "Missing", "linked_warehouse": "Pune - BC"})
+
+
+def test_snapshot_is_loaded_once_per_worker():
+    frappe.db.reset_counters()
+    assert get_location_snapshot("Mumbai").lbs_location_code == "MUM"
+    assert get_location_snapshot("Mumbai").linked_warehouse == "Mumbai - BC"
+
+    assert frappe.db.queries == 1
+
+
+def test_location_events_invalidate_snapshots():
+    get_location_snapshot("Mumbai")
+    frappe.db._table("Location")["Mumbai"]["lbs_location_code"] = "BOM"
+
+    clear_location_snapshots()
+
+    assert get_location_snapshot("Mumbai").lbs_location_code == "BOM"
+
+
+def test_least_recently_used_snapshot_is_evicted(monkeypatch):
+    monkeypatch.setattr(location_context, "LOCATION_SNAPSHOT_CACHE_SIZE", 1)
+    get_location_snapshot("Mumbai")
+    get_location_snapshot("Pune")
+
+    frappe.db.reset_counters()
+    get_location_snapshot("Pune")
+    assert frappe.db.queries == 0
+    get_location_snapshot("Mumbai")
+    assert frappe.db.queries == 1
+
+
+def test_warm_context_needs_no_query():
+    doc = frappe.get_doc({"doctype": "Sales Invoice", "location": "Mumbai", "shipping_location": "Delhi"})
+    get_location_context(doc)
+
+    frappe.db.reset_counters()
+    context = get_location_context(doc)
+
+    assert frappe.db.queries == 0
+    mumbai = context.get("Mumbai")
+    assert (mumbai.lbs_location_code, mumbai.address, mumbai.address_gstin) == ("MUM", "Mumbai-Billing", "27AAACB1234C1Z5")
+    assert context.get("Delhi") is None
+
+
+def test_missing_linked_address_has_no_details():
+    pune = get_location_context(frappe.get_doc({"doctype": "Sales Invoice", "location": "Pune"})).get("Pune")
+
+    assert (pune.linked_address, pune.address, pune.address_gstin) == ("Missing", None, None)
+
+
+def test_lru_is_shared_safely_between_threads():
+    errors = []
+
+    def worker(offset):
+        frappe.reset_local()
+        try:
+            for index in range(2000):
+                key = (index + offset) % 7
+                assert get_worker_cached("lru_threads", key, lambda: key * 10, maxsize=3) == key * 10
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
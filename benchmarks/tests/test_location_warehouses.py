@@ -0,0 +1,102 @@
+import frappe
+import pytest
+
+from location_based_series.location_warehouses import (
+    get_location_warehouses,
+    on_location_trash,
+    on_location_update,
+    on_warehouse_trash,
+    on_warehouse_update,
+    rebuild_all_location_warehouses,
+)
+
+# Mumbai - BC (1, 10)
+#   Stores - BC (2, 3)
+#   Racks - BC (4, 7)
+#     Rack A - BC (5, 6)
+#   Scrap - BC (8, 9)
+# Delhi - BC (11, 14)
+#   Delhi Stores - BC (12, 13)
+TREE = [
+    ("Mumbai - BC", 1, 10, 1),
+    ("Stores - BC", 2, 3, 0),
+    ("Racks - BC", 4, 7, 1),
+    ("Rack A - BC", 5, 6, 0),
+    ("Scrap - BC", 8, 9, 0),
+    ("Delhi - BC", 11, 14, 1),
+    ("Delhi Stores - BC", 12, 13, 0),
+]
+
+
+@pytest.fixture(autouse=True)
+def locations():
+    for name, lft, rgt, is_group in TREE:
+        frappe.db.insert("Warehouse", {"name": name, "lft": lft, "rgt": rgt, "is_group": is_group, "disabled": 0})
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Mumbai - BC"})
+    frappe.db.insert("Location", {"name": "Racks", "linked_warehouse": "Racks - BC"})
+    frappe.db.insert("Location", {"name": "Delhi", "linked_warehouse": "Delhi - BC"})
+    rebuild_all_location_warehouses()
+
+
+def set_values(doctype, name, **values):
+    frappe.db._table(doctype)[name].update(values)
+
+
+def update_warehouse(name, **values):
+    set_values("Warehouse", name, **values)
+    on_warehouse_update(frappe.get_doc("Warehouse", name))
+
+
+def test_rebuild_covers_every_linked_location():
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Scrap - BC", "Stores - BC"]
+    assert get_location_warehouses("Racks") == ["Rack A - BC"]
+    assert get_location_warehouses("Delhi") == ["Delhi Stores - BC"]
+
+
+def test_relinked_location_is_refreshed():
+    set_values("Location", "Racks", linked_warehouse="Delhi - BC")
+    on_location_update(frappe.get_doc("Location", "Racks"))
+
+    assert get_location_warehouses("Racks") == ["Delhi Stores - BC"]
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Scrap - BC", "Stores - BC"]
+
+
+def test_disabled_warehouse_leaves_every_location_listing_it():
+    update_warehouse("Rack A - BC", disabled=1)
+
+    assert get_location_warehouses("Mumbai") == ["Scrap - BC", "Stores - BC"]
+    assert get_location_warehouses("Racks") == []
+
+
+def test_re_enabled_warehouse_rejoins_its_ancestors():
+    update_warehouse("Rack A - BC", disabled=1)
+    update_warehouse("Rack A - BC", disabled=0)
+
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Scrap - BC", "Stores - BC"]
+    assert get_location_warehouses("Racks") == ["Rack A - BC"]
+
+
+def test_moved_warehouse_changes_location():
+    # Scrap - BC moved under Delhi - BC, as the NestedSet controller renumbers it
+    for name, lft, rgt in [("Scrap - BC", 12, 13), ("Delhi Stores - BC", 10, 11), ("Delhi - BC", 9, 14), ("Mumbai - BC", 1, 8)]:
+        set_values("Warehouse", name, lft=lft, rgt=rgt)
+    on_warehouse_update(frappe.get_doc("Warehouse", "Scrap - BC"))
+
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Stores - BC"]
+    assert get_location_warehouses("Delhi") == ["Delhi Stores - BC", "Scrap - BC"]
+
+
+def test_unrelated_locations_are_not_rebuilt():
+    frappe.db.reset_counters()
+    update_warehouse("Delhi Stores - BC", warehouse_name="Delhi Main")
+
+    assert frappe.db.queries < 10
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Scrap - BC", "Stores - BC"]
+
+
+def test_trashed_records_drop_their_rows():
+    on_warehouse_trash(frappe.get_doc("Warehouse", "Stores - BC"))
+    on_location_trash(frappe.get_doc("Location", "Racks"))
+
+    assert get_location_warehouses("Mumbai") == ["Rack A - BC", "Scrap - BC"]
+    assert get_location_warehouses("Racks") == []
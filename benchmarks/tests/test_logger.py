@@ -0,0 +1,78 @@
+import json
+import logging
+
+import frappe
+import pytest
+
+from location_based_series import logger as lbs_logger
+from location_based_series.logger import LOGGER_NAME, StructuredMessage, flush_logs, get_logger
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Lines written through the app logger's handlers, after the writer thread drained."""
+    monkeypatch.setattr(lbs_logger, "_sample_counters", {})
+    handler = ListHandler()
+    target = logging.getLogger(LOGGER_NAME)
+    target.addHandler(handler)
+
+    def lines():
+        flush_logs()
+        return handler.lines
+
+    yield lines
+    target.removeHandler(handler)
+    flush_logs()
+
+
+def test_records_below_the_site_level_are_skipped(written):
+    log = get_logger()
+    log.info("skipped")
+    log.warning("kept", doctype="Sales Order")
+
+    assert written() == [{"event": "kept", "doctype": "Sales Order", "site": "bench.local"}]
+    assert not log.is_enabled(logging.INFO)
+
+
+def test_developer_mode_and_site_config_set_the_level(written):
+    frappe.conf["developer_mode"] = 1
+    get_logger().debug("developer")
+
+    frappe.reset_local()
+    frappe.conf["lbs_log_level"] = "error"
+    get_logger().warning("skipped")
+    get_logger().error("configured")
+
+    assert [line["event"] for line in written()] == ["developer", "configured"]
+
+
+def test_sample_keeps_one_in_n_records(written):
+    for index in range(7):
+        get_logger().warning("autoname", sample=3, index=index)
+
+    assert [(line["index"], line["sampled"]) for line in written()] == [(0, 3), (3, 3), (6, 3)]
+
+
+def test_site_config_overrides_the_sample_rate(written):
+    frappe.conf["lbs_log_sampling"] = {"autoname": 1}
+    for index in range(3):
+        get_logger().warning("autoname", sample=100, index=index)
+
+    lines = written()
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert "sampled" not in lines[0]
+
+
+def test_structured_message_renders_compact_json():
+    message = StructuredMessage("series_block", {"key": "SO-", "size": 50, "at": frappe.utils.getdate("2026-10-17")})
+
+    assert str(message) == '{"event":"series_block","key":"SO-","size":50,"at":"2026-10-17"}'
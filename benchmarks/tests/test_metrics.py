@@ -0,0 +1,70 @@
+import inspect
+
+import frappe
+
+from location_based_series import metrics
+from location_based_series.metrics import (
+    AUTONAME_DURATION,
+    AUTONAME_TOTAL,
+    flush_metrics,
+    get_counter,
+    inc,
+    observe,
+    render_metrics,
+    reset_metrics,
+)
+
+
+def exposition():
+    flush_metrics()
+    return render_metrics(metrics._read_metrics())
+
+
+def test_recording_stays_in_worker_memory_until_flushed():
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+    observe(AUTONAME_DURATION, 0.003, doctype="Sales Invoice")
+    assert frappe.cache().store == {}
+
+    flush_metrics()
+    assert get_counter(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI") == 1
+
+
+def test_exposition_format():
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+    observe(AUTONAME_DURATION, 0.003, doctype="Sales Invoice")
+
+    lines = exposition().splitlines()
+
+    assert "# TYPE lbs_autoname_total counter" in lines
+    assert 'lbs_autoname_total{doctype="Sales Invoice",prefix="SI"} 2' in lines
+    assert "# TYPE lbs_autoname_duration_seconds histogram" in lines
+    assert 'lbs_autoname_duration_seconds_bucket{doctype="Sales Invoice",le="0.0025"} 0' in lines
+    assert 'lbs_autoname_duration_seconds_bucket{doctype="Sales Invoice",le="0.005"} 1' in lines
+    assert 'lbs_autoname_duration_seconds_bucket{doctype="Sales Invoice",le="+Inf"} 1' in lines
+    assert 'lbs_autoname_duration_seconds_count{doctype="Sales Invoice"} 1' in lines
+
+
+def test_label_values_are_escaped():
+    inc(AUTONAME_TOTAL, doctype='Sales "Invoice"', prefix="SI\\DR")
+
+    assert 'lbs_autoname_total{doctype="Sales \\"Invoice\\"",prefix="SI\\\\DR"} 1' in exposition()
+
+
+def test_counters_only_grow_across_scrapes():
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+    exposition()
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+
+    assert 'lbs_autoname_total{doctype="Sales Invoice",prefix="SI"} 2' in exposition()
+    # Scraping cannot reset the counters
+    assert list(inspect.signature(metrics.get_metrics).parameters) == []
+
+
+def test_maintenance_reset_deletes_every_metric():
+    inc(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI")
+    flush_metrics()
+
+    reset_metrics()
+
+    assert get_counter(AUTONAME_TOTAL, doctype="Sales Invoice", prefix="SI") == 0
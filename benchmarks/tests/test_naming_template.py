@@ -0,0 +1,104 @@
+import frappe
+import pytest
+
+from location_based_series.events.naming import (
+    DEFAULT_NAMING_TEMPLATES,
+    _get_naming_template,
+    clear_naming_template_registry,
+    compile_naming_template,
+    get_lbs_doctype_code,
+    validate_naming_template_parts,
+)
+
+
+def test_template_compiles_to_a_series_key():
+    compiled = compile_naming_template("SI.DR.{lbs_location_code}.{fiscal_year}.-.####", "DR")
+
+    assert compiled["series_key"]("MUM", "26") == "SIDRMUM26-"
+    assert compiled["digits"] == 4
+    assert compiled["prefix"] == "SI.DR"
+    assert compiled["lbs_doctype_code"] == "DR"
+
+
+@pytest.mark.parametrize("template", [
+    "SI.{lbs_location_code}.{fiscal_year}",
+    "SI.####.{fiscal_year}",
+    "SI.###.{fiscal_year}.-.####",
+    "SI.{branch}.####",
+])
+def test_invalid_templates_are_rejected(template):
+    with pytest.raises(frappe.ValidationError):
+        compile_naming_template(template)
+
+
+@pytest.mark.parametrize("template", ["SI.YY.-.####", "SI.{lbs_location_code}.MM.####", "SI.FY.####"])
+def test_make_autoname_date_tokens_are_rejected(template):
+    with pytest.raises(frappe.ValidationError):
+        validate_naming_template_parts(template, "Sales Invoice")
+
+
+def test_document_fieldnames_are_rejected():
+    frappe.SCHEMA["Sales Invoice"] = ("company", "posting_date")
+
+    with pytest.raises(frappe.ValidationError):
+        validate_naming_template_parts("SI.company.####", "Sales Invoice")
+
+
+def test_built_in_templates_are_valid():
+    for (doctype, _, _), (template, code) in DEFAULT_NAMING_TEMPLATES.items():
+        compile_naming_template(template, code)
+        validate_naming_template_parts(template, doctype)
+
+
+def test_enabled_records_override_built_in_templates():
+    frappe.db.insert("LBS Naming Template", {
+        "document_type": "Sales Order", "is_return": 0, "is_debit_note": 0,
+        "naming_template": "ORD.{lbs_location_code}.{fiscal_year}.-.#####", "lbs_doctype_code": "", "enabled": 1,
+    })
+    frappe.db.insert("LBS Naming Template", {
+        "document_type": "Purchase Order", "is_return": 0, "is_debit_note": 0,
+        "naming_template": "X.####", "lbs_doctype_code": "", "enabled": 0,
+    })
+    clear_naming_template_registry()
+
+    sales_order = _get_naming_template(frappe.get_doc({"doctype": "Sales Order"}))
+    assert sales_order["series_key"]("MUM", "26") == "ORDMUM26-"
+    assert sales_order["digits"] == 5
+
+    purchase_order = _get_naming_template(frappe.get_doc({"doctype": "Purchase Order"}))
+    assert purchase_order["template"] == DEFAULT_NAMING_TEMPLATES[("Purchase Order", 0, 0)][0]
+
+
+def test_flags_fall_back_to_the_template_without_them():
+    credit_note = frappe.get_doc({"doctype": "Sales Invoice", "is_return": 1})
+    debit_note = frappe.get_doc({"doctype": "Purchase Invoice", "is_return": 0, "is_debit_note": 1})
+
+    assert get_lbs_doctype_code(credit_note) == "CR"
+    assert _get_naming_template(debit_note)["prefix"] == "PI"
+    assert _get_naming_template(frappe.get_doc({"doctype": "Stock Entry"})) is None
+
+
+def test_dots_in_the_location_code_are_dropped():
+    compiled = compile_naming_template("SI.{lbs_location_code}.{fiscal_year}.-.####")
+
+    # As make_autoname did when it split the expanded pattern on "."
+    assert compiled["series_key"]("MUM.W", "26") == "SIMUMW26-"
+
+
+def test_invalid_record_falls_back_to_the_built_in_template():
+    frappe.db.insert("LBS Naming Template", {
+        "document_type": "Sales Order", "is_return": 0, "is_debit_note": 0,
+        "naming_template": "SO.{branch}.####", "lbs_doctype_code": "", "enabled": 1,
+    })
+    frappe.db.insert("LBS Naming Template", {
+        "document_type": "Stock Entry", "is_return": 0, "is_debit_note": 0,
+        "naming_template": "SE.####.{fiscal_year}", "lbs_doctype_code": "", "enabled": 1,
+    })
+    clear_naming_template_registry()
+
+    sales_order = _get_naming_template(frappe.get_doc({"doctype": "Sales Order"}))
+    assert sales_order["template"] == DEFAULT_NAMING_TEMPLATES[("Sales Order", 0, 0)][0]
+    # No built-in template to fall back to
+    assert _get_naming_template(frappe.get_doc({"doctype": "Stock Entry"})) is None
+    # Other templates are unaffected
+    assert _get_naming_template(frappe.get_doc({"doctype": "Sales Invoice"}))["prefix"] == "SI"
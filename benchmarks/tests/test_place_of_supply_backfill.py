@@ -0,0 +1,77 @@
+import frappe
+import pytest
+
+from location_based_series.place_of_supply_backfill import _watermark_key, backfill_place_of_supply
+
+ADDRESSES = {
+    "Mumbai-Billing": {"gstin": "27AAACB1234C1Z5", "country": "India"},
+    "Delhi-Billing": {"gstin": "07AAACB1234C1Z5", "country": "India"},
+    "London": {"country": "United Kingdom"},
+}
+
+
+@pytest.fixture(autouse=True)
+def invoices():
+    frappe.SCHEMA["Purchase Invoice"] = ("place_of_supply", "billing_address", "company_address")
+    for name, values in ADDRESSES.items():
+        frappe.db.insert("Address", {"name": name, **values})
+    for index, (billing, company) in enumerate([
+        ("Mumbai-Billing", None),
+        (None, "Delhi-Billing"),
+        ("London", "Mumbai-Billing"),
+        ("Delhi-Billing", None),
+        (None, None),
+    ], start=1):
+        frappe.db.insert("Purchase Invoice", {
+            "name": f"PI-{index:03}", "billing_address": billing, "company_address": company,
+            "place_of_supply": "07-Delhi" if index == 4 else None,
+        })
+
+
+def places_of_supply():
+    return [row.place_of_supply for row in frappe.get_all("Purchase Invoice", fields=["place_of_supply"], order_by="name")]
+
+
+def test_documents_get_the_place_of_supply_of_their_address():
+    stats = backfill_place_of_supply(["Purchase Invoice"], chunk_size=2)
+
+    assert stats == {"Purchase Invoice": {"scanned": 5, "updated": 3}}
+    assert places_of_supply() == ["27-Maharashtra", "07-Delhi", "96-Other Countries", "07-Delhi", None]
+    # Fully scanned, so the next run starts over
+    assert frappe.db.get_default(_watermark_key("Purchase Invoice")) is None
+
+
+def test_dry_run_writes_nothing():
+    stats = backfill_place_of_supply(["Purchase Invoice"], chunk_size=2, dry_run=True)
+
+    assert stats == {"Purchase Invoice": {"scanned": 5, "updated": 3}}
+    assert places_of_supply() == [None, None, None, "07-Delhi", None]
+    assert frappe.db.defaults == {}
+
+
+def test_interrupted_run_resumes_after_the_last_committed_chunk():
+    frappe.db.set_default(_watermark_key("Purchase Invoice"), "PI-002")
+
+    stats = backfill_place_of_supply(["Purchase Invoice"], chunk_size=2)
+
+    assert stats["Purchase Invoice"]["scanned"] == 3
+    assert places_of_supply() == [None, None, "96-Other Countries", "07-Delhi", None]
+
+
+def test_restart_ignores_the_resume_point():
+    frappe.db.set_default(_watermark_key("Purchase Invoice"), "PI-002")
+
+    stats = backfill_place_of_supply(["Purchase Invoice"], chunk_size=2, restart=True)
+
+    assert stats["Purchase Invoice"]["scanned"] == 5
+
+
+def test_only_referenced_addresses_are_resolved():
+    frappe.db.insert("Address", {"name": "Unused", "gstin": "29AAACB1234C1Z5", "country": "India"})
+
+    backfill_place_of_supply(["Purchase Invoice"], chunk_size=2)
+
+    # Resolved addresses land in the place of supply cache; unreferenced ones are never read
+    cache = frappe.cache()
+    assert cache.get_value("lbs_address_gst::London")["place_of_supply"] == "96-Other Countries"
+    assert cache.get_value("lbs_address_gst::Unused") is None
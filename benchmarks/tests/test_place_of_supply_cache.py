@@ -0,0 +1,101 @@
+import frappe
+
+from location_based_series import utils
+from location_based_series.utils import (
+    PLACE_OF_SUPPLY_CACHE_TTL,
+    clear_place_of_supply_cache,
+    get_place_of_supply_details,
+    get_place_of_supply_for_addresses,
+)
+
+
+def add_address(name, **fields):
+    frappe.db.insert("Address", {
+        "name": name, "gstin": None, "gst_state_number": None, "gst_state": None,
+        "state": None, "country": "India", **fields,
+    })
+
+
+def test_details_are_resolved_from_the_address():
+    add_address("Delhi Office", gstin="07AAACB1234C1Z5")
+    add_address("Pune Office", state="Maharashtra")
+    add_address("Dubai Office", country="United Arab Emirates")
+
+    result = get_place_of_supply_for_addresses(["Delhi Office", "Pune Office", "Dubai Office", "Missing", None])
+
+    assert result == {
+        "Delhi Office": {"place_of_supply": "07-Delhi", "state_code": "07", "gstin": "07AAACB1234C1Z5"},
+        "Pune Office": {"place_of_supply": "27-Maharashtra", "state_code": None, "gstin": None},
+        "Dubai Office": {"place_of_supply": "96-Other Countries", "state_code": None, "gstin": None},
+    }
+    assert get_place_of_supply_details("Missing") == {"place_of_supply": None, "state_code": None, "gstin": None}
+
+
+def test_cached_addresses_are_read_with_one_mget():
+    for index in range(5):
+        add_address(f"Office {index}", state="Maharashtra")
+    names = [f"Office {index}" for index in range(5)]
+    get_place_of_supply_for_addresses(names)
+
+    frappe.db.reset_counters()
+    cache = frappe.cache()
+    reads = cache.reads
+    result = get_place_of_supply_for_addresses(names)
+
+    assert set(result) == set(names)
+    assert frappe.db.queries == 0
+    assert cache.reads - reads == 1
+
+
+def test_only_addresses_missing_from_the_cache_are_queried():
+    add_address("Cached", state="Maharashtra")
+    add_address("Fresh", state="Kerala")
+    get_place_of_supply_for_addresses(["Cached"])
+
+    frappe.db.reset_counters()
+    result = get_place_of_supply_for_addresses(["Cached", "Fresh"])
+
+    assert result["Fresh"]["place_of_supply"] == "32-Kerala"
+    assert frappe.db.queries == 1
+
+
+def test_each_address_is_cached_with_a_ttl(monkeypatch):
+    add_address("Delhi Office", state="Delhi")
+    calls = []
+    cache = frappe.cache()
+    set_value = cache.set_value
+
+    def record(key, value, expires_in_sec=None, **kwargs):
+        calls.append((key, expires_in_sec))
+        set_value(key, value, expires_in_sec=expires_in_sec, **kwargs)
+
+    monkeypatch.setattr(cache, "set_value", record)
+    get_place_of_supply_details("Delhi Office")
+
+    assert calls == [(utils._place_of_supply_key("Delhi Office"), PLACE_OF_SUPPLY_CACHE_TTL)]
+
+
+def test_address_update_clears_the_cached_details_now_and_after_commit():
+    add_address("Delhi Office", state="Delhi")
+    assert get_place_of_supply_details("Delhi Office")["place_of_supply"] == "07-Delhi"
+
+    frappe.db._table("Address")["Delhi Office"]["state"] = "Haryana"
+    clear_place_of_supply_cache(frappe._dict(name="Delhi Office"), "on_update")
+    assert get_place_of_supply_details("Delhi Office")["place_of_supply"] == "06-Haryana"
+
+    # A request that read the old row before the commit cached stale details
+    frappe.cache().set_value(utils._place_of_supply_key("Delhi Office"), {"place_of_supply": "07-Delhi"})
+    frappe.db.commit()
+    assert get_place_of_supply_details("Delhi Office")["place_of_supply"] == "06-Haryana"
+
+
+def test_rename_clears_the_old_and_new_names():
+    add_address("Old Office", state="Delhi")
+    get_place_of_supply_details("Old Office")
+    frappe.cache().set_value(utils._place_of_supply_key("New Office"), {"place_of_supply": "stale"})
+
+    clear_place_of_supply_cache(frappe._dict(name="New Office"), "after_rename", "Old Office", "New Office", False)
+
+    cache = frappe.cache()
+    assert cache.get_value(utils._place_of_supply_key("Old Office")) is None
+    assert cache.get_value(utils._place_of_supply_key("New Office")) is None
@@ -0,0 +1,111 @@
+import importlib
+import sys
+import types
+
+import frappe
+import pytest
+
+
+class TransactionLost(Exception):
+    """Raised by the stand-in database once a deadlock rolled the transaction back."""
+
+
+@pytest.fixture
+def transaction(monkeypatch):
+    """Record commits and rollbacks; a savepoint rollback fails once the transaction is lost."""
+    events = []
+    state = {"lost": False}
+
+    def rollback(save_point=None):
+        if save_point and state["lost"]:
+            raise TransactionLost(save_point)
+        events.append(f"rollback {save_point}" if save_point else "rollback")
+        state["lost"] = False
+
+    monkeypatch.setattr(frappe.db, "commit", lambda: events.append("commit"))
+    monkeypatch.setattr(frappe.db, "rollback", rollback)
+    return events, state
+
+
+@pytest.fixture
+def override(monkeypatch, transaction):
+    """The POS override with posawesome replaced and invoice saves scripted per item."""
+    for name in ("posawesome", "posawesome.posawesome", "posawesome.posawesome.api"):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    posapp = types.ModuleType("posawesome.posawesome.api.posapp")
+    posapp.add_taxes_from_tax_template = lambda item, parent_doc: None
+    monkeypatch.setitem(sys.modules, posapp.__name__, posapp)
+    monkeypatch.delitem(sys.modules, "location_based_series.patches.override_posawesome", raising=False)
+    module = importlib.import_module("location_based_series.patches.override_posawesome")
+
+    frappe.db.insert("Accounting Dimension", {
+        "name": "Location", "document_type": "Location", "fieldname": "location", "disabled": 0,
+    })
+
+    _, state = transaction
+
+    def update_invoice(data):
+        if data.get("error") == "deadlock":
+            # The database rolled the whole transaction back
+            state["lost"] = True
+            raise TransactionLost("Deadlock found")
+        if data.get("error"):
+            raise frappe.ValidationError(data["error"])
+        return frappe.get_doc({"doctype": "Sales Invoice", "name": data["name"]})
+
+    monkeypatch.setattr(module, "_update_invoice", update_invoice)
+    return module
+
+
+def invoices(count, failures=None):
+    return [{"name": f"POS-{index}", **({"error": failures[index]} if index in (failures or {}) else {})}
+            for index in range(count)]
+
+
+def statuses(results):
+    return [result["status"] for result in results]
+
+
+def test_one_bad_invoice_does_not_undo_the_others(override, transaction):
+    events, _ = transaction
+
+    results = override.update_invoices(invoices(3, {1: "Rate cannot be zero"}))
+
+    assert statuses(results) == ["Saved", "Failed", "Saved"]
+    assert results[1]["error"] == "Rate cannot be zero"
+    assert [result.get("name") for result in results] == ["POS-0", None, "POS-2"]
+    assert events == ["rollback lbs_pos_batch"]
+
+
+def test_work_is_committed_every_batch_commit_size_invoices(override, transaction, monkeypatch):
+    events, _ = transaction
+    monkeypatch.setattr(override, "BATCH_COMMIT_SIZE", 2)
+
+    override.update_invoices(invoices(5))
+
+    assert events == ["commit", "commit"]
+
+
+def test_lost_transaction_fails_every_uncommitted_invoice(override, transaction, monkeypatch):
+    events, _ = transaction
+    monkeypatch.setattr(override, "BATCH_COMMIT_SIZE", 2)
+
+    # POS-2 is saved after the first commit, then POS-3 deadlocks
+    results = override.update_invoices(invoices(5, {3: "deadlock"}))
+
+    assert statuses(results) == ["Saved", "Saved", "Failed", "Failed", "Saved"]
+    assert results[2]["error"] == "Rolled back with invoice 3: Deadlock found"
+    assert "name" not in results[2]
+    # The batch continues in a fresh transaction
+    assert events == ["commit", "rollback", "commit"]
+
+
+def test_batch_size_is_capped(override, monkeypatch):
+    monkeypatch.setattr(override, "MAX_BATCH_INVOICES", 2)
+
+    with pytest.raises(frappe.ValidationError, match="At most 2"):
+        override.update_invoices(invoices(3))
+
+
+def test_invoices_may_be_sent_as_json(override, transaction):
+    assert statuses(override.update_invoices('[{"name": "POS-0"}]')) == ["Saved"]
@@ -0,0 +1,97 @@
+import importlib
+import json
+import sys
+import types
+
+import frappe
+import pytest
+
+# Tax accounts of each Item Tax Template; item_tax_rate is derived from them
+TEMPLATES = {
+    "GST 5%": {"Output CGST - BC": 2.5, "Output SGST - BC": 2.5},
+    "GST 18%": {"Output CGST - BC": 9, "Output SGST - BC": 9},
+    "IGST 18%": {"Output IGST - BC": 18},
+}
+
+
+def add_tax_rows(parent_doc, tax_types):
+    """The row-adding loop shared by both add_taxes_from_tax_template variants."""
+    for tax_type in tax_types:
+        if tax_type not in [tax.account_head for tax in parent_doc.taxes]:
+            parent_doc.taxes.append(frappe.get_doc({"account_head": tax_type, "charge_type": "On Net Total"}))
+
+
+def from_item_tax_rate(item, parent_doc):
+    """posawesome releases that read the item's item_tax_rate JSON."""
+    if item.get("item_tax_rate"):
+        add_tax_rows(parent_doc, json.loads(item.get("item_tax_rate")))
+
+
+def from_item_tax_template(item, parent_doc):
+    """posawesome releases that read the Item Tax Template Detail rows."""
+    if item.get("item_tax_template"):
+        add_tax_rows(parent_doc, TEMPLATES[item.get("item_tax_template")])
+
+
+@pytest.fixture(params=[from_item_tax_rate, from_item_tax_template], ids=["item_tax_rate", "item_tax_template"])
+def upstream(request, monkeypatch):
+    """Load the override against one add_taxes_from_tax_template variant, counting calls."""
+    calls = []
+
+    def add_taxes_from_tax_template(item, parent_doc):
+        calls.append(item)
+        request.param(item, parent_doc)
+
+    for name in ("posawesome", "posawesome.posawesome", "posawesome.posawesome.api"):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    posapp = types.ModuleType("posawesome.posawesome.api.posapp")
+    posapp.add_taxes_from_tax_template = add_taxes_from_tax_template
+    monkeypatch.setitem(sys.modules, posapp.__name__, posapp)
+    monkeypatch.delitem(sys.modules, "location_based_series.patches.override_posawesome", raising=False)
+
+    override = importlib.import_module("location_based_series.patches.override_posawesome")
+    return override, add_taxes_from_tax_template, calls
+
+
+def make_invoice(taxes=()):
+    items = []
+    for index in range(40):
+        template = ["GST 5%", "GST 18%", None, "IGST 18%"][index % 4]
+        items.append({
+            "item_code": f"ITEM-{index}",
+            "item_tax_template": template,
+            "item_tax_rate": json.dumps(TEMPLATES[template]) if template else None,
+        })
+    # A line with rates but no template, and one without either
+    items.append({"item_code": "LOOSE", "item_tax_template": None, "item_tax_rate": json.dumps({"Cess - BC": 1})})
+    items.append({"item_code": "EXEMPT", "item_tax_template": None, "item_tax_rate": None})
+    return frappe.get_doc({"doctype": "Sales Invoice", "items": items,
+                           "taxes": [{"account_head": account} for account in taxes]})
+
+
+def account_heads(invoice):
+    return [tax.account_head for tax in invoice.taxes]
+
+
+def test_grouped_taxes_match_one_call_per_item(upstream):
+    override, add_taxes_from_tax_template, calls = upstream
+    per_item = make_invoice()
+    for item in per_item.items:
+        add_taxes_from_tax_template(item, per_item)
+    calls.clear()
+
+    grouped = make_invoice()
+    override._add_taxes_from_tax_templates(grouped)
+
+    assert account_heads(grouped) == account_heads(per_item)
+    assert len(calls) <= 4
+
+
+def test_pairs_already_on_the_invoice_are_skipped(upstream):
+    override, _, calls = upstream
+    invoice = make_invoice(taxes=["Output CGST - BC", "Output SGST - BC", "Output IGST - BC"])
+
+    override._add_taxes_from_tax_templates(invoice)
+
+    # Only the rates-only line names an account the invoice lacks
+    assert [item.item_code for item in calls] == ["LOOSE"]
@@ -0,0 +1,63 @@
+import frappe
+import pytest
+
+from location_based_series.pos_profile import clear_pos_profile_cache, get_pos_profile_context
+from location_based_series.utils import clear_location_dimension_cache
+
+
+@pytest.fixture(autouse=True)
+def profile():
+    frappe.db.insert("Accounting Dimension", {
+        "name": "Location", "document_type": "Location", "fieldname": "location", "disabled": 0,
+    })
+    frappe.db.insert("Location", {"name": "Mumbai", "lbs_location_code": "MUM", "linked_address": "Mumbai-Billing"})
+    frappe.db.insert("POS Profile", {
+        "name": "Counter 1", "location": "Mumbai", "lbs_location": "Pune",
+        "posa_tax_inclusive": 1, "posa_allow_zero_rated_items": 0,
+    })
+
+
+def test_profile_resolves_location_code_and_flags():
+    context = get_pos_profile_context("Counter 1")
+
+    assert (context.location, context.lbs_location_code, context.linked_address) == ("Mumbai", "MUM", "Mumbai-Billing")
+    assert (context.tax_inclusive, context.allow_zero_rated_items) == (1, 0)
+
+
+def test_profile_is_resolved_once_per_worker():
+    get_pos_profile_context("Counter 1")
+
+    frappe.db.reset_counters()
+    get_pos_profile_context("Counter 1")
+    assert frappe.db.queries == 0
+
+
+def test_profile_events_invalidate_the_context():
+    get_pos_profile_context("Counter 1")
+    frappe.db._table("POS Profile")["Counter 1"]["posa_tax_inclusive"] = 0
+
+    clear_pos_profile_cache()
+
+    assert get_pos_profile_context("Counter 1").tax_inclusive == 0
+
+
+def test_location_is_read_from_the_current_dimension_field():
+    get_pos_profile_context("Counter 1")
+    frappe.db._table("Accounting Dimension")["Location"]["fieldname"] = "lbs_location"
+    clear_location_dimension_cache()
+
+    # Keyed by the fieldname, so no POS Profile event is needed
+    assert get_pos_profile_context("Counter 1").location == "Pune"
+
+
+def test_without_the_dimension_the_profile_has_no_location():
+    frappe.db._table("Accounting Dimension")["Location"]["disabled"] = 1
+    clear_location_dimension_cache()
+
+    context = get_pos_profile_context("Counter 1")
+    assert (context.location, context.lbs_location_code, context.tax_inclusive) == (None, None, 1)
+
+
+def test_unknown_profile():
+    assert get_pos_profile_context("Counter 9") is None
+    assert get_pos_profile_context(None) is None
@@ -0,0 +1,76 @@
+import frappe
+import pytest
+
+from location_based_series.logger import get_logger
+from location_based_series.query_budget import QueryBudgetExceeded, query_budget, query_budget_step
+
+
+@pytest.fixture
+def warnings(monkeypatch):
+    records = []
+    monkeypatch.setattr(type(get_logger()), "warning",
+                        lambda self, event, sample=None, **fields: records.append((event, fields)))
+    return records
+
+
+def run_queries(count):
+    for _ in range(count):
+        frappe.db.get_value("Location", "Mumbai", "lbs_location_code")
+
+
+def test_counting_is_off_by_default():
+    with query_budget_step("validate_doc") as usage:
+        run_queries(1)
+
+    assert usage is None
+
+
+def test_steps_count_queries_and_cache_reads():
+    frappe.conf["lbs_query_budget"] = {"enabled": 1}
+
+    with query_budget_step("validate_doc") as usage:
+        run_queries(3)
+        frappe.cache().get_value("lbs_key")
+
+    assert (usage["queries"], usage["cache_reads"]) == (3, 1)
+
+
+def test_nested_steps_count_towards_the_outer_budget():
+    frappe.conf["lbs_query_budget"] = {"enabled": 1}
+
+    with query_budget_step("update_invoice") as outer:
+        run_queries(1)
+        with query_budget_step("validate_doc") as inner:
+            run_queries(2)
+
+    assert (outer["queries"], inner["queries"]) == (3, 2)
+
+
+def test_exceeded_budget_only_warns_in_developer_mode(warnings):
+    frappe.conf.update({"developer_mode": 1, "lbs_query_budget": {"validate_doc": {"queries": 2}}})
+
+    @query_budget("validate_doc")
+    def validate():
+        run_queries(3)
+        return "saved"
+
+    assert validate() == "saved"
+    assert warnings[0][0] == "query_budget_exceeded"
+    assert warnings[0][1]["exceeded"] == ["queries 3 > 2"]
+
+
+def test_enforced_budget_raises(warnings):
+    frappe.conf["lbs_query_budget"] = {"enabled": 1, "enforce": 1, "custom_autoname": {"queries": 1}}
+
+    with pytest.raises(QueryBudgetExceeded, match="custom_autoname"):
+        with query_budget_step("custom_autoname"):
+            run_queries(2)
+
+
+def test_steps_within_budget_pass_silently(warnings):
+    frappe.conf["lbs_query_budget"] = {"enabled": 1, "enforce": 1}
+
+    with query_budget_step("validate_doc"):
+        run_queries(2)
+
+    assert warnings == []
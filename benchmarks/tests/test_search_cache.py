@@ -0,0 +1,84 @@
+import frappe
+
+from location_based_series import metrics, search_cache
+from location_based_series.location_warehouses import rebuild_all_location_warehouses, rebuild_location_warehouses
+from location_based_series.utils import get_location_warehouse_list
+
+
+def search(calls, txt="st"):
+    def generator():
+        calls.append(txt)
+        return [("Stores - BC", "Stores")]
+    return search_cache.get_cached_search_result("main", "Mumbai", "Warehouse", txt, 0, 20, generator)
+
+
+def test_repeated_search_is_served_from_the_cache():
+    calls = []
+    assert search(calls) == [["Stores - BC", "Stores"]]
+    assert search(calls) == [["Stores - BC", "Stores"]]
+    search(calls, txt="fin")
+
+    assert calls == ["st", "fin"]
+    stats = search_cache.get_search_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 2, 0.3333)
+
+
+def test_clearing_replaces_the_version_and_orphans_cached_pages():
+    calls = []
+    search(calls)
+    version = search_cache.get_search_cache_version()
+
+    search_cache.clear_search_cache()
+    search(calls)
+
+    assert search_cache.get_search_cache_version() != version
+    assert calls == ["st", "st"]
+
+
+def test_lookups_cost_no_redis_write_until_the_metrics_flush():
+    search([])
+    writes = dict(frappe.cache().store)
+
+    search([])
+    assert frappe.cache().store == writes
+
+
+def test_stats_reset():
+    search([])
+    search([])
+
+    search_cache.get_search_cache_stats(reset=1)
+    search([])
+    assert search_cache.get_search_cache_stats()["hits"] == 1
+
+    # The exported counter keeps counting across stats resets
+    assert metrics.get_counter(metrics.SEARCH_CACHE_TOTAL, result="hit") == 2
+
+
+def add_location():
+    frappe.db.insert("Warehouse", {"name": "Mumbai - BC", "lft": 1, "rgt": 4, "is_group": 1, "disabled": 0})
+    frappe.db.insert("Warehouse", {
+        "name": "Stores - BC", "warehouse_name": "Stores", "lft": 2, "rgt": 3, "is_group": 0, "disabled": 0,
+    })
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Mumbai - BC"})
+
+
+def test_rebuilding_one_location_invalidates_searches_and_client_lists():
+    add_location()
+    listed = get_location_warehouse_list("Mumbai")
+    assert get_location_warehouse_list("Mumbai", listed["version"]) == {"version": listed["version"], "not_modified": 1}
+
+    rebuild_location_warehouses("Mumbai")
+
+    refreshed = get_location_warehouse_list("Mumbai", listed["version"])
+    assert refreshed["version"] != listed["version"]
+    assert refreshed["warehouses"] == [["Stores - BC", "Stores"]]
+
+
+def test_rebuilding_every_location_invalidates_searches():
+    add_location()
+    version = search_cache.get_search_cache_version()
+
+    rebuild_all_location_warehouses()
+
+    assert search_cache.get_search_cache_version() != version
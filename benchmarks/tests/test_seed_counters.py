@@ -0,0 +1,86 @@
+import frappe
+import pytest
+
+from location_based_series.patches import seed_dbn_cdn_counters
+
+
+def _in_range(name, pattern, after, upto=None):
+    return name.startswith(pattern.rstrip("%")) and name > after and (upto is None or name <= upto)
+
+
+def seed_sql(query, values):
+    """The tabSeries statements of the seed patch, on the fake Series table."""
+    table = frappe.db._table("Series")
+    query = " ".join(query.split())
+    if query.startswith("SELECT COUNT(*) FROM `tabSeries`"):
+        return ((sum(1 for name in table if _in_range(name, values[0], "")),),)
+    if query.startswith("SELECT name FROM `tabSeries`"):
+        pattern, after, limit = values
+        return tuple((name,) for name in sorted(table) if _in_range(name, pattern, after))[:limit]
+    if query.startswith("INSERT INTO `tabSeries`"):
+        sources = [row for name, row in sorted(table.items())
+                   if _in_range(name, values["pattern"], values["after"], values["upto"])]
+        for row in sources:
+            key = values["new_prefix"] + row["name"][values["offset"] - 1:]
+            current = row["current"] or 0
+            if key in table:
+                table[key]["current"] = max(table[key]["current"] or 0, current)
+            else:
+                frappe.db.insert("Series", {"name": key, "current": current})
+        return ()
+    raise NotImplementedError(query)
+
+
+@pytest.fixture(autouse=True)
+def series_table(monkeypatch):
+    frappe.db.sql_handler = seed_sql
+    commits = []
+    monkeypatch.setattr(frappe.db, "commit", lambda: commits.append(dict(counters())))
+    return commits
+
+
+def counters():
+    return {name: row["current"] for name, row in frappe.db._table("Series").items()}
+
+
+def test_new_prefixes_continue_from_the_old_counters():
+    frappe.db.insert("Series", {"name": "DN-MUM-26-", "current": 41})
+    frappe.db.insert("Series", {"name": "CN-MUM-26-", "current": 7})
+    frappe.db.insert("Series", {"name": "CN-PUN-26-", "current": None})
+    frappe.db.insert("Series", {"name": "SO-MUM-26-", "current": 90})
+
+    seed_dbn_cdn_counters.execute()
+
+    assert counters() == {
+        "DN-MUM-26-": 41, "CN-MUM-26-": 7, "CN-PUN-26-": None, "SO-MUM-26-": 90,
+        "DBN-MUM-26-": 41, "CDN-MUM-26-": 7, "CDN-PUN-26-": 0,
+    }
+
+
+def test_existing_counters_are_only_raised():
+    frappe.db.insert("Series", {"name": "CN-MUM-26-", "current": 7})
+    frappe.db.insert("Series", {"name": "CN-PUN-26-", "current": 7})
+    frappe.db.insert("Series", {"name": "CDN-MUM-26-", "current": 12})
+    frappe.db.insert("Series", {"name": "CDN-PUN-26-", "current": 3})
+
+    seed_dbn_cdn_counters.execute()
+    seed_dbn_cdn_counters.execute()
+
+    assert counters()["CDN-MUM-26-"] == 12
+    assert counters()["CDN-PUN-26-"] == 7
+
+
+def test_each_batch_is_committed_on_its_own(series_table, monkeypatch):
+    monkeypatch.setattr(seed_dbn_cdn_counters, "BATCH_SIZE", 2)
+    for index in range(5):
+        frappe.db.insert("Series", {"name": f"DN-L{index}-26-", "current": index + 1})
+
+    seed_dbn_cdn_counters.execute()
+
+    seeded = [sorted(name for name in snapshot if name.startswith("DBN-")) for snapshot in series_table]
+    assert seeded == [
+        ["DBN-L0-26-", "DBN-L1-26-"],
+        ["DBN-L0-26-", "DBN-L1-26-", "DBN-L2-26-", "DBN-L3-26-"],
+        ["DBN-L0-26-", "DBN-L1-26-", "DBN-L2-26-", "DBN-L3-26-", "DBN-L4-26-"],
+    ]
+    assert counters()["DBN-L4-26-"] == 5
@@ -0,0 +1,136 @@
+import threading
+
+import frappe
+import pytest
+
+from location_based_series import series
+from location_based_series.series import (
+    LIVE_BLOCKS_CACHE_KEY,
+    get_next_series_value,
+    get_series_block_size,
+    reconcile_block_series,
+)
+
+KEY = "SOMUM26-"
+
+
+def series_sql(query, values):
+    """The tabSeries statements of series._reserve_block, on the fake Series table."""
+    table = frappe.db._table("Series")
+    query = " ".join(query.split())
+    if query.startswith("SELECT `current` FROM `tabSeries`"):
+        row = table.get(values[0])
+        return ((row["current"],),) if row else ()
+    if query.startswith("UPDATE `tabSeries`"):
+        size, key = values
+        table[key]["current"] += size
+        return ()
+    if query.startswith("INSERT INTO `tabSeries`"):
+        key, current = values
+        frappe.db.insert("Series", {"name": key, "current": current})
+        return ()
+    raise NotImplementedError(query)
+
+
+@pytest.fixture(autouse=True)
+def block_series():
+    frappe.db.sql_handler = series_sql
+    frappe.conf["lbs_series_block_size"] = {"Sales Order": 3, "Sales Invoice": 3}
+
+
+def next_value():
+    return get_next_series_value(KEY, 3, 3, "Sales Order")
+
+
+def series_current():
+    return frappe.db._table("Series")[KEY]["current"]
+
+
+def in_other_request(fn):
+    """Run fn as a request of another thread of the same worker."""
+    result = []
+
+    def request():
+        frappe.reset_local()
+        result.append(fn())
+        frappe.db.commit()
+
+    thread = threading.Thread(target=request)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_strict_doctypes_never_use_blocks():
+    assert get_series_block_size("Sales Order") == 3
+    assert get_series_block_size("Sales Invoice") == 0
+    assert get_series_block_size("Purchase Order") == 0
+
+
+def test_one_reservation_serves_a_whole_block():
+    assert [next_value() for _ in range(3)] == ["001", "002", "003"]
+    assert series_current() == 3
+
+    assert next_value() == "004"
+    assert series_current() == 6
+
+
+def test_uncommitted_block_is_not_shared():
+    assert next_value() == "001"
+
+    # Another request must not take numbers a rollback of this one would reuse
+    assert in_other_request(next_value) == "004"
+
+
+def test_committed_blocks_are_used_in_turn():
+    assert next_value() == "001"
+    assert in_other_request(next_value) == "004"
+    frappe.db.commit()
+
+    # Both blocks are kept; the one committed first is used first
+    frappe.reset_local()
+    assert [next_value() for _ in range(5)] == ["005", "006", "002", "003", "007"]
+
+
+def test_rolled_back_block_is_dropped():
+    next_value()
+    frappe.db.rollback()
+
+    assert series._blocks == {}
+    assert series._get_pending_blocks() == {}
+
+
+def test_block_lost_with_a_savepoint_is_not_shared():
+    next_value()
+    # A savepoint rollback undid the counter update without after_rollback
+    frappe.db._table("Series")[KEY]["current"] = 0
+    frappe.db.commit()
+
+    assert series._blocks == {}
+
+
+def test_reconciliation_records_unused_numbers_of_expired_blocks():
+    frappe.db.insert("Sales Order", {"name": KEY + next_value()})
+    frappe.db.commit()
+
+    # Expire the live block so its remainder can be reconciled
+    for block in frappe.cache().hgetall(LIVE_BLOCKS_CACHE_KEY).values():
+        block["expires"] = 0
+
+    reconcile_block_series()
+
+    gaps = frappe.get_all("LBS Series Gap", fields=["series_key", "series_number"], order_by="series_number")
+    assert [(gap.series_key, gap.series_number) for gap in gaps] == [(KEY, 2), (KEY, 3)]
+
+    # The watermark keeps the next run from recording them again
+    reconcile_block_series()
+    assert len(frappe.get_all("LBS Series Gap")) == 2
+
+
+def test_reconciliation_skips_numbers_of_live_blocks():
+    frappe.db.insert("Sales Order", {"name": KEY + next_value()})
+    frappe.db.commit()
+
+    reconcile_block_series()
+
+    assert frappe.get_all("LBS Series Gap") == []
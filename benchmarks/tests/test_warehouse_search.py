@@ -0,0 +1,71 @@
+import frappe
+import pytest
+
+from location_based_series.location_warehouses import rebuild_location_warehouses, search_location_warehouses
+from location_based_series.utils import location_based_warehouse_query
+
+LEAVES = [
+    ("Stores - BC", "Stores"),
+    ("Finished Goods - BC", "Finished Goods"),
+    ("Bin 100% - BC", "Bin full"),
+    ("Bin_A - BC", "Bin A"),
+    ("BinXA - BC", "Bin X"),
+    ("Rack 1 - BC", "Cold Room"),
+]
+
+
+@pytest.fixture(autouse=True)
+def location():
+    frappe.db.insert("Warehouse", {"name": "Mumbai - BC", "lft": 1, "rgt": 2 * len(LEAVES) + 4, "is_group": 1, "disabled": 0})
+    for index, (name, warehouse_name) in enumerate(LEAVES):
+        frappe.db.insert("Warehouse", {"name": name, "warehouse_name": warehouse_name,
+                                       "lft": 2 * index + 2, "rgt": 2 * index + 3, "is_group": 0, "disabled": 0})
+    frappe.db.insert("Warehouse", {"name": "Old Stores - BC", "warehouse_name": "Old Stores",
+                                   "lft": 2 * len(LEAVES) + 2, "rgt": 2 * len(LEAVES) + 3, "is_group": 0, "disabled": 1})
+    frappe.db.insert("Warehouse", {"name": "Delhi Stores - BC", "lft": 100, "rgt": 101, "is_group": 0, "disabled": 0})
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Mumbai - BC"})
+    rebuild_location_warehouses("Mumbai")
+
+
+def names(rows):
+    return [row[0] for row in rows]
+
+
+def test_only_enabled_leaves_of_the_location_are_offered():
+    assert names(search_location_warehouses("Mumbai")) == [
+        "Bin 100% - BC", "BinXA - BC", "Bin_A - BC", "Finished Goods - BC", "Rack 1 - BC", "Stores - BC",
+    ]
+
+
+def test_text_matches_name_or_warehouse_name():
+    assert names(search_location_warehouses("Mumbai", "stores")) == ["Stores - BC"]
+    assert names(search_location_warehouses("Mumbai", "cold")) == ["Rack 1 - BC"]
+
+
+@pytest.mark.parametrize("txt, expected", [
+    ("100%", ["Bin 100% - BC"]),
+    ("Bin_", ["Bin_A - BC"]),
+    ("%", ["Bin 100% - BC"]),
+])
+def test_like_wildcards_typed_by_the_user_match_literally(txt, expected):
+    assert names(search_location_warehouses("Mumbai", txt)) == expected
+
+
+def test_pages_are_cut_in_the_database():
+    first = names(search_location_warehouses("Mumbai", start=0, page_len=4))
+    second = names(search_location_warehouses("Mumbai", start=4, page_len=4))
+
+    assert first + second == names(search_location_warehouses("Mumbai"))
+    assert len(first) == 4
+
+
+def test_search_is_one_query_whatever_the_tree_size():
+    frappe.db.reset_counters()
+    search_location_warehouses("Mumbai", "bin", 0, 20)
+
+    assert frappe.db.queries == 1
+
+
+def test_link_query_needs_a_location():
+    assert location_based_warehouse_query("Warehouse", "", "name", 0, 20, {}) == []
+    assert names(location_based_warehouse_query("Warehouse", "sto", "name", 0, 20, {"location": "Mumbai"})) == ["Stores - BC"]
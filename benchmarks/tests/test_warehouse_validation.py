@@ -0,0 +1,96 @@
+import frappe
+import pytest
+
+from location_based_series.events.validation import validate_document_warehouses
+from location_based_series.location_warehouses import get_location_warehouses, rebuild_location_warehouses
+
+VALID = ["Stores - BC", "Finished Goods - BC"]
+
+
+def make_invoice(set_warehouse="Stores - BC", update_stock=1, items=()):
+    return frappe.get_doc({
+        "doctype": "Sales Invoice",
+        "location": "Mumbai",
+        "update_stock": update_stock,
+        "set_warehouse": set_warehouse,
+        "items": [{"item_code": item_code, "warehouse": warehouse} for item_code, warehouse in items],
+    })
+
+
+@pytest.fixture(autouse=True)
+def items():
+    frappe.db.insert("Item", {"name": "STOCK", "is_stock_item": 1})
+    frappe.db.insert("Item", {"name": "SERVICE", "is_stock_item": 0})
+
+
+def test_valid_warehouses_pass():
+    validate_document_warehouses(make_invoice(items=[("STOCK", "Finished Goods - BC")]), VALID)
+
+
+def test_document_level_warehouse_outside_the_location_is_rejected():
+    with pytest.raises(frappe.ValidationError, match="field 'set_warehouse'"):
+        validate_document_warehouses(make_invoice(set_warehouse="Delhi Stores - BC"), VALID)
+
+
+def test_every_offending_row_is_reported_at_once():
+    doc = make_invoice(items=[("STOCK", "Delhi Stores - BC"), ("STOCK", "Stores - BC"), ("STOCK", "Pune - BC")])
+
+    with pytest.raises(frappe.ValidationError) as error:
+        validate_document_warehouses(doc, VALID)
+
+    message = str(error.value)
+    assert "row 1, field 'warehouse'" in message
+    assert "row 3, field 'warehouse'" in message
+    assert "row 2" not in message
+
+
+def test_non_stock_item_rows_are_skipped():
+    validate_document_warehouses(make_invoice(items=[("SERVICE", "Delhi Stores - BC")]), VALID)
+
+
+def test_documents_not_updating_stock_are_skipped():
+    validate_document_warehouses(make_invoice(set_warehouse="Delhi Stores - BC", update_stock=0), VALID)
+
+
+def test_stock_flag_is_read_only_for_offending_rows():
+    doc = make_invoice(items=[("STOCK", "Stores - BC")] * 50)
+
+    frappe.db.reset_counters()
+    validate_document_warehouses(doc, VALID)
+    assert frappe.db.queries == 0
+
+
+def add_warehouse(name, lft, rgt, is_group=0, disabled=0):
+    frappe.db.insert("Warehouse", {"name": name, "lft": lft, "rgt": rgt, "is_group": is_group, "disabled": disabled})
+
+
+def test_membership_holds_enabled_leaves_under_the_linked_warehouse():
+    add_warehouse("Mumbai - BC", 1, 8, is_group=1)
+    add_warehouse("Stores - BC", 2, 3)
+    add_warehouse("Finished Goods - BC", 4, 5)
+    add_warehouse("Scrap - BC", 6, 7, disabled=1)
+    add_warehouse("Delhi Stores - BC", 9, 10)
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Mumbai - BC"})
+
+    rebuild_location_warehouses("Mumbai")
+
+    assert get_location_warehouses("Mumbai") == ["Finished Goods - BC", "Stores - BC"]
+
+
+def test_disabled_linked_group_keeps_its_enabled_leaves():
+    add_warehouse("Mumbai - BC", 1, 4, is_group=1, disabled=1)
+    add_warehouse("Stores - BC", 2, 3)
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Mumbai - BC"})
+
+    rebuild_location_warehouses("Mumbai")
+
+    assert get_location_warehouses("Mumbai") == ["Stores - BC"]
+
+
+def test_disabled_linked_leaf_has_no_members():
+    add_warehouse("Stores - BC", 1, 2, disabled=1)
+    frappe.db.insert("Location", {"name": "Mumbai", "linked_warehouse": "Stores - BC"})
+
+    rebuild_location_warehouses("Mumbai")
+
+    assert get_location_warehouses("Mumbai") == []
@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+
+import frappe
+
+# Worker-level caches for master data read on the naming/validation hot paths.
+#
+# Values live in process memory, bucketed per site and namespace. Each namespace
+# carries a version token in the site cache (Redis); bumping the token from a
+# doc event invalidates the namespace in every worker of the site at once.
+# The token itself is read at most once per request.
+_worker_cache = {}
+
+# Guards buckets against the threads of one worker; generators run outside it
+_worker_cache_lock = threading.Lock()
+
+
+def _version_key(namespace):
+    return f"lbs_cache_version::{namespace}"
+
+
+def get_cache_version(namespace):
+    """Return the site-wide version token of a cache namespace."""
+    versions = getattr(frappe.local, "lbs_cache_versions", None)
+    if versions is None:
+        versions = frappe.local.lbs_cache_versions = {}
+
+    if namespace not in versions:
+        version = frappe.cache().get_value(_version_key(namespace))
+        if not version:
+            version = frappe.generate_hash(length=10)
+            frappe.cache().set_value(_version_key(namespace), version)
+        versions[namespace] = version
+
+    return versions[namespace]
+
+
+def get_worker_cached(namespace, key, generator, maxsize=None):
+    """
+    Return the value cached for key in namespace, building it with generator()
+    on the first call in this worker or after the namespace was invalidated.
+
+    With maxsize, the namespace keeps at most that many keys and evicts the
+    least recently used one first.
+    """
+    bucket_key = (frappe.local.site, namespace)
+    version = get_cache_version(namespace)
+
+    with _worker_cache_lock:
+        bucket = _worker_cache.get(bucket_key)
+        if bucket is None or bucket["version"] != version:
+            bucket = _worker_cache[bucket_key] = {"version": version, "values": OrderedDict()}
+
+        values = bucket["values"]
+        if key in values:
+            if maxsize:
+                values.move_to_end(key)
+            return values[key]
+
+    value = generator()
+
+    with _worker_cache_lock:
+        values[key] = value
+        if maxsize:
+            while len(values) > maxsize:
+                values.popitem(last=False)
+    return value
+
+
+def _bump_cache_version(namespace):
+    version = frappe.generate_hash(length=10)
+    frappe.cache().set_value(_version_key(namespace), version)
+
+    versions = getattr(frappe.local, "lbs_cache_versions", None)
+    if versions is not None:
+        versions[namespace] = version
+    with _worker_cache_lock:
+        _worker_cache.pop((frappe.local.site, namespace), None)
+
+
+def clear_worker_cache(namespace):
+    """
+    Invalidate a namespace in every worker of the current site.
+
+    The version is bumped immediately and again after commit, so a worker that
+    rebuilds from not-yet-committed data in between does not keep stale values.
+    """
+    _bump_cache_version(namespace)
+    if getattr(frappe.local, "db", None):
+        frappe.db.after_commit.add(lambda: _bump_cache_version(namespace))
+
+
+def get_site_cached(key, generator):
+    """Return a value shared by all workers of the site, building it on a miss.
+
+    Generators must not return None; a None value is treated as a miss.
+    """
+    return frappe.cache().get_value(key, generator=generator)
+
+
+def _delete_site_cached(key):
+    frappe.cache().delete_value(key)
+
+
+def clear_site_cache(key):
+    """Delete a site cache value now and again after commit (see clear_worker_cache)."""
+    _delete_site_cached(key)
+    if getattr(frappe.local, "db", None):
+        frappe.db.after_commit.add(lambda: _delete_site_cached(key))
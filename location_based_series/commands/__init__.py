@@ -1 +1,8 @@
-# Commands for location_based_series app 
\ No newline at end of file
+# Commands for location_based_series app
+from location_based_series.commands.location_warehouses import rebuild_location_warehouses
+from location_based_series.commands.place_of_supply import backfill_place_of_supply
+
+commands = [
+    rebuild_location_warehouses,
+    backfill_place_of_supply,
+]
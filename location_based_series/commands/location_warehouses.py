@@ -0,0 +1,24 @@
+import click
+import frappe
+from frappe.commands import pass_context, get_site
+
+
+@click.command("lbs-rebuild-location-warehouses")
+@pass_context
+def rebuild_location_warehouses(context):
+    """Rebuild the materialized Location -> Warehouse membership table."""
+    from location_based_series.location_warehouses import rebuild_all_location_warehouses
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+
+    try:
+        count = rebuild_all_location_warehouses()
+        frappe.db.commit()
+        print(f"✓ Rebuilt location warehouses for {count} locations")
+    except Exception as e:
+        print(f"✗ Error rebuilding location warehouses: {e}")
+        frappe.db.rollback()
+    finally:
+        frappe.destroy()
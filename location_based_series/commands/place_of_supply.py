@@ -0,0 +1,29 @@
+import click
+import frappe
+from frappe.commands import pass_context, get_site
+
+
+@click.command("lbs-backfill-place-of-supply")
+@click.option("--doctype", "doctypes", multiple=True, help="Purchase doctype to backfill (repeatable, default: PI, PO, PR)")
+@click.option("--chunk-size", default=1000, type=int, help="Documents read and committed per chunk")
+@click.option("--dry-run", is_flag=True, default=False, help="Report what would change without writing")
+@click.option("--restart", is_flag=True, default=False, help="Ignore the stored resume point")
+@pass_context
+def backfill_place_of_supply(context, doctypes, chunk_size, dry_run, restart):
+    """Set place_of_supply on existing purchase documents from their addresses."""
+    from location_based_series.place_of_supply_backfill import backfill_place_of_supply
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+
+    try:
+        stats = backfill_place_of_supply(doctypes or None, chunk_size, dry_run, restart)
+        for doctype, counts in stats.items():
+            action = "would update" if dry_run else "updated"
+            print(f"✓ {doctype}: {counts['scanned']} scanned, {counts['updated']} {action}")
+    except Exception as e:
+        print(f"✗ Error backfilling place of supply: {e}")
+        frappe.db.rollback()
+    finally:
+        frappe.destroy()
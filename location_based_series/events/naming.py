@@ -1,77 +1,124 @@
-from frappe.model.naming import make_autoname
+from bisect import bisect_right
+from datetime import timedelta
+from string import Formatter
+from time import perf_counter
+
+from frappe.model.naming import getseries
 import frappe
-from frappe.utils import getdate
+from frappe.utils import cint, getdate
+from location_based_series import metrics
+from location_based_series.cache import get_worker_cached, clear_worker_cache
+from location_based_series.logger import get_logger
+from location_based_series.query_budget import query_budget
+from location_based_series.utils import validate_location_dimension
+from location_based_series.series import (
+    get_series_block_size,
+    split_series_pattern,
+    get_next_series_value,
+)
+
+FISCAL_YEAR_CACHE = "fiscal_year_index"
+NAMING_TEMPLATE_CACHE = "naming_templates"
+# One debug record per this many named documents
+AUTONAME_LOG_SAMPLE = 100
 
 
+@query_budget("custom_autoname")
 def custom_autoname(doc, method):
     """Generate location-based document name with fiscal year and sequential numbering."""
-    logger = frappe.logger("location_based_series")
+    start = perf_counter()
+
+    # Fail before touching tabSeries when the Location dimension is disabled
+    validate_location_dimension()
 
     lbs_location_code = doc.lbs_location_code
     company = doc.company
     posting_date = getdate(getattr(doc, "posting_date", frappe.utils.nowdate()))
-    logger.info(f"[LBS] Posting Date: {posting_date}, Company: {company}, Location Code: {lbs_location_code}")
 
     fiscal_year = get_fiscal_year_code(posting_date, company)
-    logger.info(f"[LBS] Fiscal Year Code resolved to: {fiscal_year}")
 
-    lbs_doctype_code = get_lbs_doctype_code(doc)
-    logger.info(f"[LBS] Doctype: {doc.doctype}, Doctype Code: {lbs_doctype_code}")
-    doc.lbs_doctype_code = lbs_doctype_code
-
-    template = _get_naming_template(doc)
-    if not template:
-        logger.error(f"[LBS] No series format defined for {doc.doctype}")
+    naming = _get_naming_template(doc)
+    if not naming:
+        get_logger().error("autoname_no_template", doctype=doc.doctype)
         return
 
-    series_pattern = template.format(
+    doc.lbs_doctype_code = naming["lbs_doctype_code"]
+    series_key = naming["series_key"](lbs_location_code, fiscal_year)
+
+    # Opt-in block-reserved counters for high-volume, non-statutory doctypes
+    block_size = get_series_block_size(doc.doctype)
+    if block_size:
+        doc.name = series_key + get_next_series_value(series_key, naming["digits"], block_size, doc.doctype)
+    else:
+        doc.name = series_key + getseries(series_key, naming["digits"])
+
+    get_logger().debug(
+        "autoname",
+        sample=AUTONAME_LOG_SAMPLE,
+        doctype=doc.doctype,
+        name=doc.name,
+        company=company,
+        posting_date=posting_date,
         lbs_location_code=lbs_location_code,
         fiscal_year=fiscal_year,
+        lbs_doctype_code=doc.lbs_doctype_code,
     )
+    metrics.inc(metrics.AUTONAME_TOTAL, doctype=doc.doctype, prefix=naming["prefix"])
+    metrics.observe(metrics.AUTONAME_DURATION, perf_counter() - start, doctype=doc.doctype)
 
-    logger.info(f"[LBS] Final Series Pattern: {series_pattern}")
-    doc.name = make_autoname(series_pattern, doc=doc)
+
+# Built-in templates, keyed by (doctype, is_return, is_debit_note).
+# Enabled LBS Naming Template records override these per key.
+#
+# Prefix mapping:
+#     SI  = Sales Invoice (regular)
+#     CDN = Credit Note  (Sales Invoice return)
+#     PI  = Purchase Invoice (regular)
+#     DBN = Debit Note   (Purchase Invoice return)
+#     SO  = Sales Order
+#     PO  = Purchase Order
+#     DN  = Delivery Note
+#     PR  = Purchase Receipt
+DEFAULT_NAMING_TEMPLATES = {
+    ("Sales Invoice", 0, 0): ("SI.{lbs_location_code}.{fiscal_year}.-.####", ""),
+    ("Sales Invoice", 0, 1): ("SI.DR.{lbs_location_code}.{fiscal_year}.-.####", "DR"),
+    ("Sales Invoice", 1, 0): ("CDN.{lbs_location_code}.{fiscal_year}.-.####", "CR"),
+    ("Purchase Invoice", 0, 0): ("PI.{lbs_location_code}.{fiscal_year}.-.####", ""),
+    ("Purchase Invoice", 1, 0): ("DBN.{lbs_location_code}.{fiscal_year}.-.####", "DR"),
+    ("Delivery Note", 0, 0): ("DN.{lbs_location_code}.{fiscal_year}.-.####", ""),
+    ("Delivery Note", 1, 0): ("DN.SR.{lbs_location_code}.{fiscal_year}.-.####", "SR"),
+    ("Purchase Receipt", 0, 0): ("PR.{lbs_location_code}.{fiscal_year}.-.####", ""),
+    ("Purchase Receipt", 1, 0): ("PR.RR.{lbs_location_code}.{fiscal_year}.-.####", "RR"),
+    ("Sales Order", 0, 0): ("SO.{lbs_location_code}.{fiscal_year}.-.####", ""),
+    ("Purchase Order", 0, 0): ("PO.{lbs_location_code}.{fiscal_year}.-.####", ""),
+}
+
+NAMING_TEMPLATE_FIELDS = ("lbs_location_code", "fiscal_year")
+
+# Parts make_autoname would expand but compiled templates keep as literal text
+MAKE_AUTONAME_TOKENS = ("YY", "YYYY", "MM", "DD", "WW", "FY", "timestamp")
 
 
 def _get_naming_template(doc):
-    """Return the full naming template based on doctype and document flags.
-
-    Prefix mapping:
-        SI  = Sales Invoice (regular)
-        CDN = Credit Note  (Sales Invoice return)
-        PI  = Purchase Invoice (regular)
-        DBN = Debit Note   (Purchase Invoice return)
-        SO  = Sales Order
-        PO  = Purchase Order
-        DN  = Delivery Note
-        PR  = Purchase Receipt
+    """Return the compiled naming template for doc, or None.
+
+    The debit note flag takes precedence over is_return, and a flag without a
+    dedicated template falls back to the template without it (e.g. a Purchase
+    Invoice debit note is named like a regular Purchase Invoice).
     """
-    if doc.doctype == "Sales Invoice":
-        if doc.get("is_debit_note"):
-            return "SI.DR.{lbs_location_code}.{fiscal_year}.-.####"
-        if doc.get("is_return"):
-            return "CDN.{lbs_location_code}.{fiscal_year}.-.####"
-        return "SI.{lbs_location_code}.{fiscal_year}.-.####"
-
-    if doc.doctype == "Purchase Invoice":
-        if doc.get("is_return"):
-            return "DBN.{lbs_location_code}.{fiscal_year}.-.####"
-        return "PI.{lbs_location_code}.{fiscal_year}.-.####"
-
-    if doc.doctype == "Delivery Note":
-        if doc.get("is_return"):
-            return "DN.SR.{lbs_location_code}.{fiscal_year}.-.####"
-        return "DN.{lbs_location_code}.{fiscal_year}.-.####"
-
-    if doc.doctype == "Purchase Receipt":
-        if doc.get("is_return"):
-            return "PR.RR.{lbs_location_code}.{fiscal_year}.-.####"
-        return "PR.{lbs_location_code}.{fiscal_year}.-.####"
+    registry = get_naming_template_registry()
+    is_return = cint(doc.get("is_return"))
+    is_debit_note = cint(doc.get("is_debit_note"))
 
-    return {
-        "Sales Order": "SO.{lbs_location_code}.{fiscal_year}.-.####",
-        "Purchase Order": "PO.{lbs_location_code}.{fiscal_year}.-.####",
-    }.get(doc.doctype)
+    for key in (
+        (doc.doctype, is_return, is_debit_note),
+        (doc.doctype, 0, is_debit_note),
+        (doc.doctype, is_return, 0),
+        (doc.doctype, 0, 0),
+    ):
+        if key in registry:
+            return registry[key]
+    return None
 
 
 def get_lbs_doctype_code(doc):
@@ -79,49 +126,173 @@ def get_lbs_doctype_code(doc):
 
     Stored on the document via lbs_doctype_code for reference/filtering.
     """
-    if doc.doctype == "Sales Invoice":
-        if doc.get("is_debit_note"):
-            return "DR"
-        if doc.get("is_return"):
-            return "CR"
-        return ""
+    naming = _get_naming_template(doc)
+    return naming["lbs_doctype_code"] if naming else ""
+
+
+def get_naming_template_registry():
+    """Return {(doctype, is_return, is_debit_note): compiled template} for this site."""
+    return get_worker_cached(NAMING_TEMPLATE_CACHE, "registry", _build_naming_template_registry)
+
+
+def _build_naming_template_registry():
+    templates = dict(DEFAULT_NAMING_TEMPLATES)
+
+    try:
+        rows = frappe.get_all(
+            "LBS Naming Template",
+            filters={"enabled": 1},
+            fields=["document_type", "is_return", "is_debit_note", "naming_template", "lbs_doctype_code"],
+        )
+    except Exception as e:
+        # Documents can be named before the DocType is synced (e.g. in patches)
+        if not frappe.db.is_table_missing(e):
+            raise
+        rows = []
+
+    for row in rows:
+        key = (row.document_type, cint(row.is_return), cint(row.is_debit_note))
+        templates[key] = (row.naming_template, row.lbs_doctype_code or "")
+
+    registry = {}
+    for key, (template, lbs_doctype_code) in templates.items():
+        try:
+            registry[key] = compile_naming_template(template, lbs_doctype_code)
+        except Exception as e:
+            # A record saved before stricter validation must not stop naming
+            get_logger().error("naming_template_invalid", doctype=key[0], template=template, error=str(e))
+            if key in DEFAULT_NAMING_TEMPLATES:
+                registry[key] = compile_naming_template(*DEFAULT_NAMING_TEMPLATES[key])
+
+    return registry
+
+
+def compile_naming_template(template, lbs_doctype_code=""):
+    """Compile a dotted naming template into a series-key function.
+
+    "SI.{lbs_location_code}.{fiscal_year}.-.####" compiles to a function
+    returning "SI" + location code + fiscal year + "-" and a counter width of 4,
+    so nothing is re-parsed per document.
+    """
+    key_format, digits = split_series_pattern(template)
+    counters = [part for part in template.split(".") if part.startswith("#")]
+    if not digits or len(counters) > 1 or not template.split(".")[-1].startswith("#"):
+        frappe.throw(f"Naming template '{template}' must have exactly one counter, as its last part (e.g. '.####').")
+
+    fields = {name for _, name, _, _ in Formatter().parse(key_format) if name is not None}
+    unknown = fields - set(NAMING_TEMPLATE_FIELDS)
+    if unknown:
+        frappe.throw(
+            f"Naming template '{template}' uses unknown placeholders: {', '.join(sorted(unknown))}. "
+            f"Allowed placeholders are: {', '.join(NAMING_TEMPLATE_FIELDS)}"
+        )
+
+    def series_key(lbs_location_code, fiscal_year):
+        # make_autoname split the expanded pattern on "." and dropped the dots
+        # of a location code, so they are dropped here too
+        return key_format.format(lbs_location_code=str(lbs_location_code).replace(".", ""), fiscal_year=fiscal_year)
+
+    return {
+        "template": template,
+        # Static head of the template ("SI", "SI.DR", "CDN"), used as a metrics label
+        "prefix": template.split("{", 1)[0].rstrip(".") or template,
+        "lbs_doctype_code": lbs_doctype_code,
+        "series_key": series_key,
+        "digits": digits,
+    }
 
-    if doc.doctype == "Purchase Invoice":
-        return "DR" if doc.get("is_return") else ""
 
-    if doc.doctype == "Delivery Note":
-        return "SR" if doc.get("is_return") else ""
+def validate_naming_template_parts(template, document_type):
+    """Reject parts make_autoname would expand but compiled templates keep literal.
 
-    if doc.doctype == "Purchase Receipt":
-        return "RR" if doc.get("is_return") else ""
+    Date tokens, fieldnames of document_type and naming_series_variables hooks
+    would silently end up as plain text in the series key.
+    """
+    meta = frappe.get_meta(document_type)
+    custom_variables = set(frappe.get_hooks("naming_series_variables") or {})
+
+    for part in template.split("."):
+        if part in MAKE_AUTONAME_TOKENS or part in custom_variables:
+            reason = "is not expanded as a date / series variable"
+        elif part and not part.startswith(("{", "#")) and meta.has_field(part):
+            reason = f"is a {document_type} field and is not expanded"
+        else:
+            continue
+        frappe.throw(
+            f"Naming template '{template}': part '{part}' {reason}. "
+            f"Use {{fiscal_year}} for the fiscal year; other parts are copied as literal text."
+        )
 
-    return ""
+
+def clear_naming_template_registry(doc=None, method=None):
+    """Invalidate the compiled naming templates (LBS Naming Template changes)."""
+    clear_worker_cache(NAMING_TEMPLATE_CACHE)
 
 
 def get_fiscal_year_code(posting_date, company):
-    posting_date = getdate(posting_date)
+    """Return the 2-digit fiscal year code for posting_date in company.
 
+    Resolved from a per-company interval index held in the worker cache, so
+    steady-state naming never queries Fiscal Year / Fiscal Year Company.
+    """
+    starts, codes = get_worker_cached(
+        FISCAL_YEAR_CACHE, company, lambda: _build_fiscal_year_index(company)
+    )
+
+    idx = bisect_right(starts, getdate(posting_date)) - 1
+    if idx < 0 or not codes[idx]:
+        return "00"
+    return codes[idx]
+
+
+def _build_fiscal_year_index(company):
+    """Build a sorted, non-overlapping interval index of fiscal year codes.
+
+    Returns (starts, codes): codes[i] applies from starts[i] until starts[i + 1]
+    (None where no enabled fiscal year covers the range). Within each interval
+    the rule is the same as before: among fiscal years covering the date, the
+    latest-starting one linked to the company wins, else the latest-starting one.
+    """
     fiscal_years = frappe.get_all(
         "Fiscal Year",
         fields=["name", "year_start_date", "year_end_date"],
-        filters={
-            "disabled": 0,
-            "year_start_date": ("<=", posting_date),
-            "year_end_date": (">=", posting_date),
-        },
+        filters={"disabled": 0},
         order_by="year_start_date desc"
     )
+    linked_years = set(frappe.get_all(
+        "Fiscal Year Company",
+        filters={"company": company},
+        pluck="parent"
+    ))
 
+    boundaries = set()
     for fy in fiscal_years:
-        linked_companies = frappe.get_all(
-            "Fiscal Year Company",
-            filters={"parent": fy.name, "company": company},
-            pluck="company"
-        )
-        if linked_companies:
-            return fy.name[-2:]
+        boundaries.add(getdate(fy.year_start_date))
+        boundaries.add(getdate(fy.year_end_date) + timedelta(days=1))
 
-    if fiscal_years:
-        return fiscal_years[0]["name"][-2:]
+    starts, codes = [], []
+    for boundary in sorted(boundaries):
+        covering = [
+            fy for fy in fiscal_years
+            if getdate(fy.year_start_date) <= boundary <= getdate(fy.year_end_date)
+        ]
+        linked = [fy for fy in covering if fy.name in linked_years]
+        chosen = (linked or covering or [None])[0]
+        code = chosen.name[-2:] if chosen else None
 
-    return "00"
+        # Merge adjacent intervals that resolve to the same code
+        if codes and codes[-1] == code:
+            continue
+        starts.append(boundary)
+        codes.append(code)
+
+    return starts, codes
+
+
+def clear_fiscal_year_index(doc=None, method=None, *args):
+    """Invalidate the fiscal year index (Fiscal Year doc events).
+
+    Fiscal Year Company rows are saved through their parent Fiscal Year, so
+    hooking the parent covers company links as well.
+    """
+    clear_worker_cache(FISCAL_YEAR_CACHE)
@@ -1,11 +1,13 @@
 from frappe.contacts.doctype.address.address import get_address_display
 import frappe
+from location_based_series import metrics
+from location_based_series.location_context import get_location_context
+from location_based_series.query_budget import query_budget
 from location_based_series.utils import (
     get_filtered_warehouses_for_location,
     get_filtered_warehouses_for_shipping_location,
-    get_filtered_addresses_for_shipping_location,
+    get_filtered_addresses_for_location,
     get_filtered_warehouses_for_dispatch_location,
-    get_filtered_addresses_for_dispatch_location,
     auto_set_warehouse_for_location,
     auto_set_warehouse_for_shipping_location,
     auto_set_shipping_address_for_shipping_location,
@@ -16,20 +18,24 @@ from location_based_series.utils import (
     validate_dispatch_address_against_dispatch_location,
     set_place_of_supply_for_purchase_doc,
     get_place_of_supply_from_address,
+    format_warehouse_list,
+    validate_location_dimension,
 )
 
+@query_budget("validate_doc")
 def validate_doc(doc, method):
-    # STEP 1: Check if 'Location' is enabled as an Accounting Dimension
-    dim_exists = frappe.db.exists("Accounting Dimension", {
-        "document_type": "Location",
-        "disabled": 0
-    })
-    if not dim_exists:
-        frappe.throw("Please enable 'Location' as an active Accounting Dimension before using it in transactions.")
+    steps = metrics.StepTimer(metrics.VALIDATE_STEP_DURATION, doctype=doc.doctype)
+
+    # STEP 1: Check if 'Location' is enabled as an Accounting Dimension (site cache)
+    validate_location_dimension()
+    steps.lap("dimension_check")
+
+    # Load every referenced location with its address / warehouse in one query
+    context = get_location_context(doc)
 
     # STEP 2: Validate selected Location
     if doc.location:
-        loc = frappe.get_doc("Location", doc.location)
+        loc = _get_location_or_throw(context, doc.location)
 
         if not loc.lbs_location_code:
             frappe.throw("Selected Location must have a Location Code.")
@@ -47,9 +53,8 @@ def validate_doc(doc, method):
             doc.billing_address_display = get_address_display(loc.linked_address)
 
             # ✅ Set company GSTIN from billing address
-            gstin = frappe.db.get_value("Address", loc.linked_address, "gstin")
-            if gstin:
-                doc.company_gstin = gstin
+            if loc.address_gstin:
+                doc.company_gstin = loc.address_gstin
 
             # Clear any auto-filled shipping address if it matches billing address
             if hasattr(doc, 'shipping_address') and doc.shipping_address == loc.linked_address:
@@ -60,16 +65,15 @@ def validate_doc(doc, method):
             doc.company_address_display = get_address_display(loc.linked_address)
 
             # ✅ Set company GSTIN from company address
-            gstin = frappe.db.get_value("Address", loc.linked_address, "gstin")
-            if gstin:
-                doc.company_gstin = gstin
+            if loc.address_gstin:
+                doc.company_gstin = loc.address_gstin
     else:
         frappe.throw("Select Location before Saving")
 
     # STEP 3: Handle shipping location validation if present
     if hasattr(doc, 'shipping_location') and doc.shipping_location:
         # Validate shipping location
-        shipping_loc = frappe.get_doc("Location", doc.shipping_location)
+        shipping_loc = _get_location_or_throw(context, doc.shipping_location)
         
         if not shipping_loc.linked_address:
             frappe.throw("Selected Shipping Location must have a Linked Address.")
@@ -85,7 +89,7 @@ def validate_doc(doc, method):
     # STEP 3.5: Handle dispatch location validation if present
     if hasattr(doc, 'dispatch_location') and doc.dispatch_location:
         # Validate dispatch location
-        dispatch_loc = frappe.get_doc("Location", doc.dispatch_location)
+        dispatch_loc = _get_location_or_throw(context, doc.dispatch_location)
         
         if not dispatch_loc.linked_address:
             frappe.throw("Selected Dispatch Location must have a Linked Address.")
@@ -98,51 +102,100 @@ def validate_doc(doc, method):
             doc.dispatch_address_name = dispatch_loc.linked_address
             doc.dispatch_address = get_address_display(dispatch_loc.linked_address)
 
+    steps.lap("location_resolution")
+
     # STEP 4: Handle warehouse filtering and validation
     # Use shipping location for warehouse filtering if available, otherwise use regular location
-    handle_combined_location_validation(doc)
+    handle_combined_location_validation(doc, context)
+    steps.lap("warehouse_validation")
 
     # STEP 5: Set Place of Supply for Purchase documents
     # This sets place_of_supply based on location's linked address (billing address)
     set_place_of_supply_for_purchase_doc(doc)
+    steps.lap("place_of_supply")
 
     # STEP 6: Lock fields after first save
     if not doc.is_new():
-        old = frappe.get_doc(doc.doctype, doc.name)
-
         # Ensure linked address doesn't change after first save
         if doc.location:
-            loc = frappe.get_doc("Location", doc.location)
-            expected_address = loc.linked_address
+            expected_address = context.get(doc.location).linked_address
             current_address_field = "billing_address" if doc.doctype in purchase_doctypes else "company_address"
             if getattr(doc, current_address_field) != expected_address:
                 frappe.throw(f"❌ Field {current_address_field} cannot be changed after saving.")
 
-        # Ensure shipping location and address don't change after first save (only in draft state)
-        if hasattr(doc, 'shipping_location') and doc.shipping_location:
-            # Allow shipping_location changes only in draft state
-            if doc.docstatus != 0:  # Not in draft state
-                if doc.shipping_location != old.get('shipping_location'):
-                    frappe.throw("❌ Field 'shipping_location' cannot be changed after document is submitted.")
-                
-                if hasattr(doc, 'shipping_address') and doc.shipping_address != old.get('shipping_address'):
-                    frappe.throw("❌ Field 'shipping_address' cannot be changed after document is submitted.")
-
-        # Ensure dispatch location and address don't change after first save (only in draft state)
-        if hasattr(doc, 'dispatch_location') and doc.dispatch_location:
-            # Allow dispatch_location changes only in draft state
-            if doc.docstatus != 0:  # Not in draft state
-                if doc.dispatch_location != old.get('dispatch_location'):
-                    frappe.throw("❌ Field 'dispatch_location' cannot be changed after document is submitted.")
-                
-                if hasattr(doc, 'dispatch_address_name') and doc.dispatch_address_name != old.get('dispatch_address_name'):
-                    frappe.throw("❌ Field 'dispatch_address_name' cannot be changed after document is submitted.")
-
-        for field in ["location", "is_return", "is_rate_adjustment"]:
-            if hasattr(doc, field) and doc.get(field) != old.get(field):
-                frappe.throw(f"❌ Field '{field}' cannot be changed after saving.")
-
-def handle_warehouse_validation(doc):
+        validate_locked_fields(doc)
+    steps.lap("field_lock")
+
+
+# Field locks applied to saved documents.
+#   fields:    fields that must keep their saved value
+#   docstatus: docstatus values of the document being saved that enforce the lock
+#   when_set:  only lock documents that have this field and a value in it
+#
+# Every lock is checked on every doctype: a doctype only picks up the shipping
+# or dispatch lock by carrying its when_set field, and fields the doctype lacks
+# are skipped.
+_SHIPPING_LOCATION_LOCK = {
+    # Allow shipping_location changes only in draft state
+    "fields": ("shipping_location", "shipping_address"),
+    "docstatus": (1, 2),
+    "when_set": "shipping_location",
+    "message": "❌ Field '{field}' cannot be changed after document is submitted.",
+}
+_DISPATCH_LOCATION_LOCK = {
+    # Allow dispatch_location changes only in draft state
+    "fields": ("dispatch_location", "dispatch_address_name"),
+    "docstatus": (1, 2),
+    "when_set": "dispatch_location",
+    "message": "❌ Field '{field}' cannot be changed after document is submitted.",
+}
+_SAVED_DOCUMENT_LOCK = {
+    "fields": ("location", "is_return", "is_rate_adjustment"),
+    "docstatus": (0, 1, 2),
+    "message": "❌ Field '{field}' cannot be changed after saving.",
+}
+
+FIELD_LOCKS = (_SHIPPING_LOCATION_LOCK, _DISPATCH_LOCATION_LOCK, _SAVED_DOCUMENT_LOCK)
+
+
+def validate_locked_fields(doc):
+    """
+    Ensure locked fields keep their saved values.
+
+    Reuses the document Frappe loaded before save when available; otherwise
+    fetches only the locked parent columns instead of the whole document.
+    """
+    locked = []
+    for lock in FIELD_LOCKS:
+        if doc.docstatus not in lock["docstatus"]:
+            continue
+        if lock.get("when_set") and not doc.get(lock["when_set"]):
+            continue
+        locked.extend((field, lock["message"]) for field in lock["fields"] if hasattr(doc, field))
+
+    if not locked:
+        return
+
+    old = doc.get_doc_before_save()
+    if old is None:
+        old = frappe.db.get_value(doc.doctype, doc.name, [field for field, _ in locked], as_dict=True)
+    if not old:
+        return
+
+    for field, message in locked:
+        if doc.get(field) != old.get(field):
+            frappe.throw(message.format(field=field))
+
+
+def _get_location_or_throw(context, location):
+    """Return the LocationRecord for location, throwing if it does not exist."""
+    record = context.get(location)
+    if not record:
+        frappe.throw(f"Location {location} not found", frappe.DoesNotExistError)
+    return record
+
+
+def handle_warehouse_validation(doc, context=None):
     """
     Handle warehouse filtering and validation based on location.
     Auto-select warehouse if there's only one valid option.
@@ -175,7 +228,7 @@ def handle_warehouse_validation(doc):
     validate_document_warehouses(doc, valid_warehouses)
 
 
-def handle_shipping_location_validation(doc):
+def handle_shipping_location_validation(doc, context=None):
     """
     Handle warehouse filtering and validation based on shipping location.
     Auto-select warehouse and shipping address if there's only one valid option.
@@ -208,10 +261,10 @@ def handle_shipping_location_validation(doc):
     validate_document_warehouses_for_shipping_location(doc, valid_warehouses)
     
     # Handle shipping address validation and auto-selection
-    handle_shipping_address_validation(doc)
+    handle_shipping_address_validation(doc, context)
 
 
-def handle_shipping_address_validation(doc):
+def handle_shipping_address_validation(doc, context=None):
     """
     Handle shipping address validation and auto-selection based on shipping location.
     """
@@ -219,7 +272,7 @@ def handle_shipping_address_validation(doc):
         return
     
     # Get valid addresses for this shipping location
-    valid_addresses = get_filtered_addresses_for_shipping_location(doc.shipping_location)
+    valid_addresses = get_filtered_addresses_for_location(doc.shipping_location, context)
     
     if not valid_addresses:
         frappe.throw(f"No valid addresses found for shipping location '{doc.shipping_location}'. Please ensure the shipping location has a linked address.")
@@ -233,7 +286,7 @@ def handle_shipping_address_validation(doc):
             doc.shipping_address = single_address
     
     # Validate shipping address against shipping location
-    validate_shipping_address_against_shipping_location(doc)
+    validate_shipping_address_against_shipping_location(doc, context)
 
 
 def auto_set_child_table_warehouses(doc, single_warehouse, valid_warehouses):
@@ -263,91 +316,96 @@ def _should_skip_warehouse_validation(doc):
     return False
 
 
-def _is_non_stock_item(row):
-    """
-    Expense / non-stock items (is_stock_item = 0) carry a default warehouse but
-    never produce a stock ledger entry, so their warehouse should not be
-    validated against the location.
-    """
-    item_code = getattr(row, 'item_code', None)
-    if not item_code:
-        return False
-    return not frappe.get_cached_value("Item", item_code, "is_stock_item")
+# Warehouse fields checked against the location.
+# Exclude target_warehouse from validation as it's optional and can be different from location
+DOCUMENT_WAREHOUSE_FIELDS = ['warehouse', 'set_warehouse', 'source_warehouse']
+CHILD_TABLE_FIELDS = ['items', 'item_details', 'stock_entries']
+CHILD_WAREHOUSE_FIELDS = ['warehouse', 's_warehouse', 't_warehouse', 'source_warehouse']
 
 
-def validate_document_warehouses(doc, valid_warehouses):
-    """Validate all warehouse fields in document and child tables."""
+def _get_stock_items(item_codes):
+    """Return the subset of item_codes that are stock items, in one query."""
+    if not item_codes:
+        return set()
+    return set(frappe.get_all(
+        "Item",
+        filters={"name": ["in", list(item_codes)], "is_stock_item": 1},
+        pluck="name"
+    ))
+
+
+def _validate_document_warehouses(doc, valid_warehouses, location_field, location_label):
+    """
+    Validate all warehouse fields in document and child tables in one pass.
+
+    Valid warehouses are checked as a set, the stock flag is fetched once for
+    the items of offending rows only, and every offending field is reported
+    in a single error.
+    """
 
     # Skip entirely when the document does not update stock
     if _should_skip_warehouse_validation(doc):
         return
 
+    valid = set(valid_warehouses)
+    errors = []
+
     # Validate document level warehouse fields
-    # Exclude target_warehouse from validation as it's optional and can be different from location
-    warehouse_fields = ['warehouse', 'set_warehouse', 'source_warehouse']
-    for field in warehouse_fields:
+    for field in DOCUMENT_WAREHOUSE_FIELDS:
         if hasattr(doc, field):
             warehouse = getattr(doc, field, None)
-            if warehouse and warehouse not in valid_warehouses:
-                frappe.throw(f"Warehouse '{warehouse}' in field '{field}' is not valid for location '{doc.location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
-    
-    # Validate warehouse fields in child tables
-    child_table_fields = ['items', 'item_details', 'stock_entries']
-    # Exclude target_warehouse from validation as it's optional and can be different from location
-    warehouse_fields_in_child = ['warehouse', 's_warehouse', 't_warehouse', 'source_warehouse']
-    
-    for table_field in child_table_fields:
-        if hasattr(doc, table_field):
-            child_table = getattr(doc, table_field, [])
-            if child_table:  # Only process if table has rows
-                for idx, row in enumerate(child_table):
-                    # Skip expense / non-stock item rows — their warehouse never moves stock
-                    if _is_non_stock_item(row):
-                        continue
-                    for wh_field in warehouse_fields_in_child:
-                        if hasattr(row, wh_field):
-                            warehouse = getattr(row, wh_field, None)
-                            if warehouse and warehouse not in valid_warehouses:
-                                frappe.throw(f"Warehouse '{warehouse}' in row {idx + 1}, field '{wh_field}' is not valid for location '{doc.location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
+            if warehouse and warehouse not in valid:
+                errors.append(f"Warehouse '{warehouse}' in field '{field}'")
+
+    # Collect child rows with a warehouse outside the location
+    invalid_rows = []
+    for table_field in CHILD_TABLE_FIELDS:
+        for idx, row in enumerate(getattr(doc, table_field, None) or []):
+            row_errors = [
+                (wh_field, getattr(row, wh_field))
+                for wh_field in CHILD_WAREHOUSE_FIELDS
+                if getattr(row, wh_field, None) and getattr(row, wh_field) not in valid
+            ]
+            if row_errors:
+                invalid_rows.append((idx, row, row_errors))
+
+    # Expense / non-stock item rows are skipped — their warehouse never moves stock
+    stock_items = _get_stock_items({
+        row.item_code for _, row, _ in invalid_rows if getattr(row, 'item_code', None)
+    })
+    for idx, row, row_errors in invalid_rows:
+        item_code = getattr(row, 'item_code', None)
+        if item_code and item_code not in stock_items:
+            continue
+        for wh_field, warehouse in row_errors:
+            errors.append(f"Warehouse '{warehouse}' in row {idx + 1}, field '{wh_field}'")
+
+    if not errors:
+        return
 
+    location = getattr(doc, location_field)
+    valid_list = format_warehouse_list(valid_warehouses)
+    if len(errors) == 1:
+        frappe.throw(f"{errors[0]} is not valid for {location_label} '{location}'. Valid warehouses are: {valid_list}")
 
-def validate_document_warehouses_for_shipping_location(doc, valid_warehouses):
-    """Validate all warehouse fields in document and child tables against shipping location."""
+    frappe.throw(
+        f"The following warehouses are not valid for {location_label} '{location}':<br>"
+        + "<br>".join(errors)
+        + f"<br><br>Valid warehouses are: {valid_list}"
+    )
 
-    # Skip entirely when the document does not update stock
-    if _should_skip_warehouse_validation(doc):
-        return
 
-    # Validate document level warehouse fields
-    # Exclude target_warehouse from validation as it's optional and can be different from shipping location
-    warehouse_fields = ['warehouse', 'set_warehouse', 'source_warehouse']
-    for field in warehouse_fields:
-        if hasattr(doc, field):
-            warehouse = getattr(doc, field, None)
-            if warehouse and warehouse not in valid_warehouses:
-                frappe.throw(f"Warehouse '{warehouse}' in field '{field}' is not valid for shipping location '{doc.shipping_location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
-    
-    # Validate warehouse fields in child tables
-    child_table_fields = ['items', 'item_details', 'stock_entries']
-    # Exclude target_warehouse from validation as it's optional and can be different from shipping location
-    warehouse_fields_in_child = ['warehouse', 's_warehouse', 't_warehouse', 'source_warehouse']
-    
-    for table_field in child_table_fields:
-        if hasattr(doc, table_field):
-            child_table = getattr(doc, table_field, [])
-            if child_table:  # Only process if table has rows
-                for idx, row in enumerate(child_table):
-                    # Skip expense / non-stock item rows — their warehouse never moves stock
-                    if _is_non_stock_item(row):
-                        continue
-                    for wh_field in warehouse_fields_in_child:
-                        if hasattr(row, wh_field):
-                            warehouse = getattr(row, wh_field, None)
-                            if warehouse and warehouse not in valid_warehouses:
-                                frappe.throw(f"Warehouse '{warehouse}' in row {idx + 1}, field '{wh_field}' is not valid for shipping location '{doc.shipping_location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
+def validate_document_warehouses(doc, valid_warehouses):
+    """Validate all warehouse fields in document and child tables."""
+    _validate_document_warehouses(doc, valid_warehouses, 'location', 'location')
+
+
+def validate_document_warehouses_for_shipping_location(doc, valid_warehouses):
+    """Validate all warehouse fields in document and child tables against shipping location."""
+    _validate_document_warehouses(doc, valid_warehouses, 'shipping_location', 'shipping location')
 
 
-def handle_combined_location_validation(doc):
+def handle_combined_location_validation(doc, context=None):
     """
     Handle validation for documents that can have location, shipping_location, and dispatch_location.
     This function determines which location to use for warehouse filtering based on the document's configuration.
@@ -360,19 +418,19 @@ def handle_combined_location_validation(doc):
     
     if has_dispatch_location:
         # Use dispatch location for warehouse filtering
-        handle_dispatch_location_validation(doc)
+        handle_dispatch_location_validation(doc, context)
     elif has_shipping_location:
         # Use shipping location for warehouse filtering
-        handle_shipping_location_validation(doc)
+        handle_shipping_location_validation(doc, context)
     elif hasattr(doc, 'location') and doc.location:
         # Use regular location for warehouse filtering
-        handle_warehouse_validation(doc)
+        handle_warehouse_validation(doc, context)
     else:
         # No location specified, skip validation
         pass
 
 
-def handle_dispatch_location_validation(doc):
+def handle_dispatch_location_validation(doc, context=None):
     """
     Handle warehouse filtering and validation based on dispatch location.
     Auto-select warehouse and dispatch address if there's only one valid option.
@@ -405,10 +463,10 @@ def handle_dispatch_location_validation(doc):
     validate_document_warehouses_for_dispatch_location(doc, valid_warehouses)
     
     # Handle dispatch address validation and auto-selection
-    handle_dispatch_address_validation(doc)
+    handle_dispatch_address_validation(doc, context)
 
 
-def handle_dispatch_address_validation(doc):
+def handle_dispatch_address_validation(doc, context=None):
     """
     Handle dispatch address validation and auto-selection based on dispatch location.
     """
@@ -416,7 +474,7 @@ def handle_dispatch_address_validation(doc):
         return
     
     # Get valid addresses for this dispatch location
-    valid_addresses = get_filtered_addresses_for_dispatch_location(doc.dispatch_location)
+    valid_addresses = get_filtered_addresses_for_location(doc.dispatch_location, context)
     
     if not valid_addresses:
         frappe.throw(f"No valid addresses found for dispatch location '{doc.dispatch_location}'. Please ensure the dispatch location has a linked address.")
@@ -430,40 +488,9 @@ def handle_dispatch_address_validation(doc):
             doc.dispatch_address_name = single_address
     
     # Validate dispatch address against dispatch location
-    validate_dispatch_address_against_dispatch_location(doc)
+    validate_dispatch_address_against_dispatch_location(doc, context)
 
 
 def validate_document_warehouses_for_dispatch_location(doc, valid_warehouses):
     """Validate all warehouse fields in document and child tables against dispatch location."""
-
-    # Skip entirely when the document does not update stock
-    if _should_skip_warehouse_validation(doc):
-        return
-
-    # Validate document level warehouse fields
-    # Exclude target_warehouse from validation as it's optional and can be different from dispatch location
-    warehouse_fields = ['warehouse', 'set_warehouse', 'source_warehouse']
-    for field in warehouse_fields:
-        if hasattr(doc, field):
-            warehouse = getattr(doc, field, None)
-            if warehouse and warehouse not in valid_warehouses:
-                frappe.throw(f"Warehouse '{warehouse}' in field '{field}' is not valid for dispatch location '{doc.dispatch_location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
-    
-    # Validate warehouse fields in child tables
-    child_table_fields = ['items', 'item_details', 'stock_entries']
-    # Exclude target_warehouse from validation as it's optional and can be different from dispatch location
-    warehouse_fields_in_child = ['warehouse', 's_warehouse', 't_warehouse', 'source_warehouse']
-    
-    for table_field in child_table_fields:
-        if hasattr(doc, table_field):
-            child_table = getattr(doc, table_field, [])
-            if child_table:  # Only process if table has rows
-                for idx, row in enumerate(child_table):
-                    # Skip expense / non-stock item rows — their warehouse never moves stock
-                    if _is_non_stock_item(row):
-                        continue
-                    for wh_field in warehouse_fields_in_child:
-                        if hasattr(row, wh_field):
-                            warehouse = getattr(row, wh_field, None)
-                            if warehouse and warehouse not in valid_warehouses:
-                                frappe.throw(f"Warehouse '{warehouse}' in row {idx + 1}, field '{wh_field}' is not valid for dispatch location '{doc.dispatch_location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
+    _validate_document_warehouses(doc, valid_warehouses, 'dispatch_location', 'dispatch location')
@@ -169,6 +169,69 @@ doc_events = {
     "Purchase Receipt": {
         "autoname": "location_based_series.events.naming.custom_autoname",
         "validate": "location_based_series.events.validation.validate_doc"
+    },
+    "Fiscal Year": {
+        "on_update": "location_based_series.events.naming.clear_fiscal_year_index",
+        "on_trash": "location_based_series.events.naming.clear_fiscal_year_index",
+        "after_rename": "location_based_series.events.naming.clear_fiscal_year_index"
+    },
+    "Accounting Dimension": {
+        "on_update": "location_based_series.utils.clear_location_dimension_cache",
+        "on_trash": "location_based_series.utils.clear_location_dimension_cache",
+        "after_rename": "location_based_series.utils.clear_location_dimension_cache"
+    },
+    "Location": {
+        "on_update": [
+            "location_based_series.location_warehouses.on_location_update",
+            "location_based_series.search_cache.clear_search_cache",
+            "location_based_series.location_context.clear_location_snapshots",
+            "location_based_series.pos_profile.clear_pos_profile_cache"
+        ],
+        "after_rename": [
+            "location_based_series.location_warehouses.on_location_update",
+            "location_based_series.search_cache.clear_search_cache",
+            "location_based_series.location_context.clear_location_snapshots",
+            "location_based_series.pos_profile.clear_pos_profile_cache"
+        ],
+        "on_trash": [
+            "location_based_series.location_warehouses.on_location_trash",
+            "location_based_series.search_cache.clear_search_cache",
+            "location_based_series.location_context.clear_location_snapshots",
+            "location_based_series.pos_profile.clear_pos_profile_cache"
+        ]
+    },
+    "Warehouse": {
+        "on_update": [
+            "location_based_series.location_warehouses.on_warehouse_update",
+            "location_based_series.search_cache.clear_search_cache"
+        ],
+        "after_rename": [
+            "location_based_series.location_warehouses.on_warehouse_update",
+            "location_based_series.search_cache.clear_search_cache"
+        ],
+        "on_trash": [
+            "location_based_series.location_warehouses.on_warehouse_trash",
+            "location_based_series.search_cache.clear_search_cache"
+        ]
+    },
+    "POS Profile": {
+        "on_update": "location_based_series.pos_profile.clear_pos_profile_cache",
+        "after_rename": "location_based_series.pos_profile.clear_pos_profile_cache",
+        "on_trash": "location_based_series.pos_profile.clear_pos_profile_cache"
+    },
+    "Address": {
+        "on_update": [
+            "location_based_series.search_cache.clear_search_cache_for_address",
+            "location_based_series.utils.clear_place_of_supply_cache"
+        ],
+        "after_rename": [
+            "location_based_series.search_cache.clear_search_cache_for_address",
+            "location_based_series.utils.clear_place_of_supply_cache"
+        ],
+        "on_trash": [
+            "location_based_series.search_cache.clear_search_cache_for_address",
+            "location_based_series.utils.clear_place_of_supply_cache"
+        ]
     }
 }
 
@@ -179,6 +242,12 @@ fixtures = [{"doctype": "Custom Field", "filters": [["module" , "in" , ("Locatio
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+    "hourly": [
+        "location_based_series.series.reconcile_block_series"
+    ]
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"location_based_series.tasks.all"
@@ -232,12 +301,15 @@ override_whitelisted_methods = {
 # Request Events
 # ----------------
 # before_request = ["location_based_series.utils.before_request"]
-# after_request = ["location_based_series.utils.after_request"]
+after_request = ["location_based_series.metrics.flush_metrics_if_due"]
 
 # Job Events
 # ----------
 # before_job = ["location_based_series.utils.before_job"]
-# after_job = ["location_based_series.utils.after_job"]
+after_job = [
+    "location_based_series.metrics.flush_metrics_if_due",
+    "location_based_series.logger.flush_logs",
+]
 
 # User Data Protection
 # --------------------
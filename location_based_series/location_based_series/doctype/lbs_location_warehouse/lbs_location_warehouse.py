@@ -0,0 +1,14 @@
+# Copyright (c) 2026, Sagar and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class LBSLocationWarehouse(Document):
+	pass
+
+
+def on_doctype_update():
+	# One row per pair; also serves lookups by location and warehouse together
+	frappe.db.add_unique("LBS Location Warehouse", ["location", "warehouse"], constraint_name="unique_location_warehouse")
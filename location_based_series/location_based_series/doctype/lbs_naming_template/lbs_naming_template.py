@@ -0,0 +1,32 @@
+# Copyright (c) 2026, Sagar and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from location_based_series.events.naming import (
+	clear_naming_template_registry,
+	compile_naming_template,
+	validate_naming_template_parts,
+)
+
+
+class LBSNamingTemplate(Document):
+	def autoname(self):
+		parts = [self.document_type]
+		if self.is_return:
+			parts.append("Return")
+		if self.is_debit_note:
+			parts.append("Debit Note")
+		self.name = " - ".join(parts)
+
+	def validate(self):
+		# Raises with a readable message if the template cannot be compiled
+		compile_naming_template(self.naming_template, self.lbs_doctype_code)
+		validate_naming_template_parts(self.naming_template, self.document_type)
+
+	def on_update(self):
+		clear_naming_template_registry()
+
+	def on_trash(self):
+		clear_naming_template_registry()
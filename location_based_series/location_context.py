@@ -0,0 +1,122 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+import frappe
+
+from location_based_series.cache import get_worker_cached, clear_worker_cache
+
+# Location fields a transaction can carry, in the order validate_doc reads them
+LOCATION_FIELDS = ("location", "shipping_location", "dispatch_location")
+
+# Everything the LBS helpers need from a Location and its linked Address.
+# `address` is None when the linked Address does not exist. Warehouses are
+# read from the LBS Location Warehouse membership table instead.
+LocationRecord = namedtuple("LocationRecord", [
+    "name",
+    "lbs_location_code",
+    "linked_address",
+    "linked_warehouse",
+    "address",
+    "address_gstin",
+])
+
+
+class LocationContext(namedtuple("LocationContext", ["records"])):
+    """Immutable view of every Location referenced by a document.
+
+    records: read-only {location name: LocationRecord}
+    """
+
+    __slots__ = ()
+
+    def get(self, location):
+        """Return the LocationRecord for a location name, or None."""
+        return self.records.get(location) if location else None
+
+
+def get_location_context(doc):
+    """Load every location referenced by doc (see load_location_context)."""
+    return load_location_context(
+        doc.get(fieldname) for fieldname in LOCATION_FIELDS if hasattr(doc, fieldname)
+    )
+
+
+def load_location_context(locations):
+    """Build a LocationContext for the given location names.
+
+    Locations come from the worker-cached snapshots and their linked
+    Addresses from the site-cached GST details, so a warm save resolves every
+    location without a database query.
+    """
+    # utils imports this module
+    from location_based_series.utils import get_place_of_supply_for_addresses
+
+    snapshots = [get_location_snapshot(location) for location in sorted({location for location in locations if location})]
+    snapshots = [snapshot for snapshot in snapshots if snapshot]
+    addresses = get_place_of_supply_for_addresses(snapshot.linked_address for snapshot in snapshots)
+
+    records = {}
+    for snapshot in snapshots:
+        address = addresses.get(snapshot.linked_address)
+        records[snapshot.name] = LocationRecord(
+            name=snapshot.name,
+            lbs_location_code=snapshot.lbs_location_code,
+            linked_address=snapshot.linked_address,
+            linked_warehouse=snapshot.linked_warehouse,
+            address=snapshot.linked_address if address else None,
+            address_gstin=address["gstin"] if address else None,
+        )
+
+    return LocationContext(MappingProxyType(records))
+
+
+LOCATION_SNAPSHOT_CACHE = "location_snapshots"
+
+# Per-worker bound on cached Location snapshots
+LOCATION_SNAPSHOT_CACHE_SIZE = 1024
+
+
+class LocationSnapshot:
+    """The Location fields LBS reads, without the geolocation and tree columns."""
+
+    __slots__ = ("name", "lbs_location_code", "linked_address", "linked_warehouse")
+
+    def __init__(self, name, lbs_location_code=None, linked_address=None, linked_warehouse=None):
+        self.name = name
+        self.lbs_location_code = lbs_location_code
+        self.linked_address = linked_address
+        self.linked_warehouse = linked_warehouse
+
+    def __repr__(self):
+        return f"LocationSnapshot({self.name!r}, {self.lbs_location_code!r})"
+
+
+def get_location_snapshot(location):
+    """Return the LocationSnapshot of location from the worker cache, or None."""
+    if not location:
+        return None
+    return get_worker_cached(
+        LOCATION_SNAPSHOT_CACHE,
+        location,
+        lambda: _load_location_snapshot(location),
+        maxsize=LOCATION_SNAPSHOT_CACHE_SIZE,
+    )
+
+
+def _load_location_snapshot(location):
+    row = frappe.db.get_value("Location", location, LocationSnapshot.__slots__[1:], as_dict=True)
+    return LocationSnapshot(location, **row) if row else None
+
+
+def clear_location_snapshots(doc=None, method=None, *args):
+    """Location doc events: drop cached snapshots in every worker."""
+    clear_worker_cache(LOCATION_SNAPSHOT_CACHE)
+
+
+def get_location_record(location, context=None):
+    """Return the LocationRecord for location from context, loading it if needed."""
+    if not location:
+        return None
+    if context is None or location not in context.records:
+        context = load_location_context([location])
+    return context.get(location)
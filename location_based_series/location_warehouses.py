@@ -0,0 +1,208 @@
+import frappe
+from frappe.utils import cint, now
+from location_based_series import search_cache
+from location_based_series.logger import get_logger
+
+# Materialized Location -> Warehouse membership.
+#
+# LBS Location Warehouse holds one row per (location, warehouse) pair where the
+# warehouse is enabled, non-group and sits at or under the location's linked
+# warehouse. Validation and link search read this single indexed table instead
+# of walking the Warehouse tree on every request. Rows are refreshed from
+# Location / Warehouse doc events and can be rebuilt with
+# `bench --site <site> lbs-rebuild-location-warehouses`.
+
+MEMBERSHIP_DOCTYPE = "LBS Location Warehouse"
+
+
+def get_location_warehouses(location):
+    """Return the valid warehouses for location, ordered by name."""
+    if not location:
+        return []
+
+    return frappe.get_all(
+        MEMBERSHIP_DOCTYPE,
+        filters={"location": location},
+        pluck="warehouse",
+        order_by="warehouse asc",
+    )
+
+
+def get_location_warehouse_rows(location, limit=None):
+    """Return (name, warehouse_name) of the valid warehouses of location, ordered by name."""
+    if not location:
+        return []
+
+    Membership = frappe.qb.DocType(MEMBERSHIP_DOCTYPE)
+    Warehouse = frappe.qb.DocType("Warehouse")
+
+    query = (
+        frappe.qb.from_(Membership)
+        .join(Warehouse).on(Warehouse.name == Membership.warehouse)
+        .select(Warehouse.name, Warehouse.warehouse_name)
+        .where(Membership.location == location)
+        .orderby(Warehouse.name)
+    )
+    if limit:
+        query = query.limit(cint(limit))
+
+    return query.run()
+
+
+def _compute_location_warehouses(location):
+    """Resolve the valid warehouses of location from the Warehouse tree."""
+    linked_warehouse = frappe.db.get_value("Location", location, "linked_warehouse")
+    if not linked_warehouse:
+        return []
+
+    bounds = frappe.db.get_value("Warehouse", linked_warehouse, ["lft", "rgt"], as_dict=True)
+    if not bounds:
+        return []
+
+    # The lft/rgt range of a non-group warehouse contains only itself, so the
+    # same filter covers both group and non-group linked warehouses. As before
+    # the membership table, a disabled group still yields its enabled leaves.
+    return frappe.get_all(
+        "Warehouse",
+        filters={
+            "lft": (">=", bounds.lft),
+            "rgt": ("<=", bounds.rgt),
+            "is_group": 0,
+            "disabled": 0,
+        },
+        pluck="name",
+    )
+
+
+def rebuild_location_warehouses(location, clear_search_cache=True):
+    """Replace the membership rows of one location.
+
+    Cached link searches and client-side warehouse lists are invalidated
+    unless the caller clears them once for a whole batch.
+    """
+    frappe.db.delete(MEMBERSHIP_DOCTYPE, {"location": location})
+
+    warehouses = _compute_location_warehouses(location)
+    if warehouses:
+        timestamp = now()
+        user = frappe.session.user
+        frappe.db.bulk_insert(
+            MEMBERSHIP_DOCTYPE,
+            fields=["name", "location", "warehouse", "creation", "modified", "owner", "modified_by"],
+            values=[
+                (frappe.generate_hash(length=10), location, warehouse, timestamp, timestamp, user, user)
+                for warehouse in warehouses
+            ],
+        )
+
+    if clear_search_cache:
+        search_cache.clear_search_cache()
+
+
+def rebuild_all_location_warehouses():
+    """Rebuild membership rows for every location with a linked warehouse."""
+    frappe.db.delete(MEMBERSHIP_DOCTYPE)
+
+    locations = frappe.get_all("Location", filters={"linked_warehouse": ("is", "set")}, pluck="name")
+    for location in locations:
+        rebuild_location_warehouses(location, clear_search_cache=False)
+
+    search_cache.clear_search_cache()
+    get_logger().info("location_warehouses_rebuilt", locations=len(locations))
+    return len(locations)
+
+
+def _get_locations_affected_by_warehouse(warehouse):
+    """
+    Return locations whose membership can change when warehouse (and its
+    subtree) changes: locations linked at or above it in the tree, and
+    locations that currently list any warehouse of its subtree.
+    """
+    bounds = frappe.db.get_value("Warehouse", warehouse, ["lft", "rgt"], as_dict=True)
+    if not bounds:
+        return set()
+
+    Location = frappe.qb.DocType("Location")
+    Warehouse = frappe.qb.DocType("Warehouse")
+    Membership = frappe.qb.DocType(MEMBERSHIP_DOCTYPE)
+
+    ancestors = (
+        frappe.qb.from_(Location)
+        .join(Warehouse).on(Warehouse.name == Location.linked_warehouse)
+        .select(Location.name)
+        .where((Warehouse.lft <= bounds.lft) & (Warehouse.rgt >= bounds.rgt))
+    ).run(pluck=True)
+
+    current_members = (
+        frappe.qb.from_(Membership)
+        .join(Warehouse).on(Warehouse.name == Membership.warehouse)
+        .select(Membership.location)
+        .distinct()
+        .where((Warehouse.lft >= bounds.lft) & (Warehouse.rgt <= bounds.rgt))
+    ).run(pluck=True)
+
+    return set(ancestors) | set(current_members)
+
+
+def on_location_update(doc, method=None, *args):
+    """Location on_update / after_rename: refresh its membership rows.
+
+    The search cache is cleared by its own Location doc event.
+    """
+    rebuild_location_warehouses(doc.name, clear_search_cache=False)
+
+
+def on_location_trash(doc, method=None):
+    frappe.db.delete(MEMBERSHIP_DOCTYPE, {"location": doc.name})
+
+
+def on_warehouse_update(doc, method=None, *args):
+    """Warehouse on_update / after_rename: refresh every affected location.
+
+    Runs after the NestedSet controller has updated lft/rgt, so a warehouse
+    moved in the tree is picked up at its new position. The search cache is
+    cleared by its own Warehouse doc event.
+    """
+    for location in _get_locations_affected_by_warehouse(doc.name):
+        rebuild_location_warehouses(location, clear_search_cache=False)
+
+
+def on_warehouse_trash(doc, method=None):
+    frappe.db.delete(MEMBERSHIP_DOCTYPE, {"warehouse": doc.name})
+
+
+def _escape_like(txt):
+    """Escape LIKE wildcards so typed % and _ match literally."""
+    return txt.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_location_warehouses(location, txt=None, start=0, page_len=20):
+    """
+    Link-search the valid warehouses of location in a single query.
+
+    Reads the same LBS Location Warehouse rows as validation, so search and
+    validation cannot disagree. `txt` is matched in the database on name and
+    warehouse_name, and pagination is applied as LIMIT / OFFSET, so latency
+    does not depend on how many warehouses sit under the location.
+    """
+    if not location:
+        return []
+
+    Membership = frappe.qb.DocType(MEMBERSHIP_DOCTYPE)
+    Warehouse = frappe.qb.DocType("Warehouse")
+
+    query = (
+        frappe.qb.from_(Membership)
+        .join(Warehouse).on(Warehouse.name == Membership.warehouse)
+        .select(Warehouse.name, Warehouse.warehouse_name)
+        .where(Membership.location == location)
+        .orderby(Warehouse.name)
+        .limit(cint(page_len) or 20)
+        .offset(cint(start))
+    )
+
+    if txt:
+        pattern = f"%{_escape_like(txt)}%"
+        query = query.where(Warehouse.name.like(pattern) | Warehouse.warehouse_name.like(pattern))
+
+    return query.run()
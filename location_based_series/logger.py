@@ -0,0 +1,176 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+import frappe
+
+# Structured, level-gated logging for the naming / validation / POS paths.
+#
+#     log = get_logger()
+#     log.debug("autoname", sample=100, doctype=doc.doctype, name=doc.name)
+#
+# A call below the site's level returns before anything is built. Enabled
+# records carry the event and its fields unformatted; a background thread
+# serializes them to one JSON line and writes them through the handlers of
+# frappe.logger("location_based_series"), so file I/O never runs on the
+# request thread.
+#
+# The level is WARNING unless developer_mode is on (DEBUG), and can be set per
+# site with "lbs_log_level". sample=N keeps one in N records of an event;
+# "lbs_log_sampling": {"autoname": 1000} overrides N per event. Fields must be
+# plain values: they are serialized later, on the writer thread.
+
+LOGGER_NAME = "location_based_series"
+LOG_QUEUE_SIZE = 10000
+
+_queue_handler = None
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+_sample_counters = {}
+dropped_records = 0
+
+
+class StructuredMessage:
+    """Log message rendered to JSON only when a handler formats it."""
+
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps({"event": self.event, **self.fields}, default=str, separators=(",", ":"))
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        global dropped_records
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging
+            dropped_records += 1
+
+
+class _SiteHandlers(logging.Handler):
+    """Listener-side handler writing each record through the handlers captured with it."""
+
+    def handle(self, record):
+        for handler in record.lbs_handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+def _get_queue_handler():
+    """Return the process's queue handler, (re)starting the writer thread after a fork."""
+    global _queue_handler, _listener, _listener_pid
+    if _listener_pid != os.getpid():
+        with _listener_lock:
+            if _listener_pid != os.getpid():
+                log_queue = queue.Queue(LOG_QUEUE_SIZE)
+                _listener = QueueListener(log_queue, _SiteHandlers())
+                _listener.start()
+                _queue_handler = _DeferredQueueHandler(log_queue)
+                _listener_pid = os.getpid()
+    return _queue_handler
+
+
+def flush_logs(*args, **kwargs):
+    """Write every queued record and stop the writer thread (after_job / exit).
+
+    The next record starts it again. Forked job processes exit without
+    running atexit handlers, hence the after_job hook.
+    """
+    global _listener_pid
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+            _listener_pid = None
+
+
+atexit.register(flush_logs)
+
+
+def _site_level():
+    level = getattr(frappe.local, "lbs_log_level", None)
+    if level is None:
+        conf = frappe.conf or {}
+        configured = conf.get("lbs_log_level")
+        if configured:
+            level = logging.getLevelName(str(configured).upper())
+            if not isinstance(level, int):
+                level = logging.WARNING
+        else:
+            level = logging.DEBUG if conf.get("developer_mode") else logging.WARNING
+        frappe.local.lbs_log_level = level
+    return level
+
+
+def _sample_rate(event, sample):
+    rate = ((frappe.conf or {}).get("lbs_log_sampling") or {}).get(event, sample)
+    return rate if rate and rate > 1 else 1
+
+
+def _sampled_out(event, rate):
+    counter = _sample_counters.get(event)
+    if counter is None:
+        counter = _sample_counters.setdefault(event, itertools.count())
+    return next(counter) % rate != 0
+
+
+class StructuredLogger:
+    """Event logger; see the module comment."""
+
+    __slots__ = ()
+
+    def log(self, level, event, sample=None, **fields):
+        if level < _site_level():
+            return
+        rate = _sample_rate(event, sample)
+        if rate > 1:
+            if _sampled_out(event, rate):
+                return
+            fields["sampled"] = rate
+
+        fields["site"] = frappe.local.site
+
+        target = frappe.logger(LOGGER_NAME)
+        record = target.makeRecord(target.name, level, "", 0, StructuredMessage(event, fields), None, None)
+        record.lbs_handlers = tuple(target.handlers)
+        _get_queue_handler().handle(record)
+
+    def debug(self, event, sample=None, **fields):
+        self.log(logging.DEBUG, event, sample, **fields)
+
+    def info(self, event, sample=None, **fields):
+        self.log(logging.INFO, event, sample, **fields)
+
+    def warning(self, event, sample=None, **fields):
+        self.log(logging.WARNING, event, sample, **fields)
+
+    def error(self, event, sample=None, **fields):
+        self.log(logging.ERROR, event, sample, **fields)
+
+    def is_enabled(self, level):
+        """Whether records of level are written on this site, to guard expensive fields."""
+        return level >= _site_level()
+
+
+_logger = StructuredLogger()
+
+
+def get_logger():
+    return _logger
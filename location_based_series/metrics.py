@@ -0,0 +1,270 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+import frappe
+
+# In-process metrics for the LBS hot paths, exported in Prometheus text format.
+#
+# Every worker accumulates counter increments and histogram observations in
+# memory and adds them to one site-cache hash at most every
+# METRICS_FLUSH_INTERVAL seconds (and after each request / job once due), so
+# recording a metric never costs a Redis round trip on its own. The hash is
+# keyed by the exposition sample itself, e.g.
+#
+#     lbs_autoname_total{doctype="Sales Invoice",prefix="SI"}
+#
+# and get_metrics() only has to prepend the HELP / TYPE lines.
+
+METRICS_CACHE_KEY = "lbs_metrics"
+METRICS_FLUSH_INTERVAL = 10
+
+# Seconds; link searches and naming sit well below 100 ms when healthy
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+AUTONAME_TOTAL = "lbs_autoname_total"
+AUTONAME_DURATION = "lbs_autoname_duration_seconds"
+VALIDATE_STEP_DURATION = "lbs_validate_step_duration_seconds"
+SEARCH_DURATION = "lbs_search_duration_seconds"
+POS_UPDATE_DURATION = "lbs_pos_update_invoice_duration_seconds"
+SEARCH_CACHE_TOTAL = "lbs_search_cache_total"
+
+METRICS = {
+    AUTONAME_TOTAL: ("counter", "Documents named by custom_autoname, by doctype and series prefix."),
+    AUTONAME_DURATION: ("histogram", "custom_autoname latency by doctype."),
+    VALIDATE_STEP_DURATION: ("histogram", "validate_doc latency by doctype and step."),
+    SEARCH_DURATION: ("histogram", "Location-based link search latency by endpoint."),
+    POS_UPDATE_DURATION: ("histogram", "POS Awesome update_invoice latency."),
+    SEARCH_CACHE_TOTAL: ("counter", "Link search cache lookups by result (hit / miss)."),
+}
+
+_lock = threading.Lock()
+# site -> {(name, labels): amount} / {(name, labels): [bucket counts, sum, count]}
+# recorded in this worker and not yet added to the site cache
+_pending_counters = {}
+_pending_histograms = {}
+_last_flush = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def inc(name, amount=1, **labels):
+    """Increment a counter."""
+    key = (name, tuple(sorted(labels.items())))
+    site = frappe.local.site
+    with _lock:
+        counters = _pending_counters.setdefault(site, {})
+        counters[key] = counters.get(key, 0) + amount
+    flush_metrics_if_due()
+
+
+def observe(name, value, **labels):
+    """Record one histogram observation (value in seconds)."""
+    key = (name, tuple(sorted(labels.items())))
+    site = frappe.local.site
+    with _lock:
+        histograms = _pending_histograms.setdefault(site, {})
+        series = histograms.get(key)
+        if series is None:
+            # One slot per bucket plus +Inf; made cumulative on flush
+            series = histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        series[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+        series[1] += value
+        series[2] += 1
+    flush_metrics_if_due()
+
+
+def _expand(counters, histograms):
+    """Yield (sample, amount) for pending counters and histograms."""
+    for (name, labels), amount in counters.items():
+        yield _sample(name, labels), amount
+
+    for (name, labels), (buckets, total, count) in histograms.items():
+        cumulative = 0
+        for bound, observed in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += observed
+            yield _sample(f"{name}_bucket", labels + (("le", bound),)), cumulative
+        yield _sample(f"{name}_sum", labels), total
+        yield _sample(f"{name}_count", labels), count
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the block, also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+class StepTimer:
+    """Observe consecutive steps of one call: each lap() records the time since the previous one."""
+
+    __slots__ = ("name", "labels", "last")
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+        self.last = time.perf_counter()
+
+    def lap(self, step):
+        now = time.perf_counter()
+        observe(self.name, now - self.last, step=step, **self.labels)
+        self.last = now
+
+
+def timed(name, **labels):
+    """Decorator observing the duration of every call."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_search(fn):
+    """Decorator observing a link search endpoint.
+
+    Endpoints delegating to another endpoint (shipping -> main) are recorded
+    once, under the endpoint the client called. Place it above
+    validate_and_sanitize_search_inputs, which reads the wrapped signature.
+    """
+    endpoint = fn.__name__
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if getattr(frappe.local, "lbs_search_endpoint", None):
+            return fn(*args, **kwargs)
+
+        frappe.local.lbs_search_endpoint = endpoint
+        try:
+            with timer(SEARCH_DURATION, endpoint=endpoint):
+                return fn(*args, **kwargs)
+        finally:
+            frappe.local.lbs_search_endpoint = None
+
+    return wrapper
+
+
+def flush_metrics_if_due(*args, **kwargs):
+    """Flush this worker's pending metrics when the interval has passed (after_request / after_job)."""
+    site = getattr(frappe.local, "site", None)
+    if site and time.monotonic() - _last_flush.setdefault(site, time.monotonic()) >= METRICS_FLUSH_INTERVAL:
+        flush_metrics()
+
+
+def flush_metrics():
+    """Add this worker's pending metrics to the site-wide hash in one pipeline."""
+    site = frappe.local.site
+    with _lock:
+        counters = _pending_counters.pop(site, None) or {}
+        histograms = _pending_histograms.pop(site, None) or {}
+        _last_flush[site] = time.monotonic()
+    if not counters and not histograms:
+        return
+
+    # A raw pipeline: RedisWrapper.hset / hgetall pickle values, which
+    # HINCRBYFLOAT cannot add to
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    key = cache.make_key(METRICS_CACHE_KEY)
+    for sample, amount in _expand(counters, histograms):
+        pipeline.hincrbyfloat(key, sample, amount)
+    pipeline.execute()
+
+
+def _read_metrics():
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    pipeline.hgetall(cache.make_key(METRICS_CACHE_KEY))
+    (values,) = pipeline.execute()
+    return {
+        (sample.decode() if isinstance(sample, bytes) else sample): float(value)
+        for sample, value in (values or {}).items()
+    }
+
+
+def get_counter(name, **labels):
+    """Return the site-wide value of a counter, this worker's pending increments included."""
+    flush_metrics()
+    return _read_metrics().get(_sample(name, tuple(sorted(labels.items()))), 0)
+
+
+def _family(sample):
+    name = sample.split("{", 1)[0]
+    if name in METRICS:
+        return name
+    return name.rsplit("_", 1)[0]
+
+
+def _sort_key(item):
+    """Order samples by series, then histogram buckets by their numeric bound."""
+    sample = item[0]
+    head, sep, bound = sample.partition('le="')
+    if not sep:
+        return (sample, 0)
+    bound = bound.split('"', 1)[0]
+    return (head, float("inf") if bound == "+Inf" else float(bound))
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render_metrics(values):
+    """Return {sample: value} as Prometheus text exposition format."""
+    families = {}
+    for sample, value in values.items():
+        families.setdefault(_family(sample), []).append((sample, value))
+
+    lines = []
+    for family in sorted(families):
+        metric_type, help_text = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        lines.extend(f"{sample} {_format_value(value)}" for sample, value in sorted(families[family], key=_sort_key))
+    return "\n".join(lines) + "\n"
+
+
+@frappe.whitelist()
+def get_metrics():
+    """Prometheus scrape endpoint: LBS metrics of every worker of this site.
+
+    Workers flush at most every METRICS_FLUSH_INTERVAL seconds, so the last
+    few seconds of an idle worker may show up in the next scrape. Reading
+    never changes the values, so counters only ever grow.
+    """
+    from werkzeug.wrappers import Response
+
+    frappe.only_for("System Manager")
+
+    flush_metrics()
+    text = render_metrics(_read_metrics())
+
+    return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@frappe.whitelist(methods=["POST"])
+def reset_metrics():
+    """Maintenance: delete every LBS metric of this site.
+
+    Unsafe while Prometheus scrapes the site: increments recorded since the
+    last scrape are lost and every counter restarts from zero. Use it only to
+    drop stale label sets, with scraping paused.
+    """
+    frappe.only_for("System Manager")
+
+    frappe.cache().delete(frappe.cache().make_key(METRICS_CACHE_KEY))
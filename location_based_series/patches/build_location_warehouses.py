@@ -0,0 +1,10 @@
+import frappe
+
+from location_based_series.location_warehouses import rebuild_all_location_warehouses
+
+
+def execute():
+    """Populate LBS Location Warehouse from the current Warehouse tree."""
+    frappe.reload_doc("location_based_series", "doctype", "lbs_location_warehouse")
+    rebuild_all_location_warehouses()
+    frappe.db.commit()
@@ -1,21 +1,101 @@
 import frappe, json
 from frappe.utils import getdate
 from posawesome.posawesome.api.posapp import add_taxes_from_tax_template
+from location_based_series.location_context import get_location_snapshot
+from location_based_series.logger import get_logger
+from location_based_series.metrics import POS_UPDATE_DURATION, timed
+from location_based_series.pos_profile import get_pos_profile_context
+from location_based_series.query_budget import query_budget
+from location_based_series.utils import validate_location_dimension
+
+# Invoices accepted per update_invoices call, and committed together
+MAX_BATCH_INVOICES = 500
+BATCH_COMMIT_SIZE = 50
+
 
 @frappe.whitelist()
+@query_budget("update_invoice")
 def update_invoice(data):
     data = json.loads(data)
-    
-    # Inject location from POS Profile if not present
-    if not data.get("location") and data.get("pos_profile"):
-        location = frappe.db.get_value("POS Profile", data["pos_profile"], "location")
-        if location:
-            data["location"] = location
-            frappe.logger("location_based_series").info(f"[POSA] Injected location: {location}")
+    return _update_invoice(data)
+
+
+@frappe.whitelist(methods=["POST"])
+def update_invoices(invoices):
+    """
+    Save a batch of POS invoices queued by an offline terminal.
+
+    Each invoice runs through the same steps as update_invoice inside its own
+    savepoint, so one bad invoice does not undo the others. Work is committed
+    every BATCH_COMMIT_SIZE invoices. If the database has already rolled back
+    the whole transaction (deadlock, lock wait timeout), the savepoint is gone:
+    every invoice saved since the last commit is reported as failed too and the
+    batch continues in a fresh transaction. Returns one result per invoice, in
+    order: {"index", "status": "Saved" / "Failed", "name" or "error"}.
+    """
+    if isinstance(invoices, str):
+        invoices = json.loads(invoices)
+
+    if not frappe.has_permission("Sales Invoice", "create"):
+        frappe.throw("Not permitted to create Sales Invoice", frappe.PermissionError)
+    if len(invoices) > MAX_BATCH_INVOICES:
+        frappe.throw(f"At most {MAX_BATCH_INVOICES} invoices can be sent in one batch")
+
+    # Shared masters (dimension, profiles, locations) are resolved by the first
+    # invoice and served from the worker caches for the rest of the batch.
+    validate_location_dimension()
+
+    logger = get_logger()
+    results = []
+    # Saved results not committed yet
+    uncommitted = []
+    for index, data in enumerate(invoices):
+        frappe.db.savepoint("lbs_pos_batch")
+        try:
+            invoice_doc = _update_invoice(data)
+            results.append({"index": index, "status": "Saved", "name": invoice_doc.name})
+            uncommitted.append(results[-1])
+        except Exception as e:
+            results.append({"index": index, "status": "Failed", "error": str(e)})
+            logger.error("pos_batch_invoice_failed", index=index, error=str(e))
+            try:
+                frappe.db.rollback(save_point="lbs_pos_batch")
+            except Exception:
+                # The transaction is gone with the savepoint: so is every
+                # invoice saved since the last commit
+                frappe.db.rollback()
+                for result in uncommitted:
+                    result.update({"status": "Failed", "error": f"Rolled back with invoice {index}: {e}"})
+                    result.pop("name", None)
+                logger.error("pos_batch_transaction_lost", index=index, rolled_back=len(uncommitted))
+                uncommitted = []
+            frappe.clear_messages()
+
+        if (index + 1) % BATCH_COMMIT_SIZE == 0:
+            frappe.db.commit()
+            uncommitted = []
+
+    failed = sum(1 for result in results if result["status"] == "Failed")
+    logger.info("pos_batch_saved", saved=len(results) - failed, failed=failed)
+    return results
+
+
+@timed(POS_UPDATE_DURATION)
+def _update_invoice(data):
+    # Inject location from POS Profile if not present.
+    # Profile, its location and the location's code / address are resolved once per worker.
+    profile = get_pos_profile_context(data.get("pos_profile"))
+    if profile and profile.location and not data.get("location"):
+        data["location"] = profile.location
+        get_logger().debug("pos_location_injected", pos_profile=data.get("pos_profile"), location=profile.location)
     if data.get("location"):
-        loc = frappe.get_doc("Location", data["location"])
-        data["location_code"] = loc.location_code
-        data["company_address"] = loc.linked_address
+        if profile and data["location"] == profile.location:
+            lbs_location_code, linked_address = profile.lbs_location_code, profile.linked_address
+        else:
+            loc = get_location_snapshot(data["location"])
+            lbs_location_code, linked_address = (loc.lbs_location_code, loc.linked_address) if loc else (None, None)
+        data["lbs_location_code"] = lbs_location_code
+        data["company_address"] = linked_address
 
     if data.get("name"):
         invoice_doc = frappe.get_doc("Sales Invoice", data.get("name"))
@@ -38,7 +118,9 @@ def update_invoice(data):
             if payment.default:
                 payment.amount = invoice_doc.paid_amount
 
-    allow_zero_rated_items = frappe.get_cached_value("POS Profile", invoice_doc.pos_profile, "posa_allow_zero_rated_items")
+    if invoice_doc.pos_profile != data.get("pos_profile"):
+        profile = get_pos_profile_context(invoice_doc.pos_profile)
+    allow_zero_rated_items = profile.allow_zero_rated_items if profile else 0
     for item in invoice_doc.items:
         if not item.rate or item.rate == 0:
             if allow_zero_rated_items:
@@ -48,9 +130,9 @@ def update_invoice(data):
                 frappe.throw(("Rate cannot be zero for item {0}").format(item.item_code))
         else:
             item.is_free_item = 0
-        add_taxes_from_tax_template(item, invoice_doc)
+    _add_taxes_from_tax_templates(invoice_doc)
 
-    if frappe.get_cached_value("POS Profile", invoice_doc.pos_profile, "posa_tax_inclusive"):
+    if profile and profile.tax_inclusive:
         if invoice_doc.get("taxes"):
             for tax in invoice_doc.taxes:
                 tax.included_in_print_rate = 1
@@ -60,4 +142,29 @@ def update_invoice(data):
         invoice_doc.set_posting_time = 1
 
     invoice_doc.save()
-    return invoice_doc
\ No newline at end of file
+    return invoice_doc
+
+
+def _add_taxes_from_tax_templates(invoice_doc):
+    """
+    Apply each distinct (item_tax_template, item_tax_rate) pair once instead of
+    once per item.
+
+    add_taxes_from_tax_template adds a tax row per account of the item's tax
+    template / item_tax_rate that is not on the invoice yet, and reads nothing
+    else from the item. Items sharing both values therefore add the same rows,
+    so one call per pair matches one call per item. A pair is skipped when its
+    item_tax_rate names accounts and all of them are on the invoice already.
+    """
+    tax_items = {}
+    for item in invoice_doc.items:
+        if item.get("item_tax_template") or item.get("item_tax_rate"):
+            tax_items.setdefault((item.get("item_tax_template"), item.get("item_tax_rate")), item)
+
+    account_heads = {tax.account_head for tax in invoice_doc.get("taxes") or []}
+    for (_, item_tax_rate), item in tax_items.items():
+        tax_accounts = set(json.loads(item_tax_rate or "{}"))
+        if tax_accounts and tax_accounts <= account_heads:
+            continue
+        add_taxes_from_tax_template(item, invoice_doc)
+        account_heads.update(tax.account_head for tax in invoice_doc.get("taxes") or [])
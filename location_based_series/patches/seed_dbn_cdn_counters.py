@@ -1,4 +1,15 @@
 import frappe
+from frappe.utils import update_progress_bar
+from location_based_series.logger import get_logger
+
+# Source keys copied per INSERT ... SELECT statement
+BATCH_SIZE = 500
+
+# old prefix -> new prefix
+PREFIX_MAP = (
+    ("DN-", "DBN-"),
+    ("CN-", "CDN-"),
+)
 
 
 def execute():
@@ -11,53 +22,60 @@ def execute():
 
     Delivery Note continues to use the DN- rows untouched.
     Idempotent: re-running only raises counters, never lowers them.
+
+    Each batch of source keys is copied with one set-based
+    INSERT ... SELECT ... ON DUPLICATE KEY UPDATE GREATEST(...) and committed
+    on its own, so no lock is held across the whole table.
     """
-    logger = frappe.logger("location_based_series")
-
-    rows = frappe.db.sql(
-        """
-        SELECT name, `current`
-        FROM `tabSeries`
-        WHERE name LIKE 'DN-%' OR name LIKE 'CN-%'
-        """,
-        as_dict=True,
-    )
-
-    seeded = 0
-    for row in rows:
-        old_key = row["name"]
-        current_value = row["current"] or 0
-
-        if old_key.startswith("DN-"):
-            new_key = "DBN-" + old_key[len("DN-"):]
-        elif old_key.startswith("CN-"):
-            new_key = "CDN-" + old_key[len("CN-"):]
-        else:
-            continue
-
-        existing = frappe.db.sql(
-            "SELECT `current` FROM `tabSeries` WHERE name = %s",
-            (new_key,),
-        )
-
-        if not existing:
+    logger = get_logger()
+
+    for old_prefix, new_prefix in PREFIX_MAP:
+        pattern = old_prefix + "%"
+        total = frappe.db.sql(
+            "SELECT COUNT(*) FROM `tabSeries` WHERE name LIKE %s",
+            (pattern,),
+        )[0][0]
+
+        done = 0
+        last_name = ""
+        while True:
+            names = frappe.db.sql_list(
+                """
+                SELECT name FROM `tabSeries`
+                WHERE name LIKE %s AND name > %s
+                ORDER BY name
+                LIMIT %s
+                """,
+                (pattern, last_name, BATCH_SIZE),
+            )
+            if not names:
+                break
+
             frappe.db.sql(
-                "INSERT INTO `tabSeries` (name, `current`) VALUES (%s, %s)",
-                (new_key, current_value),
+                """
+                INSERT INTO `tabSeries` (name, `current`)
+                SELECT CONCAT(%(new_prefix)s, SUBSTRING(src.name, %(offset)s)), IFNULL(src.`current`, 0)
+                FROM `tabSeries` src
+                WHERE src.name LIKE %(pattern)s AND src.name > %(after)s AND src.name <= %(upto)s
+                ON DUPLICATE KEY UPDATE
+                    `current` = GREATEST(IFNULL(`tabSeries`.`current`, 0), VALUES(`current`))
+                """,
+                {
+                    "new_prefix": new_prefix,
+                    "offset": len(old_prefix) + 1,
+                    "pattern": pattern,
+                    "after": last_name,
+                    "upto": names[-1],
+                },
             )
-            seeded += 1
-            logger.info(f"[LBS] Seeded {new_key} = {current_value} (from {old_key})")
-        else:
-            existing_value = existing[0][0] or 0
-            if existing_value < current_value:
-                frappe.db.sql(
-                    "UPDATE `tabSeries` SET `current` = %s WHERE name = %s",
-                    (current_value, new_key),
-                )
-                seeded += 1
-                logger.info(
-                    f"[LBS] Raised {new_key} {existing_value} -> {current_value} (from {old_key})"
-                )
-
-    frappe.db.commit()
-    logger.info(f"[LBS] seed_dbn_cdn_counters patch complete — {seeded} rows updated")
+            frappe.db.commit()
+
+            done += len(names)
+            last_name = names[-1]
+            update_progress_bar(f"Seeding {new_prefix} counters", done, total)
+            logger.info("dbn_cdn_counters_seeded", prefix=new_prefix, source_prefix=old_prefix, done=done, total=total)
+
+        if total:
+            print()
+
+    logger.info("dbn_cdn_counters_seed_complete")
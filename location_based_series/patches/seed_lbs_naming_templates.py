@@ -0,0 +1,33 @@
+import frappe
+
+from location_based_series.events.naming import DEFAULT_NAMING_TEMPLATES
+
+
+def execute():
+    """Create LBS Naming Template records for the built-in series templates.
+
+    The built-in templates keep working without these records; seeding them
+    makes the active prefixes visible and editable without a code release.
+    Idempotent: existing records are left untouched.
+    """
+    frappe.reload_doc("location_based_series", "doctype", "lbs_naming_template")
+
+    for (document_type, is_return, is_debit_note), (template, lbs_doctype_code) in DEFAULT_NAMING_TEMPLATES.items():
+        if frappe.db.exists("LBS Naming Template", {
+            "document_type": document_type,
+            "is_return": is_return,
+            "is_debit_note": is_debit_note,
+        }):
+            continue
+
+        frappe.get_doc({
+            "doctype": "LBS Naming Template",
+            "document_type": document_type,
+            "is_return": is_return,
+            "is_debit_note": is_debit_note,
+            "naming_template": template,
+            "lbs_doctype_code": lbs_doctype_code,
+            "enabled": 1,
+        }).insert(ignore_permissions=True)
+
+    frappe.db.commit()
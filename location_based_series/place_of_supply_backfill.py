@@ -0,0 +1,111 @@
+import frappe
+from frappe.utils import cint
+
+from location_based_series.logger import get_logger
+from location_based_series.utils import get_place_of_supply_for_addresses
+
+# Backfill of place_of_supply on existing purchase documents.
+#
+# Documents are streamed in primary-key order, chunk by chunk. Place of supply
+# is resolved per chunk for the distinct addresses it references, through the
+# cached get_place_of_supply_for_addresses (one MGET, one Address query for
+# the misses), so memory stays bounded by the chunk size. Writes are one
+# UPDATE per distinct value. Each chunk is committed on its own and the last processed name is
+# stored as a watermark, so an interrupted run resumes where it stopped. The
+# watermark is cleared once a doctype has been scanned to the end.
+
+PURCHASE_DOCTYPES = ("Purchase Invoice", "Purchase Order", "Purchase Receipt")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _watermark_key(doctype):
+    return f"lbs_place_of_supply_backfill::{doctype}"
+
+
+def backfill_place_of_supply(doctypes=None, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, restart=False):
+    """
+    Set place_of_supply on purchase documents from their billing / company address.
+
+    Returns {doctype: {"scanned": n, "updated": n}}. With dry_run nothing is
+    written, watermarks included. With restart the stored watermarks are ignored.
+    """
+    logger = get_logger()
+    chunk_size = cint(chunk_size) or DEFAULT_CHUNK_SIZE
+    stats = {}
+
+    for doctype in doctypes or PURCHASE_DOCTYPES:
+        meta = frappe.get_meta(doctype)
+        if not meta.has_field("place_of_supply"):
+            continue
+
+        # Same precedence as set_place_of_supply_for_purchase_doc
+        address_fields = [f for f in ("billing_address", "company_address") if meta.has_field(f)]
+        if not address_fields:
+            continue
+
+        last_name = "" if restart else (frappe.db.get_default(_watermark_key(doctype)) or "")
+        scanned = updated = 0
+
+        while True:
+            rows = frappe.get_all(
+                doctype,
+                filters={"name": (">", last_name)},
+                fields=["name", "place_of_supply"] + address_fields,
+                order_by="name asc",
+                limit=chunk_size,
+            )
+            if not rows:
+                break
+
+            addresses = {row.name: next((row[f] for f in address_fields if row[f]), None) for row in rows}
+            details = get_place_of_supply_for_addresses(addresses.values())
+
+            changes = {}
+            for row in rows:
+                place_of_supply = (details.get(addresses[row.name]) or {}).get("place_of_supply")
+                if place_of_supply and row.place_of_supply != place_of_supply:
+                    changes.setdefault(place_of_supply, []).append(row.name)
+
+            scanned += len(rows)
+            updated += sum(len(names) for names in changes.values())
+            last_name = rows[-1].name
+
+            if not dry_run:
+                table = frappe.qb.DocType(doctype)
+                for place_of_supply, names in changes.items():
+                    (
+                        frappe.qb.update(table)
+                        .set(table.place_of_supply, place_of_supply)
+                        .where(table.name.isin(names))
+                    ).run()
+                frappe.db.set_default(_watermark_key(doctype), last_name)
+                frappe.db.commit()
+
+            logger.info(
+                "place_of_supply_backfill_chunk",
+                doctype=doctype, scanned=scanned, updated=updated, last_name=last_name, dry_run=bool(dry_run),
+            )
+
+        if not dry_run:
+            # Fully scanned: the next run starts over instead of resuming past the end
+            frappe.defaults.clear_default(_watermark_key(doctype), parent="__default")
+            frappe.db.commit()
+
+        stats[doctype] = {"scanned": scanned, "updated": updated}
+
+    return stats
+
+
+@frappe.whitelist()
+def enqueue_place_of_supply_backfill(dry_run=False, restart=False):
+    """Run backfill_place_of_supply as a long background job."""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        "location_based_series.place_of_supply_backfill.backfill_place_of_supply",
+        queue="long",
+        timeout=4 * 60 * 60,
+        job_id="lbs_place_of_supply_backfill",
+        deduplicate=True,
+        dry_run=cint(dry_run),
+        restart=cint(restart),
+    )
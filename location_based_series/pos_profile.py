@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+import frappe
+from frappe.utils import cint
+
+from location_based_series.cache import get_worker_cached, clear_worker_cache
+from location_based_series.location_context import get_location_snapshot
+from location_based_series.utils import get_location_dimension
+
+# Worker-level cache of what the POS Awesome override needs from a POS Profile.
+#
+# Resolved once per profile per worker and invalidated from POS Profile and
+# Location doc events, so cart updates no longer read masters on every call.
+
+POS_PROFILE_CACHE = "pos_profiles"
+
+POSProfileContext = namedtuple("POSProfileContext", [
+    "location",
+    "lbs_location_code",
+    "linked_address",
+    "tax_inclusive",
+    "allow_zero_rated_items",
+])
+
+
+def get_pos_profile_context(pos_profile):
+    """Return the POSProfileContext of pos_profile, or None if it does not exist."""
+    if not pos_profile:
+        return None
+
+    # The dimension fieldname is part of the key, so a changed Location
+    # dimension never serves a profile resolved against the old field.
+    dimension = get_location_dimension()
+    location_field = dimension["fieldname"] if dimension["enabled"] else None
+
+    return get_worker_cached(
+        POS_PROFILE_CACHE,
+        (pos_profile, location_field),
+        lambda: _load_pos_profile_context(pos_profile, location_field),
+    )
+
+
+def _load_pos_profile_context(pos_profile, location_field):
+    fields = ["posa_tax_inclusive", "posa_allow_zero_rated_items"]
+    if location_field:
+        fields.append(location_field)
+
+    profile = frappe.db.get_value("POS Profile", pos_profile, fields, as_dict=True)
+    if not profile:
+        return None
+
+    location = profile.get(location_field) if location_field else None
+    snapshot = get_location_snapshot(location)
+
+    return POSProfileContext(
+        location=location,
+        lbs_location_code=snapshot.lbs_location_code if snapshot else None,
+        linked_address=snapshot.linked_address if snapshot else None,
+        tax_inclusive=cint(profile.posa_tax_inclusive),
+        allow_zero_rated_items=cint(profile.posa_allow_zero_rated_items),
+    )
+
+
+def clear_pos_profile_cache(doc=None, method=None, *args):
+    """POS Profile / Location doc events: drop resolved profiles in every worker."""
+    clear_worker_cache(POS_PROFILE_CACHE)
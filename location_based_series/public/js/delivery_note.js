@@ -6,6 +6,7 @@ frappe.ui.form.on('Delivery Note', {
     location: function(frm) {
         if (window.locationUtils) {
             window.locationUtils.setLocationQueries(frm, 'main', 'location');
+            window.locationUtils.applyLocationBootstrap(frm, 'main', 'location');
         }
     },
     dispatch_location: function(frm) {
@@ -14,6 +14,11 @@ function setLocationQueries(frm, locationType, locationField) {
 
     if (!frm.doc[locationField]) return;
     
+    // The location bootstrap carries the warehouse list, so typeahead can
+    // filter in the browser without a request of its own
+    setupLocalWarehouseSearch(frm);
+    seedWarehousesFromBootstrap(frm.doc[locationField], locationType);
+    
     const queryMethod = locationType === 'dispatch' 
         ? 'location_based_series.utils.dispatch_location_based_warehouse_query'
         : locationType === 'shipping'
@@ -99,30 +104,283 @@ function clearLocationFields(frm, locationType) {
     // The calling function will handle re-applying main location warehouse filtering
 }
 
-// Generic function to auto-fill address
-function autoFillAddress(frm, locationType, locationField) {
-    if (!frm.doc[locationField]) return;
+// Location bootstrap responses per location: {promise, fetchedAt}
+var locationBootstrapEntries = locationBootstrapEntries || {};
+
+// A bootstrap response is fetched again once it is older than this, so
+// Location / Address edits reach forms that stay open
+var LOCATION_BOOTSTRAP_TTL_MS = 60 * 1000;
+
+// `var` throughout: the script can be evaluated more than once per page
+var PURCHASE_DOCTYPES = ['Purchase Invoice', 'Purchase Order', 'Purchase Receipt'];
+
+// Fetch code, address, warehouses and place of supply for a location in one request
+function getLocationBootstrap(location, locationType) {
+    const key = `${locationType}::${location}`;
+    const cached = locationBootstrapEntries[key];
     
-    const addressField = locationType === 'dispatch' ? 'dispatch_address_name' : 'shipping_address';
-    const methodName = locationType === 'dispatch' 
-        ? 'location_based_series.utils.get_filtered_addresses_for_dispatch_location'
-        : 'location_based_series.utils.get_filtered_addresses_for_shipping_location';
-    const paramName = locationType === 'dispatch' ? 'dispatch_location' : 'shipping_location';
+    // Reuse a pending request, or a response that is still fresh
+    if (cached && (!cached.fetchedAt || Date.now() - cached.fetchedAt < LOCATION_BOOTSTRAP_TTL_MS)) {
+        return cached.promise;
+    }
     
-    if (frm.fields_dict[addressField]) {
-        frappe.call({
-            method: methodName,
+    const entry = { fetchedAt: null };
+    entry.promise = frappe.call({
+        method: 'location_based_series.utils.get_location_bootstrap',
+        args: {
+            location: location,
+            location_type: locationType
+        }
+    }).then(function(r) {
+        const data = r.message || {};
+        data.__fetched_at = entry.fetchedAt = Date.now();
+        return data;
+    }, function(err) {
+        // Do not cache failures
+        if (locationBootstrapEntries[key] === entry) {
+            delete locationBootstrapEntries[key];
+        }
+        throw err;
+    });
+    locationBootstrapEntries[key] = entry;
+    
+    return entry.promise;
+}
+
+// Drop the bootstrap responses of a location, e.g. once its warehouse list
+// version has moved on
+function dropLocationBootstrap(location) {
+    Object.keys(locationBootstrapEntries).forEach(function(key) {
+        const entry = locationBootstrapEntries[key];
+        if (key.endsWith(`::${location}`) && entry.fetchedAt) {
+            delete locationBootstrapEntries[key];
+        }
+    });
+}
+
+// Whether this location type drives warehouse filtering on the form
+function isEffectiveLocation(frm, locationType) {
+    if (locationType === 'main') {
+        return !frm.doc.shipping_location && !frm.doc.dispatch_location;
+    }
+    return true;
+}
+
+// Apply the bootstrap of the selected location to the form
+function applyLocationBootstrap(frm, locationType, locationField) {
+    const location = frm.doc[locationField];
+    if (!location) return Promise.resolve();
+    
+    return getLocationBootstrap(location, locationType).then(function(data) {
+        // Ignore responses for a location that is no longer selected
+        if (frm.doc[locationField] !== location) return;
+        
+        frm.__lbs_bootstrap = frm.__lbs_bootstrap || {};
+        frm.__lbs_bootstrap[locationType] = data;
+        seedLocationWarehouses(location, data);
+        
+        if (locationType !== 'main') {
+            // Auto-fill address since it's one-to-one relationship
+            const addressField = locationType === 'dispatch' ? 'dispatch_address_name' : 'shipping_address';
+            if (frm.fields_dict[addressField] && data.addresses && data.addresses.length > 0) {
+                frm.set_value(addressField, data.addresses[0]);
+            }
+        } else if (data.place_of_supply && frm.fields_dict.place_of_supply
+                   && PURCHASE_DOCTYPES.includes(frm.doctype)) {
+            frm.set_value('place_of_supply', data.place_of_supply);
+        }
+        
+        // Pre-select the warehouse when the location has exactly one
+        if (data.default_warehouse && isEffectiveLocation(frm, locationType)
+            && frm.fields_dict.set_warehouse && !frm.doc.set_warehouse) {
+            frm.set_value('set_warehouse', data.default_warehouse);
+        }
+        
+        return data;
+    });
+}
+
+// Prefetched warehouse lists per location: {version, warehouses, checkedAt}
+var locationWarehouseLists = locationWarehouseLists || {};
+var warehouseListRequests = warehouseListRequests || {};
+
+// A prefetched list is revalidated against the server at most this often
+var WAREHOUSE_LIST_REVALIDATE_MS = 60 * 1000;
+
+// Warehouse link fields that are searched in the browser once a list is prefetched
+var LOCAL_SEARCH_FIELDS = ['set_warehouse', 'warehouse'];
+
+// Link queries whose results the prefetched list reproduces; a field whose
+// get_query was replaced by anything else keeps its server search
+var LOCAL_SEARCH_QUERIES = [
+    'location_based_series.utils.location_based_warehouse_query',
+    'location_based_series.utils.shipping_location_based_warehouse_query',
+    'location_based_series.utils.dispatch_location_based_warehouse_query',
+    'location_based_series.utils.child_table_warehouse_query',
+    'location_based_series.utils.child_table_shipping_location_warehouse_query',
+    'location_based_series.utils.child_table_dispatch_location_warehouse_query'
+];
+
+// Take the warehouse list of a bootstrap response unless a list is already held;
+// a held list is kept current by prefetchLocationWarehouses instead
+function seedLocationWarehouses(location, data) {
+    const list = data && data.warehouse_list;
+    if (!location || !list || !list.version || locationWarehouseLists[location]) return;
+    
+    locationWarehouseLists[location] = {
+        version: list.version,
+        warehouses: list.warehouses || null,
+        checkedAt: data.__fetched_at || Date.now()
+    };
+}
+
+// Seed from the (shared, cached) bootstrap request of a location
+function seedWarehousesFromBootstrap(location, locationType) {
+    if (!location) return;
+    getLocationBootstrap(location, locationType).then(function(data) {
+        seedLocationWarehouses(location, data);
+    }, function() {
+        // Typeahead falls back to the server search
+    });
+}
+
+// Revalidate the warehouse list of a location once it is older than
+// WAREHOUSE_LIST_REVALIDATE_MS (only the version is sent back when unchanged)
+function prefetchLocationWarehouses(location) {
+    if (!location) return Promise.resolve(null);
+    
+    const entry = locationWarehouseLists[location];
+    if (entry && Date.now() - entry.checkedAt < WAREHOUSE_LIST_REVALIDATE_MS) {
+        return Promise.resolve(entry);
+    }
+    
+    if (!warehouseListRequests[location]) {
+        warehouseListRequests[location] = frappe.call({
+            method: 'location_based_series.utils.get_location_warehouse_list',
             args: {
-                [paramName]: frm.doc[locationField]
+                location: location,
+                version: entry ? entry.version : null
             },
-            callback: function(r) {
-                if (r.message && r.message.length > 0) {
-                    // Set the address to the first (and only) available address
-                    frm.set_value(addressField, r.message[0]);
-                }
+            no_spinner: true
+        }).then(function(r) {
+            const data = r.message || {};
+            // "Not modified" keeps the list already held
+            const current = (data.not_modified && entry)
+                ? entry
+                : { version: data.version, warehouses: data.warehouses || null };
+            // A new server version stamp also outdates the bootstrap responses
+            if (entry && current.version !== entry.version) {
+                dropLocationBootstrap(location);
             }
+            current.checkedAt = Date.now();
+            locationWarehouseLists[location] = current;
+            return current;
+        }, function() {
+            return entry || null;
+        }).finally(function() {
+            delete warehouseListRequests[location];
         });
     }
+    
+    return warehouseListRequests[location];
+}
+
+// Location the control's own get_query searches in, or null when the field
+// is not using an LBS warehouse query
+function getQueryLocation(frm, control) {
+    const getQuery = control.get_query || (control.df && control.df.get_query);
+    if (typeof getQuery !== 'function') return null;
+    
+    const doc = control.doc || frm.doc;
+    const query = getQuery(frm.doc, doc.doctype, doc.name) || {};
+    if (!LOCAL_SEARCH_QUERIES.includes(query.query)) return null;
+    
+    const filters = query.filters || {};
+    return filters.shipping_location || filters.dispatch_location || filters.location || null;
+}
+
+// Whether the Link control exposes the awesomplete suggestion list this
+// relies on; otherwise the control's server search is left to run
+function canShowLocalResults(control) {
+    const awesomplete = control.awesomplete;
+    return !!(awesomplete && 'list' in awesomplete && typeof awesomplete.evaluate === 'function');
+}
+
+// Filter a prefetched list the way the server search does (substring on name / warehouse name)
+function filterWarehouses(warehouses, txt, limit) {
+    const term = (txt || '').toLowerCase();
+    const results = [];
+    
+    for (const [name, warehouseName] of warehouses) {
+        if (!term || name.toLowerCase().includes(term)
+            || (warehouseName || '').toLowerCase().includes(term)) {
+            results.push({
+                value: name,
+                description: warehouseName && warehouseName !== name ? warehouseName : ''
+            });
+            if (results.length >= limit) break;
+        }
+    }
+    
+    return results;
+}
+
+// Find the Link control behind a warehouse input of the form or the items grid
+function getWarehouseControl(frm, input) {
+    const fieldname = input.getAttribute('data-fieldname');
+    const $row = $(input).closest('.grid-row');
+    
+    if (!$row.length) {
+        return fieldname === 'set_warehouse' ? frm.fields_dict.set_warehouse : null;
+    }
+    
+    const grid = frm.fields_dict.items && frm.fields_dict.items.grid;
+    if (fieldname !== 'warehouse' || !grid || !$.contains(grid.wrapper.get(0), input)) return null;
+    
+    const gridRow = grid.grid_rows_by_docname[$row.attr('data-name')];
+    if (!gridRow) return null;
+    
+    return (gridRow.on_grid_fields_dict && gridRow.on_grid_fields_dict[fieldname])
+        || (gridRow.grid_form && gridRow.grid_form.fields_dict[fieldname])
+        || null;
+}
+
+// Serve warehouse typeahead from the prefetched list instead of the server
+function setupLocalWarehouseSearch(frm) {
+    if (frm.__lbs_local_search) return;
+    frm.__lbs_local_search = true;
+    
+    // Capture phase, so this runs before the Link control's own server search
+    $(frm.wrapper).get(0).addEventListener('input', function(e) {
+        const input = e.target;
+        if (!input.getAttribute || !LOCAL_SEARCH_FIELDS.includes(input.getAttribute('data-fieldname'))) return;
+        
+        const control = getWarehouseControl(frm, input);
+        if (!control || !canShowLocalResults(control)) return;
+        
+        const location = getQueryLocation(frm, control);
+        if (!location) return;
+        
+        const entry = locationWarehouseLists[location];
+        // Revalidate in the background; this keystroke uses the list already held
+        prefetchLocationWarehouses(location);
+        if (!entry || !entry.warehouses) return;
+        
+        const limit = cint(frappe.boot.sysdefaults && frappe.boot.sysdefaults.link_field_results_limit) || 10;
+        try {
+            control.awesomplete.list = filterWarehouses(entry.warehouses, input.value, limit);
+        } catch (err) {
+            // Unexpected control internals: let the server search answer
+            return;
+        }
+        // Served locally, so the control's own server search is not needed
+        e.stopPropagation();
+    }, true);
+}
+
+// Generic function to auto-fill address
+function autoFillAddress(frm, locationType, locationField) {
+    return applyLocationBootstrap(frm, locationType, locationField);
 }
 
 // Generic function to reset warehouse fields
@@ -147,8 +405,8 @@ function resetWarehouseFields(frm) {
 function handleLocationChange(frm, locationType, locationField) {
     if (frm.doc[locationField]) {
         setLocationQueries(frm, locationType, locationField);
-        // Auto-fill address since it's one-to-one relationship
-        autoFillAddress(frm, locationType, locationField);
+        // Address, warehouses and place of supply in one request
+        applyLocationBootstrap(frm, locationType, locationField);
     } else {
         // If location is cleared, check priority and apply appropriate filtering
         clearLocationFields(frm, locationType);
@@ -176,6 +434,9 @@ window.locationUtils = {
     setLocationQueries,
     clearLocationFields,
     autoFillAddress,
+    getLocationBootstrap,
+    applyLocationBootstrap,
+    prefetchLocationWarehouses,
     resetWarehouseFields,
     handleLocationChange
 }; 
\ No newline at end of file
@@ -7,6 +7,7 @@ frappe.ui.form.on('Purchase Order', {
         // Update warehouse queries when location changes
         if (window.locationUtils) {
             window.locationUtils.setLocationQueries(frm, 'main', 'location');
+            window.locationUtils.applyLocationBootstrap(frm, 'main', 'location');
         }
     },
     
@@ -0,0 +1,159 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+import frappe
+from location_based_series.logger import get_logger
+
+# Per-step query budgets.
+#
+# query_budget(name) counts database round trips (frappe.db.sql calls), rows
+# fetched and cache reads while a step runs, and compares them with the step's
+# ceilings. Budgets nest: a POS update_invoice budget also counts what its
+# validate_doc and custom_autoname steps spend.
+#
+# Counting is off unless developer_mode or `lbs_query_budget.enabled` is set
+# in site config. Exceeding a ceiling is logged as a warning; it raises
+# QueryBudgetExceeded only when `lbs_query_budget.enforce` is set (e.g. on CI).
+# Ceilings can be overridden per step:
+#
+#     "lbs_query_budget": {"enabled": 1, "enforce": 1, "validate_doc": {"queries": 20}}
+
+# None means counted and logged, never enforced
+DEFAULT_QUERY_BUDGETS = {
+    "validate_doc": {"queries": 15, "rows": None, "cache_reads": 30},
+    "custom_autoname": {"queries": 8, "rows": None, "cache_reads": 15},
+    # A POS save runs the whole ERPNext invoice save, so only LBS steps are capped
+    "update_invoice": {"queries": None, "rows": None, "cache_reads": None},
+}
+
+COUNTERS = ("queries", "rows", "cache_reads")
+CACHE_READ_METHODS = ("get_value", "hget", "hgetall", "mget")
+
+_install_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(frappe.ValidationError):
+    pass
+
+
+def _get_config():
+    return frappe.conf.get("lbs_query_budget") or {}
+
+
+def is_query_budget_enabled():
+    return bool(frappe.conf.get("developer_mode") or _get_config().get("enabled"))
+
+
+def get_query_budget(name):
+    """Return the ceilings of a step, site config overriding the defaults."""
+    budget = dict(DEFAULT_QUERY_BUDGETS.get(name) or {})
+    budget.update(_get_config().get(name) or {})
+    return budget
+
+
+def _active_budgets():
+    budgets = getattr(frappe.local, "lbs_query_budgets", None)
+    if budgets is None:
+        budgets = frappe.local.lbs_query_budgets = []
+    return budgets
+
+
+def _count(budgets, counter, amount=1):
+    for usage in budgets:
+        usage[counter] += amount
+
+
+def _counting_sql(sql):
+    @wraps(sql)
+    def counted_sql(*args, **kwargs):
+        result = sql(*args, **kwargs)
+        budgets = getattr(frappe.local, "lbs_query_budgets", None)
+        if budgets:
+            _count(budgets, "queries")
+            # Rows of a fetched result; as_iterator results are not counted
+            if hasattr(result, "__len__"):
+                _count(budgets, "rows", len(result))
+        return result
+    counted_sql.lbs_counting = True
+    return counted_sql
+
+
+def _counting_cache_read(read):
+    @wraps(read)
+    def counted_read(*args, **kwargs):
+        budgets = getattr(frappe.local, "lbs_query_budgets", None)
+        if budgets:
+            _count(budgets, "cache_reads")
+        return read(*args, **kwargs)
+    counted_read.lbs_counting = True
+    return counted_read
+
+
+def _install_counters():
+    """Wrap the database and cache classes once per process.
+
+    The wrappers stay installed and count only while the calling request has
+    an open budget, so concurrent requests never patch shared objects.
+    """
+    targets = [(type(frappe.db), ("sql",), _counting_sql)]
+    targets.append((type(frappe.cache()), CACHE_READ_METHODS, _counting_cache_read))
+
+    for cls, methods, wrapper in targets:
+        for method in methods:
+            if getattr(getattr(cls, method), "lbs_counting", False):
+                continue
+            with _install_lock:
+                original = getattr(cls, method)
+                if not getattr(original, "lbs_counting", False):
+                    setattr(cls, method, wrapper(original))
+
+
+@contextmanager
+def query_budget_step(name):
+    """Count queries, rows and cache reads of a step and enforce its ceilings."""
+    if not is_query_budget_enabled():
+        yield None
+        return
+
+    _install_counters()
+    budgets = _active_budgets()
+    usage = dict.fromkeys(COUNTERS, 0)
+    budgets.append(usage)
+
+    try:
+        yield usage
+    finally:
+        # Steps nest, so the innermost budget is always the last one
+        budgets.pop()
+
+    _check_budget(name, usage)
+
+
+def _check_budget(name, usage):
+    logger = get_logger()
+    logger.debug("query_budget", step=name, **usage)
+
+    budget = get_query_budget(name)
+    exceeded = [
+        f"{counter} {usage[counter]} > {budget[counter]}"
+        for counter in COUNTERS
+        if budget.get(counter) is not None and usage[counter] > budget[counter]
+    ]
+    if not exceeded:
+        return
+
+    logger.warning("query_budget_exceeded", step=name, exceeded=exceeded, **usage)
+    if _get_config().get("enforce"):
+        frappe.throw(f"[LBS] Query budget exceeded for {name}: {', '.join(exceeded)}", QueryBudgetExceeded)
+
+
+def query_budget(name):
+    """Decorator running the function as a query_budget_step."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_budget_step(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,94 @@
+import frappe
+from frappe.utils import cint, flt
+
+from location_based_series import metrics
+from location_based_series.cache import get_site_cached, clear_site_cache
+
+# Site-cache of location-based link search results.
+#
+# Keys combine a namespace version with (location type, location, doctype,
+# search text, page), so typing the same prefix again is served without
+# touching the database. Any Location, Warehouse or Address change replaces
+# the version, which orphans every cached page at once; orphaned pages simply
+# expire.
+
+SEARCH_CACHE_VERSION_KEY = "lbs_search_cache_version"
+SEARCH_CACHE_TTL = 10 * 60
+# Counter values at the last stats reset; the exported counters are never reset
+SEARCH_CACHE_STATS_BASELINE_KEY = "lbs_search_cache_stats_baseline"
+
+
+def get_search_cache_version():
+    return get_site_cached(SEARCH_CACHE_VERSION_KEY, lambda: frappe.generate_hash(length=10))
+
+
+def get_cached_search_result(location_type, location, doctype, txt, start, page_len, generator):
+    """Return cached search results, running generator() on a miss."""
+    key = "::".join((
+        "lbs_search",
+        get_search_cache_version(),
+        location_type,
+        location,
+        doctype,
+        txt or "",
+        str(cint(start)),
+        str(cint(page_len)),
+    ))
+
+    result = frappe.cache().get_value(key)
+    if result is not None:
+        _count("hit")
+        return result
+
+    _count("miss")
+    result = [list(row) for row in generator()]
+    frappe.cache().set_value(key, result, expires_in_sec=SEARCH_CACHE_TTL)
+    return result
+
+
+def clear_search_cache(doc=None, method=None, *args):
+    """Invalidate all cached search results (Location / Warehouse / Address doc events)."""
+    clear_site_cache(SEARCH_CACHE_VERSION_KEY)
+
+
+def clear_search_cache_for_address(doc, method=None, *args):
+    """Address doc events: invalidate only when the address is linked to a Location."""
+    if frappe.db.exists("Location", {"linked_address": doc.name}):
+        clear_search_cache()
+
+
+def _count(result):
+    # Accumulated in worker memory and flushed with the other LBS metrics
+    metrics.inc(metrics.SEARCH_CACHE_TOTAL, result=result)
+
+
+@frappe.whitelist()
+def get_search_cache_stats(reset=False):
+    """Return search cache hit/miss counts for this site since the last reset.
+
+    reset=1 starts a new window after reading. It stores the current counter
+    values as a baseline instead of touching lbs_search_cache_total, so the
+    exported counters stay monotonic. Other workers' lookups since their last
+    metrics flush are not included yet.
+    """
+    frappe.only_for("System Manager")
+
+    baseline = frappe.cache().get_value(SEARCH_CACHE_STATS_BASELINE_KEY) or {}
+    totals, counts = {}, {}
+    for result in ("hit", "miss"):
+        totals[result] = cint(metrics.get_counter(metrics.SEARCH_CACHE_TOTAL, result=result))
+        start = baseline.get(result, 0)
+        # A baseline above the counter means reset_metrics ran since
+        counts[result] = totals[result] - start if totals[result] >= start else totals[result]
+
+    if cint(reset):
+        frappe.cache().set_value(SEARCH_CACHE_STATS_BASELINE_KEY, totals)
+
+    hits, misses = counts["hit"], counts["miss"]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": flt(hits / lookups, 4) if lookups else 0,
+        "version": get_search_cache_version(),
+    }
@@ -0,0 +1,301 @@
+import os
+import socket
+import threading
+import time
+
+import frappe
+from frappe.utils import cint
+from location_based_series.logger import get_logger
+
+# Block-reserved series counters.
+#
+# By default every insert takes a row lock on its tabSeries key through
+# make_autoname, which serializes inserts per location + fiscal year. Doctypes
+# listed in the `lbs_series_block_size` site config (e.g. {"Sales Order": 50})
+# instead reserve a block of counter values in one locked update and hand them
+# out from worker memory. Numbers left unused when a block expires or a worker
+# restarts are recorded as LBS Series Gap rows by reconcile_block_series.
+
+# GST invoices (SI / PI and their CDN / DBN returns) must stay gap-free, so
+# block reservation is never used for them whatever the site config says.
+STRICT_SERIES_DOCTYPES = ("Sales Invoice", "Purchase Invoice")
+
+# A worker stops handing out numbers from a block after this many seconds so
+# its remainder can be reconciled even if the worker never finishes the block.
+BLOCK_TTL_SECONDS = 6 * 60 * 60
+
+# Exhausted blocks stay registered briefly so reconciliation does not count
+# numbers whose documents are still being committed as gaps.
+RETIRED_BLOCK_GRACE_SECONDS = 5 * 60
+
+LIVE_BLOCKS_CACHE_KEY = "lbs_series_live_blocks"
+BLOCK_KEYS_CACHE_KEY = "lbs_series_block_keys"
+
+# (site, key) -> committed blocks shared by every request of this worker.
+# Blocks reserved by a still-open transaction live in frappe.local until it
+# commits, so no other request can hand out numbers a rollback would reuse.
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def get_series_block_size(doctype):
+    """Return the configured block size for doctype, or 0 for strict mode."""
+    if doctype in STRICT_SERIES_DOCTYPES:
+        return 0
+
+    config = frappe.conf.get("lbs_series_block_size") or {}
+    return max(cint(config.get(doctype)), 0)
+
+
+def split_series_pattern(pattern):
+    """Split a dotted series pattern into its tabSeries key and counter width.
+
+    "SO.MUM.26.-.####" -> ("SOMUM26-", 4). Width is 0 when there is no counter.
+    """
+    key = ""
+    for part in pattern.split("."):
+        if part.startswith("#"):
+            return key, len(part)
+        key += part
+    return key, 0
+
+
+def get_next_series_value(key, digits, block_size, doctype):
+    """Return the next counter value for key from this worker's reserved block.
+
+    A block reserved by the current transaction is used first, then the
+    worker's committed block; a new block is reserved when both are used up.
+    """
+    block_key = (frappe.local.site, key)
+    pending = _get_pending_blocks()
+    retired = []
+
+    with _blocks_lock:
+        current = _take(pending.get(block_key))
+        shared = _blocks.get(block_key) or []
+        while current is None and shared:
+            current = _take(shared[0])
+            if current is None or shared[0]["next"] > shared[0]["end"]:
+                # Used up or expired: stop handing it out
+                retired.append(shared.pop(0))
+
+    for block in retired:
+        _retire_block(block)
+
+    if current is None:
+        block = pending[block_key] = _reserve_block(key, block_size, doctype, digits)
+        current = _take(block)
+
+    return ("%0" + str(digits) + "d") % current
+
+
+def _get_pending_blocks():
+    """Blocks reserved by the current request's uncommitted transaction."""
+    pending = getattr(frappe.local, "lbs_pending_series_blocks", None)
+    if pending is None:
+        pending = frappe.local.lbs_pending_series_blocks = {}
+    return pending
+
+
+def _take(block):
+    """Return the next number of block and advance it, or None when it is used up or expired."""
+    if not block or block["next"] > block["end"] or _is_expired(block):
+        return None
+    current = block["next"]
+    block["next"] += 1
+    return current
+
+
+def _is_expired(block):
+    return time.time() - block["reserved_at"] > BLOCK_TTL_SECONDS
+
+
+def _worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _reserve_block(key, block_size, doctype, digits):
+    """Reserve block_size counter values for key in one locked update.
+
+    The reservation runs in the caller's transaction. The block is only
+    shared with other requests once that transaction commits; on rollback it
+    is dropped, because the counter update was rolled back with it.
+    """
+    current = frappe.db.sql(
+        "SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE",
+        (key,),
+    )
+
+    if current and current[0][0] is not None:
+        start = cint(current[0][0]) + 1
+        frappe.db.sql(
+            "UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s",
+            (block_size, key),
+        )
+    else:
+        start = 1
+        frappe.db.sql(
+            "INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)",
+            (key, block_size),
+        )
+
+    block = {
+        "site": frappe.local.site,
+        "key": key,
+        "doctype": doctype,
+        "digits": digits,
+        "start": start,
+        "next": start,
+        "end": start + block_size - 1,
+        "reserved_at": time.time(),
+        "worker": _worker_id(),
+    }
+
+    frappe.db.after_commit.add(lambda: _register_block(block))
+    frappe.db.after_rollback.add(lambda: _discard_block(block))
+
+    get_logger().info(
+        "series_block_reserved", key=key, start=block["start"], end=block["end"], worker=block["worker"]
+    )
+    return block
+
+
+def _get_series_current(key):
+    # tabSeries has no `modified` column, so the default order_by cannot be used
+    return cint(frappe.db.get_value("Series", key, "current", order_by="name"))
+
+
+def _block_field(block):
+    return f"{block['key']}|{block['start']}"
+
+
+def _register_block(block):
+    """Share a committed block with the worker and record it as live so
+    reconciliation skips its numbers.
+
+    Requests that found no usable block at the same time each reserve one;
+    all of them are kept and used in turn, so none is wasted.
+    """
+    block_key = (block["site"], block["key"])
+    _discard_block(block)
+
+    # A savepoint rollback can undo the reservation without firing
+    # after_rollback; never hand out numbers the counter does not cover.
+    current = _get_series_current(block["key"])
+    if current < block["end"]:
+        return
+
+    frappe.cache().hset(BLOCK_KEYS_CACHE_KEY, block["key"], {
+        "doctype": block["doctype"],
+        "digits": block["digits"],
+    })
+
+    if block["next"] > block["end"] or _is_expired(block):
+        _retire_block(block)
+        return
+
+    with _blocks_lock:
+        _blocks.setdefault(block_key, []).append(block)
+    _publish_block(block, block["reserved_at"] + BLOCK_TTL_SECONDS)
+
+
+def _retire_block(block):
+    _publish_block(block, time.time() + RETIRED_BLOCK_GRACE_SECONDS)
+
+
+def _publish_block(block, expires):
+    frappe.cache().hset(LIVE_BLOCKS_CACHE_KEY, _block_field(block), {
+        "key": block["key"],
+        "start": block["start"],
+        "end": block["end"],
+        "expires": expires,
+        "worker": block["worker"],
+    })
+
+
+def _discard_block(block):
+    """Forget a block reserved by the current transaction (commit or rollback)."""
+    pending = _get_pending_blocks()
+    block_key = (block["site"], block["key"])
+    if pending.get(block_key) is block:
+        del pending[block_key]
+
+
+def _get_live_block_starts(key):
+    """Return start numbers of blocks for key that workers may still hand out.
+
+    Expired registry entries are dropped on the way.
+    """
+    now = time.time()
+    starts = []
+    for field, block in (frappe.cache().hgetall(LIVE_BLOCKS_CACHE_KEY) or {}).items():
+        if block["expires"] <= now:
+            frappe.cache().hdel(LIVE_BLOCKS_CACHE_KEY, frappe.safe_decode(field))
+        elif block["key"] == key:
+            starts.append(block["start"])
+    return starts
+
+
+def _get_used_counters(key, doctype, digits, lower, upper):
+    """Return the counters between lower and upper (inclusive) used by documents of key.
+
+    Names are zero-padded to digits, so the range is a bounded scan of the
+    name index instead of every document of the series.
+    """
+    filters = [["name", "like", f"{key}%"]]
+    if digits and len(str(upper + 1)) <= digits:
+        counter = "%0" + str(digits) + "d"
+        filters += [
+            ["name", ">=", key + counter % lower],
+            # Amended names ("...0042-1") sort before the next counter
+            ["name", "<", key + counter % (upper + 1)],
+        ]
+
+    used = set()
+    for name in frappe.get_all(doctype, filters=filters, pluck="name"):
+        # Amended documents carry a "-1" style suffix after the counter
+        counter = name[len(key):].split("-")[0]
+        if counter.isdigit():
+            used.add(int(counter))
+    return used
+
+
+def reconcile_block_series():
+    """Record unused numbers of block-reserved series as LBS Series Gap rows.
+
+    Scheduled hourly. For every series key that has handed out blocks, numbers
+    above the last reconciled watermark and below any block still held by a
+    live worker are compared against existing document names.
+    """
+    logger = get_logger()
+    block_keys = frappe.cache().hgetall(BLOCK_KEYS_CACHE_KEY) or {}
+
+    for key, series in block_keys.items():
+        key = frappe.safe_decode(key)
+        # Entries written before the counter width was recorded hold the doctype only
+        doctype, digits = (series["doctype"], series["digits"]) if isinstance(series, dict) else (series, None)
+
+        current = _get_series_current(key)
+        live_starts = _get_live_block_starts(key)
+        upper = min([current] + [start - 1 for start in live_starts])
+
+        watermark_key = f"lbs_series_reconciled::{key}"
+        watermark = cint(frappe.db.get_default(watermark_key))
+        if upper <= watermark:
+            continue
+
+        used = _get_used_counters(key, doctype, digits, watermark + 1, upper)
+        gaps = [n for n in range(watermark + 1, upper + 1) if n not in used]
+        for number in gaps:
+            frappe.get_doc({
+                "doctype": "LBS Series Gap",
+                "series_key": key,
+                "reference_doctype": doctype,
+                "series_number": number,
+            }).insert(ignore_permissions=True)
+
+        frappe.db.set_default(watermark_key, upper)
+        frappe.db.commit()
+
+        if gaps:
+            logger.info("series_gaps_recorded", key=key, doctype=doctype, gaps=len(gaps))
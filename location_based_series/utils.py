@@ -1,5 +1,60 @@
+import pickle
+
 import frappe
-from frappe.utils.nestedset import get_descendants_of
+from location_based_series.cache import get_site_cached, clear_site_cache
+from location_based_series.location_context import (
+    get_location_record,
+    get_location_snapshot,
+    load_location_context,
+)
+from location_based_series.logger import get_logger
+from location_based_series.location_warehouses import (
+    MEMBERSHIP_DOCTYPE,
+    get_location_warehouse_rows,
+    get_location_warehouses,
+    search_location_warehouses,
+)
+from location_based_series.metrics import timed_search
+from location_based_series.search_cache import get_cached_search_result, get_search_cache_version
+
+LOCATION_DIMENSION_CACHE_KEY = "lbs_location_accounting_dimension"
+
+
+def get_location_dimension():
+    """
+    Return the Location Accounting Dimension status from the site cache:
+    {"enabled": 0/1, "name": ..., "fieldname": ...}.
+    Invalidated from Accounting Dimension doc events.
+    """
+    return get_site_cached(LOCATION_DIMENSION_CACHE_KEY, _load_location_dimension)
+
+
+def _load_location_dimension():
+    dimension = frappe.db.get_value(
+        "Accounting Dimension",
+        {"document_type": "Location", "disabled": 0},
+        ["name", "fieldname"],
+        as_dict=True
+    )
+    if not dimension:
+        return {"enabled": 0, "name": None, "fieldname": None}
+    return {"enabled": 1, "name": dimension.name, "fieldname": dimension.fieldname}
+
+
+def is_location_dimension_enabled():
+    return bool(get_location_dimension()["enabled"])
+
+
+def validate_location_dimension():
+    """Throw unless 'Location' is enabled as an Accounting Dimension."""
+    if not is_location_dimension_enabled():
+        frappe.throw("Please enable 'Location' as an active Accounting Dimension before using it in transactions.")
+
+
+def clear_location_dimension_cache(doc=None, method=None, *args):
+    """Invalidate the cached Location dimension (Accounting Dimension doc events)."""
+    clear_site_cache(LOCATION_DIMENSION_CACHE_KEY)
+
 
 # Comprehensive state mapping for Indian states and territories
 # This includes all states, union territories, and special territories
@@ -61,21 +116,74 @@ def get_state_from_gstin(gstin):
     return state_code, state_name
 
 
+# Site-cache keys of the GST details (gstin, place of supply) of each Address.
+# Each key expires on its own, so addresses no longer used drop out of the cache.
+PLACE_OF_SUPPLY_CACHE_KEY = "lbs_address_gst"
+PLACE_OF_SUPPLY_CACHE_TTL = 24 * 60 * 60
+PLACE_OF_SUPPLY_ADDRESS_FIELDS = ["name", "gstin", "gst_state_number", "gst_state", "state", "country"]
+
+
 def get_place_of_supply_from_address(address_name):
     """
     Get place of supply from address.
     Returns format: "state_code-state_name" (e.g., "07-Delhi")
     """
-    if not address_name:
-        return None
-    
-    # Get address details
-    address_details = frappe.db.get_value("Address", address_name, 
-        ["gstin", "gst_state_number", "gst_state", "state", "country"], as_dict=True)
-    
-    if not address_details:
-        return None
+    return get_place_of_supply_details(address_name)["place_of_supply"]
+
+
+def get_place_of_supply_details(address_name):
+    """
+    Return {"place_of_supply", "state_code", "gstin"} for an address from the
+    site cache. state_code is the GSTIN state code when the address has a GSTIN.
+    Invalidated from Address doc events.
+    """
+    return get_place_of_supply_for_addresses([address_name]).get(address_name) or _empty_place_of_supply()
+
+
+def get_place_of_supply_for_addresses(address_names):
+    """
+    Bulk variant of get_place_of_supply_details: {address: details} for every
+    existing address among the given ones, reading addresses missing from the
+    cache in one query.
+    """
+    names = sorted({name for name in address_names if name})
+    result = {}
+    if not names:
+        return result
+
+    # One MGET for every address; set_value stores pickled values
+    cache = frappe.cache()
+    cached = cache.mget([cache.make_key(_place_of_supply_key(name)) for name in names])
+    for name, value in zip(names, cached):
+        if value is not None:
+            result[name] = pickle.loads(value)
+
+    missing = set(names) - set(result)
+    if missing:
+        rows = frappe.get_all("Address", filters={"name": ("in", list(missing))},
+                              fields=PLACE_OF_SUPPLY_ADDRESS_FIELDS)
+        for row in rows:
+            details = {
+                "place_of_supply": resolve_place_of_supply(row),
+                "state_code": get_state_from_gstin(row.gstin)[0],
+                "gstin": row.gstin,
+            }
+            cache.set_value(_place_of_supply_key(row.name), details, expires_in_sec=PLACE_OF_SUPPLY_CACHE_TTL)
+            result[row.name] = details
     
+    return result
+
+
+def _place_of_supply_key(address_name):
+    return f"{PLACE_OF_SUPPLY_CACHE_KEY}::{address_name}"
+
+
+def _empty_place_of_supply():
+    return {"place_of_supply": None, "state_code": None, "gstin": None}
+
+
+def resolve_place_of_supply(address_details):
+    """Resolve place of supply from Address gstin / gst_state_number / gst_state / state / country."""
     # For non-Indian addresses, return Other Countries
     if address_details.country != "India":
         return "96-Other Countries"
@@ -107,6 +215,25 @@ def get_place_of_supply_from_address(address_name):
     return None
 
 
+def _delete_place_of_supply(names):
+    frappe.cache().delete_value([_place_of_supply_key(name) for name in names])
+
+
+def clear_place_of_supply_cache(doc, method=None, *args):
+    """
+    Address on_update / on_trash / after_rename: drop the cached place of supply,
+    now and again after commit (see cache.clear_site_cache).
+    """
+    names = [doc.name]
+    # after_rename passes (old_name, new_name, merge)
+    if method == "after_rename" and args:
+        names.append(args[0])
+    
+    _delete_place_of_supply(names)
+    if getattr(frappe.local, "db", None):
+        frappe.db.after_commit.add(lambda: _delete_place_of_supply(names))
+
+
 def set_place_of_supply_for_purchase_doc(doc):
     """
     Set place of supply for purchase documents (PI, PO, PR) based on location's linked address.
@@ -133,7 +260,7 @@ def set_place_of_supply_for_purchase_doc(doc):
     
     if place_of_supply and hasattr(doc, 'place_of_supply'):
         doc.place_of_supply = place_of_supply
-        frappe.logger("location_based_series").info(f"[POS] Set place_of_supply to '{place_of_supply}' for {doc.doctype} {doc.name}")
+        get_logger().debug("place_of_supply_set", doctype=doc.doctype, name=doc.name, place_of_supply=place_of_supply)
 
 
 @frappe.whitelist()
@@ -180,6 +307,18 @@ def test_place_of_supply_logic():
     return results
 
 
+# Valid warehouses listed in an error message before the list is truncated
+MAX_LISTED_WAREHOUSES = 10
+
+
+def format_warehouse_list(warehouses, limit=MAX_LISTED_WAREHOUSES):
+    """Join warehouse names for a message, truncating long lists."""
+    warehouses = list(warehouses)
+    if len(warehouses) <= limit:
+        return ', '.join(warehouses)
+    return f"{', '.join(warehouses[:limit])} and {len(warehouses) - limit} more"
+
+
 def _get_location_based_query_result(location_type, location_name, doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
     Generic function to handle location-based queries for both shipping and dispatch locations.
@@ -200,170 +339,74 @@ def _get_location_based_query_result(location_type, location_name, doctype, txt,
     if not location_name:
         return []
     
-    # Get the location document
-    try:
-        loc_doc = frappe.get_doc("Location", location_name)
-    except frappe.DoesNotExistError:
+    return get_cached_search_result(
+        location_type, location_name, doctype, txt, start, page_len,
+        lambda: _run_location_based_query(location_name, doctype, txt, start, page_len)
+    )
+
+
+def _run_location_based_query(location_name, doctype, txt, start, page_len):
+    """Uncached search behind _get_location_based_query_result."""
+    # Warehouses are searched with a single nested-set range query
+    if doctype == "Warehouse":
+        return search_location_warehouses(location_name, txt, start, page_len)
+    
+    if doctype != "Address":
         return []
     
-    # Determine which field to check based on doctype
-    if doctype == "Warehouse":
-        linked_field = 'linked_warehouse'
-        result_doctype = "Warehouse"
-        result_fields = ["name", "warehouse_name"]
-    elif doctype == "Address":
-        linked_field = 'linked_address'
-        result_doctype = "Address"
-        result_fields = ["name", "address_title"]
-    else:
+    # Get the cached location snapshot
+    snapshot = get_location_snapshot(location_name)
+    if not snapshot:
         return []
     
-    # Check if location has the required linked field
-    linked_value = getattr(loc_doc, linked_field, None)
+    # Check if location has a linked address
+    linked_value = snapshot.linked_address
     if not linked_value:
         return []
     
-    # Check if the linked value exists
-    if not frappe.db.exists(result_doctype, linked_value):
+    # Check if the linked address exists
+    if not frappe.db.exists("Address", linked_value):
         return []
     
-    # Handle warehouse filtering with group warehouse support
-    if doctype == "Warehouse":
-        # Get warehouse info to check if it's a group warehouse
-        warehouse_info = frappe.db.get_value("Warehouse", linked_value, 
-                                            ["name", "is_group", "disabled"], as_dict=True)
-        
-        if not warehouse_info or warehouse_info.disabled:
+    # For Address doctype, return the linked address
+    address_title = frappe.db.get_value("Address", linked_value, "address_title")
+    
+    # Check if search text matches
+    if txt:
+        if (txt.lower() not in linked_value.lower() and 
+            txt.lower() not in address_title.lower()):
             return []
-        
-        if warehouse_info.is_group:
-            # Get all non-group descendants
-            try:
-                descendant_warehouses = get_descendants_of("Warehouse", linked_value, 
-                                                         ignore_permissions=True)
-                if descendant_warehouses:
-                    # Get non-group descendants that are not disabled
-                    non_group_descendants = frappe.get_all("Warehouse", 
-                                                          filters={
-                                                              "name": ["in", descendant_warehouses],
-                                                              "is_group": 0,
-                                                              "disabled": 0
-                                                          },
-                                                          fields=result_fields,
-                                                          order_by="name")
-                    
-                    # Filter by search text if provided
-                    if txt:
-                        filtered_results = []
-                        for warehouse in non_group_descendants:
-                            if (txt.lower() in warehouse.name.lower() or 
-                                txt.lower() in warehouse.warehouse_name.lower()):
-                                filtered_results.append([warehouse.name, warehouse.warehouse_name])
-                        return filtered_results[start:start + page_len]
-                    else:
-                        return [[warehouse.name, warehouse.warehouse_name] 
-                               for warehouse in non_group_descendants[start:start + page_len]]
-            except Exception as e:
-                frappe.logger().error(f"Error getting descendants for warehouse {linked_value}: {str(e)}")
-                return []
-        else:
-            # Non-group warehouse - return only this warehouse
-            warehouse_name = frappe.db.get_value("Warehouse", linked_value, "warehouse_name")
-            
-            # Check if search text matches
-            if txt:
-                if (txt.lower() not in linked_value.lower() and 
-                    txt.lower() not in warehouse_name.lower()):
-                    return []
-            
-            return [[linked_value, warehouse_name]]
-    else:
-        # For Address doctype, return the linked address
-        address_title = frappe.db.get_value("Address", linked_value, "address_title")
-        
-        # Check if search text matches
-        if txt:
-            if (txt.lower() not in linked_value.lower() and 
-                txt.lower() not in address_title.lower()):
-                return []
-        
-        return [[linked_value, address_title]]
+    
+    return [[linked_value, address_title]]
 
 
 def _get_filtered_warehouses_for_location_generic(location):
     """
     Generic function to get filtered warehouses for any location type.
-    This reduces code redundancy while maintaining exact same logic.
+    Reads the materialized LBS Location Warehouse membership, which already
+    holds only enabled, non-group warehouses under the linked warehouse.
     """
     if not location:
         return []
     
-    try:
-        loc_doc = frappe.get_doc("Location", location)
-    except frappe.DoesNotExistError:
-        return []
-    except Exception as e:
-        frappe.logger().error(f"Error getting location {location}: {str(e)}")
-        return []
-    
-    linked_warehouse = getattr(loc_doc, 'linked_warehouse', None)
-    if not linked_warehouse:
-        return []
-    
-    # Get warehouse info in one call
-    warehouse_info = frappe.db.get_value("Warehouse", linked_warehouse, 
-                                        ["name", "is_group", "disabled"], as_dict=True)
-    
-    if not warehouse_info:
-        return []
-    
-    if warehouse_info.is_group:
-        # Get all non-group descendants
-        try:
-            descendant_warehouses = get_descendants_of("Warehouse", linked_warehouse, 
-                                                     ignore_permissions=True)
-            if descendant_warehouses:
-                non_group_descendants = frappe.get_all("Warehouse", 
-                                                      filters={
-                                                          "name": ["in", descendant_warehouses],
-                                                          "is_group": 0,
-                                                          "disabled": 0
-                                                      },
-                                                      pluck="name")
-                return non_group_descendants
-        except Exception:
-            pass
-    else:
-        # If it's a non-group warehouse, only return that warehouse if not disabled
-        if not warehouse_info.disabled:
-            return [linked_warehouse]
-    
-    return []
+    return get_location_warehouses(location)
 
 
-def _get_filtered_addresses_for_location_generic(location):
+def _get_filtered_addresses_for_location_generic(location, context=None):
     """
     Generic function to get filtered addresses for any location type.
-    This reduces code redundancy while maintaining exact same logic.
+    Location and linked address are read from the LocationContext when given.
     """
     if not location:
         return []
     
-    try:
-        loc_doc = frappe.get_doc("Location", location)
-    except frappe.DoesNotExistError:
-        return []
-    except Exception as e:
-        frappe.logger().error(f"Error getting location {location}: {str(e)}")
-        return []
-    
-    linked_address = getattr(loc_doc, 'linked_address', None)
-    if not linked_address:
+    record = get_location_record(location, context)
+    if not record or not record.linked_address:
         return []
     
     # Check if the linked address exists
-    if frappe.db.exists("Address", linked_address):
-        return [linked_address]
+    if record.address:
+        return [record.linked_address]
     
     return []
 
@@ -384,10 +427,10 @@ def _validate_warehouse_against_location_generic(doc, location_field, warehouse_
     valid_warehouses = _get_filtered_warehouses_for_location_generic(location)
     
     if warehouse not in valid_warehouses:
-        frappe.throw(f"Warehouse '{warehouse}' is not valid for {location_field} '{location}'. Valid warehouses are: {', '.join(valid_warehouses)}")
+        frappe.throw(f"Warehouse '{warehouse}' is not valid for {location_field} '{location}'. Valid warehouses are: {format_warehouse_list(valid_warehouses)}")
 
 
-def _validate_address_against_location_generic(doc, location_field, address_field):
+def _validate_address_against_location_generic(doc, location_field, address_field, context=None):
     """
     Generic function to validate address against any location type.
     This reduces code redundancy while maintaining exact same logic.
@@ -400,18 +443,19 @@ def _validate_address_against_location_generic(doc, location_field, address_fiel
     if not address:
         return
     
-    valid_addresses = _get_filtered_addresses_for_location_generic(location)
+    valid_addresses = _get_filtered_addresses_for_location_generic(location, context)
     
     if address not in valid_addresses:
         frappe.throw(f"Address '{address}' is not valid for {location_field} '{location}'. Valid addresses are: {', '.join(valid_addresses)}")
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs
 def location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
     Server-side query method to filter warehouses based on location.
-    If location has a group warehouse, show only descendants.
+    If location has a group warehouse, show only its enabled non-group descendants.
     If location has a non-group warehouse, show only that warehouse.
     """
     
@@ -422,80 +466,15 @@ def location_based_warehouse_query(doctype, txt, searchfield, start, page_len, f
         # If no location specified, return empty result to force location selection
         return []
     
-    # Get the location document to find the linked warehouse
-    try:
-        loc_doc = frappe.get_doc("Location", location)
-    except frappe.DoesNotExistError:
-        return []
-    
-    # Check if location has a linked warehouse
-    linked_warehouse = getattr(loc_doc, 'linked_warehouse', None)
-    if not linked_warehouse:
-        # No linked warehouse, return empty
-        return []
-    
-    # Check if the linked warehouse exists and get its properties
-    warehouse_info = frappe.db.get_value("Warehouse", linked_warehouse, 
-                                        ["name", "is_group", "company"], as_dict=True)
-    
-    if not warehouse_info:
-        return []
-    
-    # Determine which warehouses are valid for this location
-    valid_warehouses = []
-    
-    if warehouse_info.is_group:
-        # If it's a group warehouse, get all descendants
-        try:
-            descendant_warehouses = get_descendants_of("Warehouse", linked_warehouse, 
-                                                     ignore_permissions=True)
-            if descendant_warehouses:
-                non_group_descendants = frappe.get_all("Warehouse", 
-                                                      filters={
-                                                          "name": ["in", descendant_warehouses],
-                                                          "is_group": 0,
-                                                          "disabled": 0
-                                                      },
-                                                      pluck="name")
-                valid_warehouses = non_group_descendants
-        except Exception:
-            pass
-    else:
-        # If it's a non-group warehouse, only show that warehouse
-        if frappe.db.get_value("Warehouse", linked_warehouse, "disabled") != 1:
-            valid_warehouses = [linked_warehouse]
-    
-    if not valid_warehouses:
-        return []
-    
-    # Base filters for frappe.get_all
-    filters_dict = {
-        "name": ["in", valid_warehouses],
-        "disabled": 0
-    }
-    
-    # Add text search if provided
-    if txt:
-        # Filter valid warehouses by text search
-        matching_warehouses = [w for w in valid_warehouses if txt.lower() in w.lower()]
-        if matching_warehouses:
-            filters_dict["name"] = ["in", matching_warehouses]
-        else:
-            return []
-    
-    # Get warehouses using frappe.get_all for better handling
-    result = frappe.get_all("Warehouse",
-                           filters=filters_dict,
-                           fields=["name", "warehouse_name"],
-                           order_by="name",
-                           limit_start=start,
-                           limit_page_length=page_len,
-                           as_list=True)
-    
-    return result
+    # Single nested-set range query: txt matched and paginated in the database
+    return get_cached_search_result(
+        "main", location, "Warehouse", txt, start, page_len,
+        lambda: search_location_warehouses(location, txt, start, page_len)
+    )
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs
 def shipping_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
@@ -518,6 +497,7 @@ def shipping_location_based_warehouse_query(doctype, txt, searchfield, start, pa
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs
 def shipping_location_based_address_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
@@ -533,51 +513,7 @@ def get_filtered_warehouses_for_location(location):
     Get list of valid warehouses for a given location.
     Returns a list of warehouse names that should be available for the location.
     """
-    if not location:
-        return []
-    
-    try:
-        loc_doc = frappe.get_doc("Location", location)
-    except frappe.DoesNotExistError:
-        return []
-    except Exception as e:
-        frappe.logger().error(f"Error getting location {location}: {str(e)}")
-        return []
-    
-    linked_warehouse = getattr(loc_doc, 'linked_warehouse', None)
-    if not linked_warehouse:
-        return []
-    
-    # Get warehouse info in one call
-    warehouse_info = frappe.db.get_value("Warehouse", linked_warehouse, 
-                                        ["name", "is_group", "disabled"], as_dict=True)
-    
-    if not warehouse_info:
-        return []
-    
-    if warehouse_info.is_group:
-        # Get all non-group descendants
-        try:
-            descendant_warehouses = get_descendants_of("Warehouse", linked_warehouse, 
-                                                     ignore_permissions=True)
-            if descendant_warehouses:
-                non_group_descendants = frappe.get_all("Warehouse", 
-                                                      filters={
-                                                          "name": ["in", descendant_warehouses],
-                                                          "is_group": 0,
-                                                          "disabled": 0
-                                                      },
-                                                      pluck="name")
-                return non_group_descendants
-        except Exception:
-            return []
-    else:
-        # Return the single warehouse only if it's not disabled
-        if warehouse_info.disabled != 1:
-            return [linked_warehouse]
-        return []
-    
-    return []
+    return _get_filtered_warehouses_for_location_generic(location)
 
 
 def get_filtered_warehouses_for_shipping_location(shipping_location):
@@ -588,32 +524,104 @@ def get_filtered_warehouses_for_shipping_location(shipping_location):
     return get_filtered_warehouses_for_location(shipping_location)
 
 
+def get_filtered_addresses_for_location(location, context=None):
+    """
+    Get list of valid addresses for a given location.
+    Returns the location's linked address if it exists.
+    """
+    return _get_filtered_addresses_for_location_generic(location, context)
+
+
 @frappe.whitelist()
 def get_filtered_addresses_for_shipping_location(shipping_location):
     """
     Get list of valid addresses for a given shipping location.
     Returns a list of address names that should be available for the shipping location.
     """
-    if not shipping_location:
-        return []
+    return _get_filtered_addresses_for_location_generic(shipping_location)
+
+
+# Above this many valid warehouses the bootstrap response carries only the count
+BOOTSTRAP_WAREHOUSE_LIMIT = 200
+
+
+@frappe.whitelist()
+def get_location_bootstrap(location, location_type="main"):
+    """
+    Return everything a form needs once a location is picked, in one response:
+    location code, linked address, valid addresses, valid warehouses (or their
+    count when there are many, plus the default when there is only one), the
+    warehouse list for client-side search (as get_location_warehouse_list
+    returns it) and place of supply.
+    """
+    if not location:
+        return {}
     
-    try:
-        loc_doc = frappe.get_doc("Location", shipping_location)
-    except frappe.DoesNotExistError:
-        return []
-    except Exception as e:
-        frappe.logger().error(f"Error getting shipping location {shipping_location}: {str(e)}")
-        return []
+    if not frappe.has_permission("Location", "read", location):
+        frappe.throw(f"Not permitted to read Location {location}", frappe.PermissionError)
     
-    linked_address = getattr(loc_doc, 'linked_address', None)
-    if not linked_address:
-        return []
+    context = load_location_context([location])
+    record = context.get(location)
+    if not record:
+        return {}
     
-    # Check if the linked address exists
-    if frappe.db.exists("Address", linked_address):
-        return [linked_address]
+    warehouse_list = _get_warehouse_list(location)
+    if warehouse_list["warehouses"] is None:
+        warehouse_count = frappe.db.count(MEMBERSHIP_DOCTYPE, {"location": location})
+        warehouses = None
+    else:
+        warehouses = [row[0] for row in warehouse_list["warehouses"]]
+        warehouse_count = len(warehouses)
+    
+    return {
+        "location": location,
+        "location_type": location_type,
+        "lbs_location_code": record.lbs_location_code,
+        "linked_address": record.linked_address,
+        "addresses": _get_filtered_addresses_for_location_generic(location, context),
+        "warehouses": warehouses,
+        "warehouse_count": warehouse_count,
+        "default_warehouse": warehouses[0] if warehouse_count == 1 else None,
+        "warehouse_list": warehouse_list,
+        "place_of_supply": get_place_of_supply_from_address(record.linked_address) if record.address else None,
+    }
+
+
+@frappe.whitelist()
+def get_location_warehouse_list(location, version=None):
+    """
+    Return the valid warehouses of a location for client-side link search.
+
+    The response carries a version stamp (the link search cache token, replaced
+    on any Location / Warehouse change). When the client sends the stamp it
+    already holds and nothing changed, only {"not_modified": 1} is returned.
+    `warehouses` is None when the location has too many warehouses to ship to
+    the browser; the client then keeps using the server-side search.
+    """
+    if not location:
+        return {}
     
-    return []
+    if not frappe.has_permission("Location", "read", location):
+        frappe.throw(f"Not permitted to read Location {location}", frappe.PermissionError)
+    
+    current_version = get_search_cache_version()
+    if version and version == current_version:
+        return {"version": current_version, "not_modified": 1}
+    
+    return _get_warehouse_list(location)
+
+
+def _get_warehouse_list(location):
+    """{"version", "warehouses": [[name, warehouse_name], ...] or None} of a location."""
+    rows = get_cached_search_result(
+        "prefetch", location, "Warehouse", "", 0, BOOTSTRAP_WAREHOUSE_LIMIT + 1,
+        lambda: get_location_warehouse_rows(location, BOOTSTRAP_WAREHOUSE_LIMIT + 1)
+    )
+    
+    return {
+        "version": get_search_cache_version(),
+        "warehouses": rows if len(rows) <= BOOTSTRAP_WAREHOUSE_LIMIT else None,
+    }
 
 
 def auto_set_warehouse_for_location(doc):
@@ -687,86 +695,79 @@ def validate_warehouse_against_shipping_location(doc, warehouse_field="warehouse
     _validate_warehouse_against_location_generic(doc, 'shipping_location', warehouse_field)
 
 
-def validate_shipping_address_against_shipping_location(doc):
+def validate_shipping_address_against_shipping_location(doc, context=None):
     """
     Validate that the selected shipping address is valid for the shipping location.
     """
-    _validate_address_against_location_generic(doc, 'shipping_location', 'shipping_address')
+    _validate_address_against_location_generic(doc, 'shipping_location', 'shipping_address', context)
 
 
-@frappe.whitelist()
-@frappe.validate_and_sanitize_search_inputs  
-def child_table_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
+def _get_child_table_location(filters, location_field):
     """
-    Server-side query method for warehouse fields in child tables.
-    Filters warehouses based on the parent document's location.
+    Return the location a child table warehouse search should filter on.
+
+    The form passes the location it is editing, which is trusted as-is (the
+    saved document is validated on save anyway), so unsaved documents and
+    documents of any size cost the same. Only when the location is missing is it
+    read from the saved parent, as a single permission-checked column.
     """
+    location = filters.get(location_field)
+    if location:
+        return location
     
-    # Extract parent information from filters
     parent_doctype = filters.get("parent_doctype")
     parent_name = filters.get("parent")
-    
     if not parent_doctype or not parent_name:
-        # If no parent info, fall back to basic location filtering
-        return location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs)
+        return None
     
-    # Get the parent document to find its location
-    if not parent_name:  # Handle new documents
-        return []
-        
-    try:
-        parent_doc = frappe.get_doc(parent_doctype, parent_name)
-        location = getattr(parent_doc, 'location', None)
-    except (frappe.DoesNotExistError, AttributeError):
-        return []
+    if not frappe.get_meta(parent_doctype).has_field(location_field):
+        return None
     
+    values = frappe.get_list(parent_doctype,
+                             filters={"name": parent_name},
+                             pluck=location_field,
+                             limit=1)
+    return values[0] if values else None
+
+
+@frappe.whitelist()
+@timed_search
+@frappe.validate_and_sanitize_search_inputs  
+def child_table_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
+    """
+    Server-side query method for warehouse fields in child tables.
+    Filters warehouses based on the parent document's location.
+    """
+    location = _get_child_table_location(filters, "location")
     if not location:
         return []
     
-    # Use the main location-based query with the parent's location
     filters_with_location = dict(filters)
-    filters_with_location['location'] = location
+    filters_with_location["location"] = location
     
-    return location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_location, **kwargs) 
+    return location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_location, **kwargs)
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs  
 def child_table_shipping_location_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
     Server-side query method for warehouse fields in child tables.
     Filters warehouses based on the parent document's shipping location.
     """
-    
-    # Extract parent information from filters
-    parent_doctype = filters.get("parent_doctype")
-    parent_name = filters.get("parent")
-    
-    if not parent_doctype or not parent_name:
-        # If no parent info, fall back to basic shipping location filtering
-        return shipping_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs)
-    
-    # Get the parent document to find its shipping location
-    if not parent_name:  # Handle new documents
-        return []
-        
-    try:
-        parent_doc = frappe.get_doc(parent_doctype, parent_name)
-        shipping_location = getattr(parent_doc, 'shipping_location', None)
-    except (frappe.DoesNotExistError, AttributeError):
-        return []
-    
+    shipping_location = _get_child_table_location(filters, "shipping_location")
     if not shipping_location:
         return []
     
-    # Use the main shipping location-based query with the parent's shipping location
     filters_with_shipping_location = dict(filters)
-    filters_with_shipping_location['shipping_location'] = shipping_location
+    filters_with_shipping_location["shipping_location"] = shipping_location
     
-    return shipping_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_shipping_location, **kwargs) 
+    return shipping_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_shipping_location, **kwargs)
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs
 def dispatch_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
@@ -778,6 +779,7 @@ def dispatch_location_based_warehouse_query(doctype, txt, searchfield, start, pa
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs
 def dispatch_location_based_address_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
@@ -847,44 +849,26 @@ def validate_warehouse_against_dispatch_location(doc, warehouse_field="warehouse
     _validate_warehouse_against_location_generic(doc, 'dispatch_location', warehouse_field)
 
 
-def validate_dispatch_address_against_dispatch_location(doc):
+def validate_dispatch_address_against_dispatch_location(doc, context=None):
     """
     Validate that the selected dispatch address is valid for the dispatch location.
     """
-    _validate_address_against_location_generic(doc, 'dispatch_location', 'dispatch_address_name')
+    _validate_address_against_location_generic(doc, 'dispatch_location', 'dispatch_address_name', context)
 
 
 @frappe.whitelist()
+@timed_search
 @frappe.validate_and_sanitize_search_inputs  
 def child_table_dispatch_location_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs):
     """
     Server-side query method for warehouse fields in child tables.
     Filters warehouses based on the parent document's dispatch location.
     """
-    
-    # Extract parent information from filters
-    parent_doctype = filters.get("parent_doctype")
-    parent_name = filters.get("parent")
-    
-    if not parent_doctype or not parent_name:
-        # If no parent info, fall back to basic dispatch location filtering
-        return dispatch_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters, **kwargs)
-    
-    # Get the parent document to find its dispatch location
-    if not parent_name:  # Handle new documents
-        return []
-        
-    try:
-        parent_doc = frappe.get_doc(parent_doctype, parent_name)
-        dispatch_location = getattr(parent_doc, 'dispatch_location', None)
-    except (frappe.DoesNotExistError, AttributeError):
-        return []
-    
+    dispatch_location = _get_child_table_location(filters, "dispatch_location")
     if not dispatch_location:
         return []
     
-    # Use the main dispatch location-based query with the parent's dispatch location
     filters_with_dispatch_location = dict(filters)
-    filters_with_dispatch_location['dispatch_location'] = dispatch_location
+    filters_with_dispatch_location["dispatch_location"] = dispatch_location
     
-    return dispatch_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_dispatch_location, **kwargs) 
\ No newline at end of file
+    return dispatch_location_based_warehouse_query(doctype, txt, searchfield, start, page_len, filters_with_dispatch_location, **kwargs)